@@ -1,7 +1,9 @@
 from datetime import timedelta
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 import os
+import sys
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -34,6 +36,8 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    "restaurant.middleware.MetricsMiddleware",
+    "restaurant.middleware.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -50,7 +54,8 @@ ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates с замером времени отрисовки для Server-Timing
+        "BACKEND": "restaurant.services.timing.TimedDjangoTemplates",
         "DIRS": [],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -80,6 +85,55 @@ DATABASES = {
 }
 
 
+# Кэш - Redis, общий для всех процессов: через него передаются версии
+# доступности дат (и ETag), поэтому кэш в памяти процесса допустим только
+# в тестах (см. ниже), иначе изменения одного процесса не видны остальным
+REDIS_CACHE_URL = os.getenv("REDIS_CACHE_URL")
+
+if not REDIS_CACHE_URL and "test" not in sys.argv:
+    raise ImproperlyConfigured("Не задан REDIS_CACHE_URL (общий кэш Redis)")
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_CACHE_URL,
+    }
+}
+
+# время, в течение которого доступность столов в кэше считается свежей (в секундах)
+AVAILABILITY_CACHE_FRESH = int(os.getenv("AVAILABILITY_CACHE_FRESH", 30))
+
+# время, в течение которого устаревшая доступность отдается, пока она пересчитывается
+AVAILABILITY_CACHE_STALE = int(os.getenv("AVAILABILITY_CACHE_STALE", 300))
+
+# время хранения публичных страниц для анонимных посетителей (в секундах, 0 - не кэшировать)
+PAGE_CACHE_TIMEOUT = int(os.getenv("PAGE_CACHE_TIMEOUT", 600))
+
+# время хранения групп пользователя в кэше (в секундах, 0 - только в пределах запроса)
+USER_GROUPS_CACHE_TIMEOUT = int(os.getenv("USER_GROUPS_CACHE_TIMEOUT", 300))
+
+
+# для запуска тестов без PostgreSQL и Redis используются SQLite и кэш в памяти;
+# TEST_POSTGRES=True - тесты на настроенном PostgreSQL (в том числе тесты миграций,
+# выполняемых только на PostgreSQL)
+TEST_POSTGRES = os.getenv("TEST_POSTGRES", "False") == "True"
+
+if "test" in sys.argv:
+    if not TEST_POSTGRES:
+        DATABASES = {
+            "default": {
+                "ENGINE": "django.db.backends.sqlite3",
+                "NAME": BASE_DIR / "test_db.sqlite3",
+            }
+        }
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+    CELERY_TASK_ALWAYS_EAGER = True
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -123,7 +177,13 @@ STATICFILES_DIRS = [
 
 # путь к общей статической папке, формируемой при запуске команды collectstatic
 # (для сбора всей статистики в единый каталог при размещении сайта на веб-сервисе)
-STATIC_ROOT = os.path.join(BASE_DIR, "/static/")
+STATIC_ROOT = BASE_DIR / "staticfiles"
+
+# подключать в base.html сборки CSS и JS (команда build_assets) вместо исходных файлов
+ASSETS_BUNDLED = os.getenv("ASSETS_BUNDLED", "False") == "True"
+
+# время кэширования в браузере статических файлов с хэшем в имени (в секундах)
+STATIC_MAX_AGE = 365 * 24 * 60 * 60
 
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
@@ -170,14 +230,57 @@ CELERY_TASK_TIME_LIMIT = 30 * 60
 CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = os.getenv(
     "CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP"
 )
+# Задачи с ETA, не подтвержденные за visibility_timeout, брокер Redis
+# переотправляет: значение должно превышать EXPIRY_ETA_HORIZON
+CELERY_BROKER_TRANSPORT_OPTIONS = {"visibility_timeout": 60 * 60}
+
 CELERY_BEAT_SCHEDULE = {
+    "schedule-expiries-every-5-minutes": {
+        "task": "restaurant.tasks.schedule_expiries",
+        "schedule": 300,  # каждые 5 минут = 300 секунд
+    },
     "cancel-expired-bookings-every-5-minutes": {
         "task": "restaurant.tasks.cancel_expired_bookings",
         "schedule": 300,  # каждые 5 минут = 300 секунд
     },
+    "prune-history-daily": {
+        "task": "restaurant.tasks.prune_history",
+        "schedule": 24 * 60 * 60,  # раз в сутки
+    },
 }
 
 
+# Индекс занятости столов
+# время жизни занятости даты в памяти процесса (в секундах)
+OCCUPANCY_INDEX_TTL = int(os.getenv("OCCUPANCY_INDEX_TTL", 60))
+
+# Redis для общего индекса занятости (если не задан - индекс хранится в памяти процесса)
+OCCUPANCY_REDIS_URL = os.getenv("OCCUPANCY_REDIS_URL")
+
+
+# Отмена бронирований
+# отмененные бронирования остаются в таблице бронирований (мягкая отмена)
+# отмены старше HISTORY_VISIBLE_DAYS дней переносятся в архив истории
+# и не показываются пользователю
+HISTORY_VISIBLE_DAYS = int(os.getenv("HISTORY_VISIBLE_DAYS", 90))
+
+# архив истории хранится HISTORY_RETENTION_MONTHS полных месяцев
+HISTORY_RETENTION_MONTHS = int(os.getenv("HISTORY_RETENTION_MONTHS", 24))
+
+
+# Автоматический подбор стола
+# функция оценки стола для компании гостей (меньше - лучше)
+SEATING_SCORE = "restaurant.services.seating.best_fit_score"
+
+
+# Метрики Prometheus (/metrics)
+# токен доступа к метрикам (если не задан - страница метрик отключена)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# запросы дольше порога (в миллисекундах) сохраняются в буфер медленных запросов
+SLOW_REQUEST_THRESHOLD_MS = int(os.getenv("SLOW_REQUEST_THRESHOLD_MS", 500))
+
+
 # Настройки срока действия токенов
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=15),
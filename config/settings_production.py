@@ -0,0 +1,40 @@
+# Настройки для продакшена:
+# DJANGO_SETTINGS_MODULE=config.settings_production
+
+from django.core.exceptions import ImproperlyConfigured
+
+from config.settings import *  # noqa: F401,F403
+from config.settings import TEMPLATES, os
+
+
+DEBUG = False
+
+# имена хостов сайта через запятую; без них запуск останавливается,
+# а не принимает запросы с любым заголовком Host
+ALLOWED_HOSTS = [
+    host.strip() for host in os.getenv("ALLOWED_HOSTS", "").split(",") if host.strip()
+]
+if not ALLOWED_HOSTS:
+    raise ImproperlyConfigured("Не задан ALLOWED_HOSTS (имена хостов сайта)")
+
+
+# шаблоны читаются с диска и компилируются один раз на процесс
+TEMPLATES[0]["APP_DIRS"] = False
+TEMPLATES[0]["OPTIONS"]["loaders"] = [
+    (
+        "django.template.loaders.cached.Loader",
+        [
+            "django.template.loaders.filesystem.Loader",
+            "django.template.loaders.app_directories.Loader",
+        ],
+    ),
+]
+
+
+# статические файлы с хэшем содержимого в имени (собираются командой build_assets)
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "restaurant.services.assets.ManifestStaticStorage"},
+}
+
+ASSETS_BUNDLED = True
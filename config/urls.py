@@ -1,10 +1,22 @@
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
-from config import settings
+from django.urls import path, include, re_path
 from django.conf.urls.static import static
 
+from restaurant.views import MetricsView, StaticAssetView
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", include("restaurant.urls", "restaurant")),
     path("users/", include("users.urls", "users")),
+    path("metrics", MetricsView.as_view(), name="metrics"),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+# без DEBUG статические файлы (build_assets) отдает само приложение
+if not settings.DEBUG:
+    urlpatterns += [
+        re_path(
+            rf"^{settings.STATIC_URL.lstrip('/')}(?P<path>.*)$",
+            StaticAssetView.as_view(),
+        ),
+    ]
@@ -1,5 +1,11 @@
-from django.contrib import admin
-from restaurant.models import Table, Booking, BookingHistory
+from django.contrib import admin, messages
+from restaurant.models import (
+    Table,
+    Booking,
+    BookingHistory,
+    OpeningHours,
+    SpecialDay,
+)
 
 
 @admin.register(Table)
@@ -14,6 +20,7 @@ class TableAdmin(admin.ModelAdmin):
         "number",
     )
     search_fields = ("number",)
+    filter_horizontal = ("combinable_with",)
 
 
 @admin.register(Booking)
@@ -26,10 +33,23 @@ class BookingAdmin(admin.ModelAdmin):
         "date_reserved",
         "time_reserved",
         "duration",
+        "guests",
+        "group",
         "is_active",
     )
     list_filter = ("table",)
     search_fields = ("table", "client", "date_reserved")
+    actions = ("cancel_bookings",)
+
+    @admin.action(description="Отменить выбранные бронирования")
+    def cancel_bookings(self, request, queryset):
+        """
+        Массовая отмена бронирований с уведомлением клиентов.
+        """
+        cancelled = queryset.cancel()
+        self.message_user(
+            request, f"Отменено бронирований: {cancelled}", messages.SUCCESS
+        )
 
 
 @admin.register(BookingHistory)
@@ -46,3 +66,26 @@ class BookingHistoryAdmin(admin.ModelAdmin):
         "table",
         "cancelled_at",
     )
+
+
+@admin.register(OpeningHours)
+class OpeningHoursAdmin(admin.ModelAdmin):
+    list_display = (
+        "weekday",
+        "opens_at",
+        "last_booking_at",
+        "is_closed",
+    )
+
+
+@admin.register(SpecialDay)
+class SpecialDayAdmin(admin.ModelAdmin):
+    list_display = (
+        "date",
+        "description",
+        "opens_at",
+        "last_booking_at",
+        "is_closed",
+    )
+    list_filter = ("is_closed",)
+    search_fields = ("description",)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class RestaurantConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "restaurant"
+
+    def ready(self):
+        import restaurant.signals  # noqa: F401
@@ -1,7 +1,12 @@
 from django import forms
-from django.utils import timezone
-from datetime import timedelta, datetime
+from datetime import time
 from .models import Booking
+from .services.availability import get_free_times
+from .services.slots import booking_dates, get_slots, get_window_slots, slot_choices
+
+
+# количество гостей, если оно не указано в форме
+DEFAULT_GUESTS = Booking._meta.get_field("guests").default
 
 
 class StyleFormMixin:
@@ -22,42 +27,52 @@ class TableForm(StyleFormMixin, forms.ModelForm):
     Форма выбора стола с поддержкой временных интервалов бронирования.
     """
 
-    open_time = 10
-    close_booking_time = 20
-    time_step = 30
     time_reserved = forms.ChoiceField(label="Время бронирования")
-    next_day = timezone.localdate() + timedelta(days=1)
-
+    auto_assign = forms.BooleanField(
+        label="Подобрать стол автоматически", required=False
+    )
     date_reserved = forms.DateField(
         label="Дата бронирования",
-        widget=forms.DateInput(
-            attrs={
-                "type": "date",
-                "min": next_day.strftime("%Y-%m-%d"),
-                "max": (next_day + timedelta(days=6)).strftime("%Y-%m-%d"),
-            }
-        ),
+        widget=forms.DateInput(attrs={"type": "date"}),
     )
 
     def __init__(self, *args, **kwargs):
         super(TableForm, self).__init__(*args, **kwargs)
 
-        times = [
-            (
-                datetime.strptime(f"{hour:02d}:{minute:02d}", "%H:%M").time(),
-                f"{hour:02d}:{minute:02d}",
-            )
-            for hour in range(self.open_time, self.close_booking_time + 1)
-            for minute in [0, self.time_step]
-            if hour < self.close_booking_time
-            or (hour == self.close_booking_time and minute == 0)
-        ]
+        # Границы выбора даты вычисляются при создании формы, а не при импорте
+        dates = booking_dates()
+        self.fields["date_reserved"].widget.attrs.update(
+            {"min": dates[0].isoformat(), "max": dates[-1].isoformat()}
+        )
 
-        self.fields["time_reserved"].choices = times
+        # Время из каталога слотов: все время, доступное хотя бы в один из дней
+        self.day_slots, times = get_window_slots(dates)
+        self.fields["time_reserved"].choices = slot_choices(times)
+        self.fields["guests"].required = False
+
+    def clean_guests(self):
+        return self.cleaned_data["guests"] or DEFAULT_GUESTS
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_reserved = cleaned_data.get("date_reserved")
+        time_reserved = cleaned_data.get("time_reserved")
+
+        if date_reserved and time_reserved:
+            slots = self.day_slots.get(date_reserved)
+            if slots is None:
+                slots = get_slots(date_reserved)
+            if not slots:
+                self.add_error("date_reserved", "В этот день ресторан закрыт")
+            elif time.fromisoformat(time_reserved) not in slots:
+                self.add_error(
+                    "time_reserved", "На это время бронирование в этот день недоступно"
+                )
+        return cleaned_data
 
     class Meta:
         model = Booking
-        fields = ["date_reserved", "time_reserved"]
+        fields = ["date_reserved", "time_reserved", "guests"]
 
 
 class BookingForm(StyleFormMixin, forms.ModelForm):
@@ -65,17 +80,36 @@ class BookingForm(StyleFormMixin, forms.ModelForm):
     Форма бронирования с использованием стилей.
     """
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, table=None, tables=None, **kwargs):
         super().__init__(*args, **kwargs)
         instance = kwargs.get("instance")
+        # бронируемые столы (несколько - для объединенных столов)
+        self.tables = tables or ([table] if table is not None else [])
 
         if instance:
             self.initial["date_reserved"] = instance.date_reserved
             self.initial["time_reserved"] = instance.time_reserved
+        self.fields["guests"].required = False
+        if self.tables:
+            self.fields["guests"].widget.attrs["max"] = self.seats
+
+    @property
+    def seats(self):
+        return sum(table.seats for table in self.tables)
+
+    def clean_guests(self):
+        guests = self.cleaned_data["guests"] or DEFAULT_GUESTS
+        if self.tables and guests > self.seats:
+            numbers = ", ".join(f"№{table.number}" for table in self.tables)
+            place = "столом" if len(self.tables) == 1 else "столами"
+            raise forms.ValidationError(
+                f"За {place} {numbers} только {self.seats} мест"
+            )
+        return guests
 
     class Meta:
         model = Booking
-        fields = ["message"]
+        fields = ["guests", "message"]
         widgets = {
             "message": forms.Textarea(
                 attrs={"placeholder": "Дополнительная информация", "rows": 6}
@@ -88,11 +122,7 @@ class BookingUpdateForm(StyleFormMixin, forms.ModelForm):
     Форма редактирования бронирования с использованием стилей.
     """
 
-    open_time = 10
-    close_booking_time = 20
-    time_step = 30
     time_reserved = forms.ChoiceField(label="Время бронирования")
-    next_day = timezone.localdate() + timedelta(days=1)
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -102,40 +132,21 @@ class BookingUpdateForm(StyleFormMixin, forms.ModelForm):
             self.initial["date_reserved"] = instance.date_reserved
             self.initial["time_reserved"] = instance.time_reserved
 
-        all_times = [
-            (
-                datetime.strptime(f"{hour:02d}:{minute:02d}", "%H:%M").time(),
-                f"{hour:02d}:{minute:02d}",
-            )
-            for hour in range(self.open_time, self.close_booking_time + 1)
-            for minute in [0, self.time_step]
-            if hour < self.close_booking_time
-            or (hour == self.close_booking_time and minute == 0)
-        ]
-
-        # Получаем занятые времена для выбранного стола и даты
-        booked_times = self.get_booked_times(
-            instance.table, self.initial.get("date_reserved", self.next_day)
+        date_reserved = self.initial.get("date_reserved", booking_dates()[0])
+        all_times = slot_choices(get_slots(date_reserved))
+
+        # Оставляем только время, на которое стол свободен с учетом
+        # продолжительности бронирования (само бронирование не учитывается)
+        free_times = get_free_times(
+            instance.table,
+            date_reserved,
+            [t for t, _ in all_times],
+            duration=instance.duration,
+            exclude=instance,
         )
 
-        # Фильтруем список времен, оставляя только свободные
-        available_times = [(t, s) for t, s in all_times if (t, s) not in booked_times]
-
-        self.fields["time_reserved"].choices = available_times
-
-    @staticmethod
-    def get_booked_times(table, date):
-        """
-        Возвращает список занятых времен для указанного стола и даты.
-        НЕОБХОДИМО РЕАЛИЗОВАТЬ ЗАПРОС К БАЗЕ ДАННЫХ.
-        """
-
-        booked_slots = Booking.objects.filter(
-            table=table, date_reserved=date
-        ).values_list("time_reserved", flat=True)
-        return [
-            (datetime.strptime(str(slot), "%H:%M:%S").time(), str(slot)[:5])
-            for slot in booked_slots
+        self.fields["time_reserved"].choices = [
+            (t, s) for t, s in all_times if t in free_times
         ]
 
     class Meta:
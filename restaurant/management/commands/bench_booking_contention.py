@@ -0,0 +1,102 @@
+import threading
+import time as timer
+from datetime import time, timedelta
+
+from django.core.management import BaseCommand
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+from restaurant.models import Booking, Table
+from restaurant.services.booking import BookingConflict, save_booking
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочный тест одновременного бронирования одного стола.
+    """
+
+    help = (
+        "Запускает несколько потоков, которые одновременно бронируют один стол "
+        "на одно время, и выводит пропускную способность и число конфликтов. "
+        "Созданные данные удаляются после замера."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=16,
+            help="Количество потоков (по умолчанию 16)",
+        )
+        parser.add_argument(
+            "--attempts",
+            type=int,
+            default=50,
+            help="Количество попыток бронирования в каждом потоке (по умолчанию 50)",
+        )
+
+    def handle(self, *args, **options):
+        threads_count = options["threads"]
+        attempts = options["attempts"]
+
+        client = User.objects.create(email="bench-contention@example.com")
+        table = Table.objects.create(number=-1, seats=4)
+        date_reserved = timezone.localdate() + timedelta(days=1)
+        counts = {"success": 0, "conflict": 0, "error": 0}
+        counts_guard = threading.Lock()
+        start = threading.Barrier(threads_count)
+
+        def worker():
+            result = {"success": 0, "conflict": 0, "error": 0}
+            try:
+                start.wait()
+                for _ in range(attempts):
+                    booking = Booking(
+                        table=table,
+                        client=client,
+                        date_reserved=date_reserved,
+                        time_reserved=time(18),
+                    )
+                    try:
+                        save_booking(booking)
+                    except BookingConflict:
+                        result["conflict"] += 1
+                    except DatabaseError:
+                        result["error"] += 1
+                    else:
+                        result["success"] += 1
+            finally:
+                # каждый поток работает со своим соединением с БД
+                connection.close()
+                with counts_guard:
+                    for key, value in result.items():
+                        counts[key] += value
+
+        try:
+            threads = [threading.Thread(target=worker) for _ in range(threads_count)]
+            started = timer.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = timer.perf_counter() - started
+
+            active = Booking.objects.filter(table=table, is_active=True).count()
+        finally:
+            Booking.objects.filter(table=table).delete()
+            table.delete()
+            client.delete()
+
+        total = threads_count * attempts
+        self.stdout.write(
+            f"Попыток: {total} за {elapsed:.2f} с ({total / elapsed:.0f} в секунду)"
+        )
+        self.stdout.write(
+            f"Успешно: {counts['success']}, конфликтов: {counts['conflict']}, "
+            f"ошибок: {counts['error']}"
+        )
+        if active == 1:
+            self.stdout.write(self.style.SUCCESS("Двойных бронирований нет"))
+        else:
+            self.stdout.write(self.style.ERROR(f"Активных бронирований: {active}"))
@@ -0,0 +1,84 @@
+import time as timer
+from datetime import time, timedelta
+
+from django.core.cache import cache
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from restaurant.models import Booking, Table
+from restaurant.services.expiry import WATERMARK_KEY
+from restaurant.tasks import cancel_expired_bookings
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Замер времени отмены истекших бронирований.
+    """
+
+    help = (
+        "Замеряет время работы cancel_expired_bookings на заданном количестве "
+        "истекших бронирований. Данные создаются в транзакции и откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "rows",
+            nargs="*",
+            type=int,
+            default=[10_000, 100_000],
+            help="Количество истекших бронирований (по умолчанию 10000 и 100000)",
+        )
+        parser.add_argument(
+            "--compare",
+            action="store_true",
+            help="Дополнительно замерить построчную отмену через Booking.cancel()",
+        )
+
+    def handle(self, *args, **options):
+        for rows in options["rows"]:
+            elapsed = self.measure(rows, cancel_expired_bookings)
+            self.stdout.write(f"{rows} бронирований: {elapsed:.2f} с (пачками)")
+
+            if options["compare"]:
+                elapsed = self.measure(rows, self.cancel_one_by_one)
+                self.stdout.write(f"{rows} бронирований: {elapsed:.2f} с (построчно)")
+
+    @staticmethod
+    def cancel_one_by_one():
+        for booking in Booking.objects.expired():
+            booking.cancel()
+
+    @staticmethod
+    def measure(rows, cancel):
+        """
+        Создает rows истекших бронирований, замеряет cancel() и откатывает данные.
+        """
+        with transaction.atomic():
+            client = User.objects.create(email="bench-expiry@example.com")
+            tables = Table.objects.bulk_create(
+                [Table(number=-number, seats=4) for number in range(1, 101)]
+            )
+            yesterday = timezone.localdate() - timedelta(days=1)
+            Booking.objects.bulk_create(
+                [
+                    Booking(
+                        table=tables[index % len(tables)],
+                        client=client,
+                        date_reserved=yesterday - timedelta(days=index // 2000),
+                        time_reserved=time(10 + index % 10),
+                    )
+                    for index in range(rows)
+                ],
+                batch_size=5000,
+            )
+
+            # страховочная проверка не должна пропускаться по watermark
+            cache.delete(WATERMARK_KEY)
+            started = timer.perf_counter()
+            cancel()
+            elapsed = timer.perf_counter() - started
+
+            transaction.set_rollback(True)
+        return elapsed
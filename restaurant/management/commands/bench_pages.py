@@ -0,0 +1,104 @@
+import time as timer
+
+from django.core.cache import cache
+from django.core.management import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+
+# публичные страницы для замера
+PAGES = ("index", "about", "menu", "contacts")
+
+# загрузчики шаблонов без кэширования (шаблоны читаются с диска при каждом запросе)
+UNCACHED_LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+
+CACHED_LOADERS = [("django.template.loaders.cached.Loader", UNCACHED_LOADERS)]
+
+DUMMY_CACHE = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+def templates(loaders):
+    return [
+        {
+            "BACKEND": "django.template.backends.django.DjangoTemplates",
+            "DIRS": [],
+            "OPTIONS": {
+                "context_processors": [
+                    "django.template.context_processors.debug",
+                    "django.template.context_processors.request",
+                    "django.contrib.auth.context_processors.auth",
+                    "django.contrib.messages.context_processors.messages",
+                ],
+                "loaders": loaders,
+            },
+        }
+    ]
+
+
+# конфигурации: название -> переопределяемые настройки
+PROFILES = {
+    "без кэширования": {
+        "TEMPLATES": templates(UNCACHED_LOADERS),
+        "CACHES": DUMMY_CACHE,
+        "PAGE_CACHE_TIMEOUT": 0,
+    },
+    "кэшированный загрузчик шаблонов": {
+        "TEMPLATES": templates(CACHED_LOADERS),
+        "CACHES": DUMMY_CACHE,
+        "PAGE_CACHE_TIMEOUT": 0,
+    },
+    "+ кэш страниц и фрагментов": {
+        "TEMPLATES": templates(CACHED_LOADERS),
+        "CACHES": LOCMEM_CACHE,
+        "PAGE_CACHE_TIMEOUT": 600,
+    },
+}
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочный замер публичных страниц.
+    """
+
+    help = (
+        "Измеряет количество запросов в секунду для публичных страниц "
+        "(анонимный посетитель) без кэширования, с кэшированным загрузчиком "
+        "шаблонов и с кэшем страниц и фрагментов"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Количество запросов к каждой странице (по умолчанию 200)",
+        )
+
+    def handle(self, *args, **options):
+        for name, overrides in PROFILES.items():
+            with override_settings(**overrides):
+                cache.clear()
+                results = [
+                    f"{page} {self.measure(page, options['requests']):.0f}"
+                    for page in PAGES
+                ]
+            self.stdout.write(f"{name}: " + ", ".join(results) + " запросов/с")
+
+    @staticmethod
+    def measure(page, requests):
+        """
+        Возвращает количество запросов в секунду к странице (после прогрева).
+        """
+        client = Client()
+        url = reverse(f"restaurant:{page}")
+        client.get(url)
+
+        started = timer.perf_counter()
+        for _ in range(requests):
+            client.get(url)
+        return requests / (timer.perf_counter() - started)
@@ -0,0 +1,127 @@
+import random
+import statistics
+import time as timer
+from datetime import time, timedelta
+
+from django.core.management import BaseCommand
+from django.utils import timezone
+
+from restaurant.models import Booking, Table
+from restaurant.services.availability import DEFAULT_DURATION
+from restaurant.services.booking import save_booking
+from restaurant.services.datagen import PARTY_SIZES
+from restaurant.services.seating import assign_table, best_fit_score, first_fit_score
+from users.models import User
+
+
+# зал по умолчанию: количество мест -> количество столов
+DEFAULT_FLOOR = {2: 8, 4: 8, 6: 4, 8: 2}
+
+# время начала бронирований вечером
+EVENING_TIMES = [time(hour, minute) for hour in range(17, 21) for minute in (0, 30)]
+
+STRATEGIES = {"best-fit": best_fit_score, "first-fit": first_fit_score}
+
+
+class Command(BaseCommand):
+    """
+    Симуляция автоматического подбора столов на вечер.
+    """
+
+    help = (
+        "Симулирует поток запросов на автоматический подбор стола за вечер и "
+        "выводит загрузку мест, число отказов и задержку подбора. "
+        "Созданные данные удаляются после замера."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=80,
+            help="Количество запросов за вечер (по умолчанию 80)",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=1,
+            help="Начальное значение генератора случайных чисел",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        requests = [
+            (
+                rng.choice(EVENING_TIMES),
+                rng.choices(list(PARTY_SIZES), weights=list(PARTY_SIZES.values()))[0],
+            )
+            for _ in range(options["requests"])
+        ]
+
+        for name, score in STRATEGIES.items():
+            self.simulate(name, score, requests)
+
+    def simulate(self, name, score, requests):
+        """
+        Проводит вечер запросов requests с функцией оценки score и выводит результат.
+        """
+        client = User.objects.create(email="bench-seating@example.com")
+        tables = Table.objects.bulk_create(
+            [
+                Table(number=-(index + 1), seats=seats)
+                for index, seats in enumerate(
+                    seats
+                    for seats, count in DEFAULT_FLOOR.items()
+                    for _ in range(count)
+                )
+            ]
+        )
+        # столы подбираются только из зала симуляции, не из реальных столов
+        floor = Table.objects.filter(pk__in=[table.pk for table in tables])
+        date_reserved = timezone.localdate() + timedelta(days=1)
+        latencies = []
+        seated = rejected = seated_guests = used_seats = 0
+
+        try:
+            for time_reserved, guests in requests:
+                started = timer.perf_counter()
+                table = assign_table(
+                    date_reserved, time_reserved, guests, score=score, tables=floor
+                )
+                latencies.append(timer.perf_counter() - started)
+
+                if table is None:
+                    rejected += 1
+                    continue
+
+                save_booking(
+                    Booking(
+                        table=table,
+                        client=client,
+                        date_reserved=date_reserved,
+                        time_reserved=time_reserved,
+                        guests=guests,
+                    )
+                )
+                seated += 1
+                seated_guests += guests
+                used_seats += table.seats
+        finally:
+            Booking.objects.filter(client=client).delete()
+            floor.delete()
+            client.delete()
+
+        latencies.sort()
+        # вместимость зала в место-часах от первого начала до последнего окончания
+        first, last = EVENING_TIMES[0], EVENING_TIMES[-1]
+        evening_hours = last.hour - first.hour + (last.minute - first.minute) / 60
+        capacity = sum(table.seats for table in tables) * (
+            evening_hours + DEFAULT_DURATION
+        )
+        self.stdout.write(
+            f"{name}: рассажено {seated}, отказов {rejected}, "
+            f"заполнение занятых столов {seated_guests / max(used_seats, 1):.0%}, "
+            f"загрузка мест {seated_guests * DEFAULT_DURATION / capacity:.0%}, "
+            f"подбор p50 {statistics.median(latencies) * 1000:.2f} мс, "
+            f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.2f} мс"
+        )
@@ -0,0 +1,290 @@
+import json
+import statistics
+import time as timer
+from datetime import time, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from restaurant.models import Booking
+from restaurant.services.availability import get_availability_grid, get_table_statuses
+from restaurant.services.booking import cancel_many, save_booking
+from restaurant.services.cache import TABLES_VERSION_KEY, bump_key
+from restaurant.services.datagen import generated_tables, generated_users
+from restaurant.services.expiry import WATERMARK_KEY
+from restaurant.services.occupancy import occupancy_index
+from restaurant.services.seating import assign_table
+from restaurant.services.slots import HOURS_VERSION_KEY, booking_dates, get_window_slots
+from restaurant.tasks import cancel_expired_bookings
+
+
+# каталог результатов замеров по умолчанию
+RESULTS_DIR = Path(settings.BASE_DIR) / "benchmarks"
+
+
+def percentile(values, fraction):
+    """
+    Перцентиль отсортированного списка values (fraction от 0 до 1).
+    """
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def reset_availability():
+    """
+    Холодный старт поиска доступности: индекс занятости и закэшированные
+    часы работы строятся заново (кэш целиком не очищается). Версии меняются
+    напрямую: замер идет в откатываемой транзакции, и функции, сбрасывающие
+    кэш после фиксации транзакции, не сработали бы.
+    """
+    occupancy_index.invalidate()
+    bump_key(HOURS_VERSION_KEY)
+    bump_key(TABLES_VERSION_KEY)
+
+
+def database_info():
+    vendor = connection.vendor
+    if vendor == "postgresql":
+        version = connection.cursor().connection.server_version
+    elif vendor == "sqlite":
+        import sqlite3
+
+        version = sqlite3.sqlite_version
+    else:
+        version = None
+    return {"vendor": vendor, "version": version}
+
+
+class Command(BaseCommand):
+    """
+    Набор микробенчмарков основных операций бронирования.
+    """
+
+    help = (
+        "Замеряет поиск доступности, создание бронирования, список бронирований, "
+        "отмену истекших и массовую отмену бронирований на данных generate_data "
+        "в настроенной БД (SQLite или PostgreSQL). Изменения каждого прогона "
+        "откатываются. Результаты записываются в JSON для сравнения между запусками."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Количество замеров каждой операции (по умолчанию 20)",
+        )
+        parser.add_argument(
+            "--output",
+            help="Файл результатов (по умолчанию benchmarks/bench-<время>.json)",
+        )
+        parser.add_argument(
+            "--compare",
+            help="Файл результатов предыдущего запуска для сравнения",
+        )
+        parser.add_argument(
+            "--only",
+            nargs="*",
+            help="Замерить только указанные операции",
+        )
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat должно быть не меньше 1")
+        if not generated_tables().exists():
+            raise CommandError(
+                "Нет сгенерированных данных: сначала запустите generate_data"
+            )
+
+        benchmarks = self.benchmarks()
+        names = options["only"] or list(benchmarks)
+        unknown = set(names) - set(benchmarks)
+        if unknown:
+            raise CommandError(
+                f"Неизвестные операции: {', '.join(sorted(unknown))}; "
+                f"доступны: {', '.join(benchmarks)}"
+            )
+
+        results = {}
+        for name in names:
+            setup, run = benchmarks[name]
+            results[name] = self.measure(setup, run, options["repeat"])
+            self.stdout.write(
+                f"{name}: p50 {results[name]['p50_ms']:.2f} мс, "
+                f"p95 {results[name]['p95_ms']:.2f} мс, "
+                f"запросов к БД {results[name]['queries']}"
+            )
+
+        report = {
+            "created_at": timezone.now().isoformat(),
+            "database": database_info(),
+            "data": self.data_size(),
+            "repeat": options["repeat"],
+            "results": results,
+        }
+        output = Path(
+            options["output"]
+            or RESULTS_DIR / f"bench-{timezone.now():%Y%m%d-%H%M%S}.json"
+        )
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+        self.stdout.write(f"Результаты записаны в {output}")
+
+        if options["compare"]:
+            self.compare(json.loads(Path(options["compare"]).read_text()), report)
+
+    @staticmethod
+    def measure(setup, run, repeat):
+        """
+        Выполняет run() repeat раз после прогрева, каждый раз в транзакции,
+        которая откатывается. setup() выполняется перед каждым прогоном
+        в той же транзакции и в замер не входит. Количество запросов к БД
+        считается в прогревочном прогоне.
+        """
+        timings = []
+        queries = 0
+        for index in range(repeat + 1):
+            with transaction.atomic():
+                setup()
+                if index == 0:
+                    with CaptureQueriesContext(connection) as captured:
+                        run()
+                    queries = len(captured)
+                else:
+                    started = timer.perf_counter()
+                    run()
+                    timings.append((timer.perf_counter() - started) * 1000)
+                transaction.set_rollback(True)
+
+        timings.sort()
+        return {
+            "queries": queries,
+            "min_ms": timings[0],
+            "p50_ms": statistics.median(timings),
+            "p95_ms": percentile(timings, 0.95),
+            "max_ms": timings[-1],
+            "mean_ms": statistics.mean(timings),
+        }
+
+    @staticmethod
+    def data_size():
+        tables = generated_tables()
+        bookings = Booking.objects.filter(table__in=tables)
+        return {
+            "tables": tables.count(),
+            "users": generated_users().count(),
+            "bookings": bookings.filter(is_active=True).count(),
+            "cancelled": bookings.filter(is_active=False).count(),
+        }
+
+    def benchmarks(self):
+        """
+        Операции для замера: {название: (подготовка, замеряемая операция)}.
+        """
+        dates = booking_dates()
+        tables = generated_tables()
+        # самая загруженная дата и самый активный гость
+        busiest = (
+            Booking.objects.active()
+            .filter(table__in=tables, date_reserved__in=dates)
+            .values("date_reserved")
+            .annotate(count=Count("pk"))
+            .order_by("-count")
+            .first()
+        )
+        busiest_date = busiest["date_reserved"] if busiest else dates[0]
+        client = (
+            generated_users()
+            .annotate(active=Count("bookings", filter=Q(bookings__is_active=True)))
+            .order_by("-active")
+            .first()
+        )
+        http = Client()
+        booking_list_url = reverse("restaurant:booking_list")
+
+        def nothing():
+            pass
+
+        def login():
+            # сессия создается в откатываемой транзакции замера
+            http.force_login(client)
+
+        def availability_search():
+            day_slots, times = get_window_slots(dates)
+            get_availability_grid(dates, times)
+
+        def table_statuses():
+            get_table_statuses(busiest_date, time(19, 0))
+
+        def create_booking():
+            # наименее популярное время последнего дня окна
+            date_reserved, time_reserved = dates[-1], time(10, 0)
+            table = assign_table(date_reserved, time_reserved, 2)
+            if table is None:
+                raise CommandError("Нет свободного стола для замера создания")
+            save_booking(
+                Booking(
+                    table=table,
+                    client=client,
+                    date_reserved=date_reserved,
+                    time_reserved=time_reserved,
+                    guests=2,
+                )
+            )
+
+        def booking_list():
+            response = http.get(booking_list_url)
+            if response.status_code != 200:
+                raise CommandError(
+                    f"Список бронирований вернул статус {response.status_code}"
+                )
+
+        def end_busiest_date():
+            # бронирования самой загруженной даты уже закончились; начало
+            # сдвигается вместе с окончанием: пустые интервалы не пересекаются
+            # (ограничение booking_no_overlap на PostgreSQL)
+            ended = timezone.now() - timedelta(minutes=1)
+            Booking.objects.active().filter(
+                table__in=tables, date_reserved=busiest_date
+            ).update(starts_at=ended, ends_at=ended)
+            cache.delete(WATERMARK_KEY)
+
+        def expire_bookings():
+            cancel_expired_bookings()
+
+        def cancel_date():
+            cancel_many(
+                Booking.objects.filter(table__in=tables, date_reserved=busiest_date)
+            )
+
+        return {
+            "availability_search": (reset_availability, availability_search),
+            "table_statuses": (reset_availability, table_statuses),
+            "booking_create": (nothing, create_booking),
+            "booking_list": (login, booking_list),
+            "expiry": (end_busiest_date, expire_bookings),
+            "cancellation": (nothing, cancel_date),
+        }
+
+    def compare(self, previous, current):
+        """
+        Выводит изменение медианы каждой операции относительно previous.
+        """
+        self.stdout.write(f"Сравнение с запуском {previous['created_at']}:")
+        for name, result in current["results"].items():
+            before = previous["results"].get(name)
+            if before is None:
+                self.stdout.write(f"{name}: нет в предыдущем запуске")
+                continue
+            change = (result["p50_ms"] - before["p50_ms"]) / before["p50_ms"]
+            self.stdout.write(
+                f"{name}: p50 {before['p50_ms']:.2f} -> {result['p50_ms']:.2f} мс "
+                f"({change:+.0%}), запросов {before['queries']} -> {result['queries']}"
+            )
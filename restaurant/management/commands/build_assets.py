@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management import BaseCommand, call_command
+
+from restaurant.services.assets import compress_static, write_bundles
+from restaurant.services.images import write_responsive_images
+
+
+class Command(BaseCommand):
+    """
+    Сборка статических файлов для продакшена.
+    """
+
+    help = (
+        "Собирает CSS и JS base.html в сжатые наборы, создает адаптивные "
+        "варианты изображений, выполняет collectstatic "
+        "(имена с хэшем содержимого при ManifestStaticFilesStorage) и создает "
+        "сжатые копии .gz/.br файлов в STATIC_ROOT"
+    )
+
+    def handle(self, *args, **options):
+        for path in write_bundles():
+            self.stdout.write(f"Сборка: {path} ({path.stat().st_size} байт)")
+        images = write_responsive_images()
+        self.stdout.write(f"Адаптивных изображений: {len(images)}")
+
+        call_command("collectstatic", interactive=False, verbosity=0)
+        compressed = compress_static()
+        self.stdout.write(f"Сжатых копий: {len(compressed)}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Статические файлы собраны в {settings.STATIC_ROOT}")
+        )
@@ -0,0 +1,19 @@
+from django.core.management import BaseCommand
+
+from restaurant.services.images import write_responsive_images
+
+
+class Command(BaseCommand):
+    """
+    Создание адаптивных вариантов статических изображений.
+    """
+
+    help = (
+        "Создает уменьшенные варианты (WebP и JPEG) больших статических "
+        "изображений для srcset"
+    )
+
+    def handle(self, *args, **options):
+        for path, widths in write_responsive_images().items():
+            self.stdout.write(f"{path}: {', '.join(map(str, widths))}")
+        self.stdout.write(self.style.SUCCESS("Варианты изображений созданы"))
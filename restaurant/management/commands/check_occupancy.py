@@ -0,0 +1,52 @@
+from datetime import date
+
+from django.core.management import BaseCommand, CommandError
+
+from restaurant.services.occupancy import (
+    SLOT_MINUTES,
+    RedisOccupancyIndex,
+    booking_window,
+    check_consistency,
+    occupancy_index,
+)
+
+
+class Command(BaseCommand):
+    """
+    Проверка согласованности индекса занятости столов с БД.
+    """
+
+    help = "Сравнивает индекс занятости столов с данными БД"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            type=date.fromisoformat,
+            action="append",
+            help="Дата в формате ГГГГ-ММ-ДД (по умолчанию - ближайшая неделя)",
+        )
+
+    def handle(self, *args, **options):
+        if not isinstance(occupancy_index, RedisOccupancyIndex):
+            # индекс в памяти нового процесса строится из той же БД
+            # и всегда с ней совпадает - проверка ничего бы не доказала
+            raise CommandError(
+                "Индекс занятости хранится в памяти процесса: проверка возможна "
+                "только для общего индекса (задайте OCCUPANCY_REDIS_URL)"
+            )
+
+        mismatches = check_consistency(options["date"] or booking_window())
+
+        for date_reserved, table_id, indexed, actual in mismatches:
+            slots = [
+                f"{slot * SLOT_MINUTES // 60:02d}:{slot * SLOT_MINUTES % 60:02d}"
+                for slot in range(len(actual))
+                if bool(indexed[slot]) != bool(actual[slot])
+            ]
+            self.stdout.write(
+                f"{date_reserved}: стол id={table_id}, расхождения в слотах {', '.join(slots) or '-'}"
+            )
+
+        if mismatches:
+            raise CommandError(f"Найдено расхождений: {len(mismatches)}")
+        self.stdout.write(self.style.SUCCESS("Индекс занятости согласован с БД"))
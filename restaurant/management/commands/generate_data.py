@@ -0,0 +1,94 @@
+import time as timer
+
+from django.core.management import BaseCommand
+
+from restaurant.services.datagen import clear_generated_data, generate_data
+
+
+class Command(BaseCommand):
+    """
+    Генерация синтетических данных для нагрузочных замеров.
+    """
+
+    help = (
+        "Создает столы, пользователей, действующие бронирования и историю "
+        "с реалистичным распределением дат, времени и размера компаний "
+        "(bulk_create). Сгенерированные ранее данные заменяются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tables",
+            type=int,
+            default=50,
+            help="Количество столов (по умолчанию 50)",
+        )
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=1000,
+            help="Количество пользователей (по умолчанию 1000)",
+        )
+        parser.add_argument(
+            "--bookings",
+            type=int,
+            default=2000,
+            help=(
+                "Количество действующих бронирований (по умолчанию 2000); "
+                "бронирования, для которых не нашлось свободного стола, пропускаются"
+            ),
+        )
+        parser.add_argument(
+            "--history",
+            type=int,
+            default=20000,
+            help="Количество прошедших бронирований в истории (по умолчанию 20000)",
+        )
+        parser.add_argument(
+            "--days-ahead",
+            type=int,
+            default=14,
+            help="На сколько дней вперед создаются бронирования (по умолчанию 14)",
+        )
+        parser.add_argument(
+            "--days-back",
+            type=int,
+            default=365,
+            help="За сколько дней создается история (по умолчанию 365)",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=1,
+            help="Начальное значение генератора случайных чисел",
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Только удалить сгенерированные ранее данные",
+        )
+
+    def handle(self, *args, **options):
+        started = timer.perf_counter()
+        if options["clear"]:
+            deleted = clear_generated_data()
+            self.stdout.write(
+                "Удалено: "
+                + ", ".join(f"{name} {count}" for name, count in deleted.items())
+            )
+            return
+
+        created = generate_data(
+            tables=options["tables"],
+            users=options["users"],
+            bookings=options["bookings"],
+            history=options["history"],
+            days_ahead=options["days_ahead"],
+            days_back=options["days_back"],
+            seed=options["seed"],
+        )
+        self.stdout.write(
+            "Создано: "
+            + ", ".join(f"{name} {count}" for name, count in created.items())
+            + f" за {timer.perf_counter() - started:.1f} с"
+        )
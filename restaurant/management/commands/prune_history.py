@@ -0,0 +1,32 @@
+from django.core.management import BaseCommand
+
+from restaurant.services.history import RETENTION_BATCH_SIZE, prune_history
+
+
+class Command(BaseCommand):
+    """
+    Обслуживание архива истории бронирований.
+    """
+
+    help = (
+        "Создает партиции архива истории на ближайшие месяцы, переносит в архив "
+        "старые отмены и удаляет архив старше срока хранения"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=RETENTION_BATCH_SIZE,
+            help=f"Количество строк в одной транзакции (по умолчанию {RETENTION_BATCH_SIZE})",
+        )
+
+    def handle(self, *args, **options):
+        result = prune_history(options["batch_size"])
+        self.stdout.write(
+            f"Создано партиций: {result['created_partitions']}, "
+            f"перенесено в архив: {result['archived']}, "
+            f"удалено партиций: {result['dropped_partitions']}, "
+            f"удалено записей: {result['deleted_rows']}"
+        )
+        self.stdout.write(self.style.SUCCESS("Архив истории обслужен"))
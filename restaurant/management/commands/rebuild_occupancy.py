@@ -0,0 +1,28 @@
+from datetime import date
+
+from django.core.management import BaseCommand
+
+from restaurant.services.occupancy import booking_window, occupancy_index
+
+
+class Command(BaseCommand):
+    """
+    Перестроение индекса занятости столов по данным БД.
+    """
+
+    help = "Перестраивает индекс занятости столов (зеркало в Redis) по данным БД"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date",
+            type=date.fromisoformat,
+            action="append",
+            help="Дата в формате ГГГГ-ММ-ДД (по умолчанию - ближайшая неделя)",
+        )
+
+    def handle(self, *args, **options):
+        for date_reserved in options["date"] or booking_window():
+            day = occupancy_index.rebuild(date_reserved)
+            self.stdout.write(f"{date_reserved}: занятых столов - {len(day)}")
+
+        self.stdout.write(self.style.SUCCESS("Индекс занятости перестроен"))
@@ -0,0 +1,132 @@
+from functools import partial
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.utils import timezone
+
+from restaurant.services.booking import cancellation_message
+from restaurant.services.cache import bump_versions
+from restaurant.services.mail import enqueue_messages
+from restaurant.services.occupancy import occupancy_index
+
+
+find_overlaps = import_module(
+    "restaurant.migrations.0005_booking_no_overlap"
+).find_overlaps
+
+
+def applied_apps():
+    """
+    Модели в состоянии последних примененных миграций restaurant и приложения
+    пользователей: команда запускается и до миграции 0005, когда схема БД
+    отстает от кода моделей.
+    """
+    loader = MigrationExecutor(connection).loader
+    nodes = [
+        max(key for key in loader.applied_migrations if key[0] == app_label)
+        for app_label in ("restaurant", settings.AUTH_USER_MODEL.split(".")[0])
+    ]
+    return loader.project_state(nodes).apps
+
+
+class Command(BaseCommand):
+    """
+    Поиск и отмена пересекающихся активных бронирований одного стола.
+    """
+
+    help = (
+        "Находит активные бронирования, пересекающиеся с созданным раньше "
+        "бронированием того же стола (мешают миграции 0005_booking_no_overlap). "
+        "С --cancel отменяет их с записью в историю и письмами клиентам"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--cancel",
+            action="store_true",
+            help="Отменить найденные бронирования (по умолчанию - только вывести)",
+        )
+
+    def handle(self, *args, **options):
+        apps = applied_apps()
+        Booking = apps.get_model("restaurant", "Booking")
+        overlaps = find_overlaps(Booking.objects.all())
+        if not overlaps:
+            self.stdout.write(self.style.SUCCESS("Пересекающихся бронирований нет"))
+            return
+
+        bookings = list(
+            Booking.objects.filter(pk__in=overlaps)
+            .select_related("table", "client")
+            .order_by("pk")
+        )
+        for booking in bookings:
+            self.stdout.write(
+                f"id={booking.pk}: стол №{booking.table.number}, "
+                f"{booking.date_reserved} {booking.time_reserved:%H:%M}, "
+                f"клиент {booking.client.email if booking.client else '-'}"
+            )
+
+        if not options["cancel"]:
+            raise CommandError(
+                f"Найдено пересекающихся бронирований: {len(bookings)} "
+                "(для отмены запустите команду с --cancel)"
+            )
+
+        self.cancel(apps, bookings)
+        self.stdout.write(self.style.SUCCESS(f"Отменено бронирований: {len(bookings)}"))
+
+    @staticmethod
+    def cancel(apps, bookings):
+        """
+        Отменяет бронирования так, как это принято в примененной схеме:
+        мягкая отмена (начиная с 0009_booking_soft_cancel) или перенос
+        в историю с удалением. Клиентам еще не закончившихся бронирований
+        ставятся в очередь письма об отмене.
+        """
+        Booking = apps.get_model("restaurant", "Booking")
+        BookingHistory = apps.get_model("restaurant", "BookingHistory")
+        now = timezone.now()
+        pks = [booking.pk for booking in bookings]
+
+        with transaction.atomic():
+            if any(field.name == "cancelled_at" for field in Booking._meta.fields):
+                Booking.objects.filter(pk__in=pks).update(
+                    is_active=False, cancelled_at=now
+                )
+            else:
+                fields = [
+                    field.attname
+                    for field in BookingHistory._meta.concrete_fields
+                    if not field.primary_key and field.name != "cancelled_at"
+                ]
+                records = BookingHistory.objects.bulk_create(
+                    BookingHistory(
+                        cancelled_at=now,
+                        **{field: getattr(booking, field) for field in fields},
+                    )
+                    for booking in bookings
+                )
+                # auto_now_add перезаписывает время создания - восстанавливаем его
+                for record, booking in zip(records, bookings):
+                    record.created_at = booking.created_at
+                BookingHistory.objects.bulk_update(records, ["created_at"])
+                Booking.objects.filter(pk__in=pks).delete()
+
+            dates = {booking.date_reserved for booking in bookings}
+            transaction.on_commit(partial(occupancy_index.forget, dates))
+            bump_versions(dates)
+            enqueue_messages(
+                cancellation_message(
+                    booking.date_reserved,
+                    booking.time_reserved,
+                    booking.table.number,
+                    booking.client.email,
+                    booking.client.first_name,
+                )
+                for booking in bookings
+                if booking.ends_at > now and booking.client and booking.client.email
+            )
@@ -0,0 +1,157 @@
+import heapq
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from django.utils import timezone
+
+from restaurant.services.metrics import VIEW_DB_TIME, VIEW_LATENCY, VIEW_QUERIES
+from restaurant.services.timing import (
+    SLOW_REQUEST_QUERIES,
+    collect_timings,
+    record_slow_request,
+    redact_sql,
+    slow_request_threshold,
+)
+
+
+class QueryCounter:
+    """
+    Обертка выполнения запросов к БД: считает запросы и их суммарное время,
+    а также запоминает keep_slowest самых медленных запросов (SQL без параметров).
+    """
+
+    def __init__(self, keep_slowest=0):
+        self.count = 0
+        self.duration = 0.0
+        self.keep_slowest = keep_slowest
+        self.slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.duration += duration
+            if self.keep_slowest:
+                item = (duration, self.count, sql)
+                if len(self.slowest) < self.keep_slowest:
+                    heapq.heappush(self.slowest, item)
+                else:
+                    heapq.heappushpop(self.slowest, item)
+
+    def slowest_queries(self):
+        """
+        Самые медленные запросы: [(время, SQL)], начиная с самого медленного.
+        """
+        return [
+            (duration, sql) for duration, _, sql in sorted(self.slowest, reverse=True)
+        ]
+
+
+@contextmanager
+def count_queries(queries):
+    """
+    Подключает счетчик queries ко всем соединениям с БД внутри блока.
+    """
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(queries))
+        yield queries
+
+
+def view_label(request):
+    """
+    Имя маршрута запроса для меток метрик (не путь, чтобы число
+    временных рядов не зависело от параметров URL).
+    """
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match else "<unresolved>"
+
+
+class MetricsMiddleware:
+    """
+    Записывает в метрики Prometheus время обработки запроса,
+    количество и время запросов к БД по представлениям.
+    Подключается первым в MIDDLEWARE, чтобы учитывать все остальные.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with count_queries(QueryCounter()) as queries:
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        view = view_label(request)
+        VIEW_LATENCY.labels(view, request.method, response.status_code).observe(
+            duration
+        )
+        VIEW_QUERIES.labels(view).observe(queries.count)
+        VIEW_DB_TIME.labels(view).observe(queries.duration)
+        return response
+
+
+def server_timing(durations):
+    """
+    Значение заголовка Server-Timing из {этап: (время в секундах, описание)}.
+    """
+    metrics = []
+    for stage, (duration, description) in durations.items():
+        metric = f"{stage};dur={duration * 1000:.1f}"
+        if description:
+            metric += f';desc="{description}"'
+        metrics.append(metric)
+    return ", ".join(metrics)
+
+
+class ServerTimingMiddleware:
+    """
+    Замеряет время запросов к БД, отрисовки шаблонов и отправки почты
+    и передает его в заголовке Server-Timing. Запросы дольше
+    SLOW_REQUEST_THRESHOLD_MS сохраняются в буфер медленных запросов
+    вместе с самыми медленными SQL-запросами.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with collect_timings() as timings, count_queries(
+            QueryCounter(keep_slowest=SLOW_REQUEST_QUERIES)
+        ) as queries:
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+
+        stages = {"db": (queries.duration, f"{queries.count} queries")}
+        stages.update(
+            (stage, (duration, None)) for stage, duration in timings.durations.items()
+        )
+        stages["total"] = (total, None)
+        response["Server-Timing"] = server_timing(stages)
+
+        if total >= slow_request_threshold():
+            record_slow_request(
+                {
+                    "at": timezone.now(),
+                    "method": request.method,
+                    "path": request.path,
+                    "view": view_label(request),
+                    "status": response.status_code,
+                    "stages": {
+                        stage: duration * 1000
+                        for stage, (duration, _) in stages.items()
+                    },
+                    "queries": queries.count,
+                    "slowest_queries": [
+                        (duration * 1000, redact_sql(sql))
+                        for duration, sql in queries.slowest_queries()
+                    ],
+                }
+            )
+        return response
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurant", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="booking",
+            name="expiry_task_id",
+            field=models.CharField(
+                blank=True,
+                max_length=255,
+                null=True,
+                verbose_name="Задача отмены по истечении",
+            ),
+        ),
+    ]
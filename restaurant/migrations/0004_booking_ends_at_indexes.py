@@ -0,0 +1,121 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:42
+
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import migrations, models, transaction
+from django.utils import timezone
+
+
+# количество бронирований, обновляемых в одной транзакции
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_ends_at(apps, schema_editor):
+    """
+    Заполняет время окончания существующих бронирований пачками,
+    каждая пачка - в отдельной короткой транзакции.
+    """
+    Booking = apps.get_model("restaurant", "Booking")
+    using = schema_editor.connection.alias
+    last_pk = 0
+
+    while True:
+        with transaction.atomic(using=using):
+            batch = list(
+                Booking.objects.using(using)
+                .filter(pk__gt=last_pk, ends_at__isnull=True)
+                .order_by("pk")[:BACKFILL_BATCH_SIZE]
+            )
+            if not batch:
+                return
+
+            for booking in batch:
+                start = timezone.make_aware(
+                    datetime.combine(booking.date_reserved, booking.time_reserved)
+                )
+                booking.ends_at = start + timedelta(hours=booking.duration)
+            Booking.objects.using(using).bulk_update(batch, ["ends_at"])
+
+        last_pk = batch[-1].pk
+
+
+class AddIndexConcurrently(migrations.AddIndex):
+    """
+    Создание индекса, на PostgreSQL - без блокировки записи в таблицу
+    (CREATE INDEX CONCURRENTLY).
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.add_index(model, self.index, concurrently=True)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return super().database_backwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.remove_index(model, self.index, concurrently=True)
+
+
+class Migration(migrations.Migration):
+
+    # индексы создаются конкурентно, а заполнение идет пачками вне общей транзакции
+    atomic = False
+
+    dependencies = [
+        ("restaurant", "0003_booking_expiry_task_id"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="booking",
+            name="ends_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="Время окончания бронирования"
+            ),
+        ),
+        migrations.RunPython(backfill_ends_at, migrations.RunPython.noop),
+        AddIndexConcurrently(
+            model_name="booking",
+            index=models.Index(
+                fields=["table", "date_reserved", "time_reserved"],
+                name="booking_table_slot_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="booking",
+            index=models.Index(
+                fields=["date_reserved", "time_reserved"], name="booking_date_slot_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="booking",
+            index=models.Index(
+                fields=["client", "date_reserved", "time_reserved"],
+                name="booking_client_slot_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="booking",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["ends_at"],
+                name="booking_active_ends_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="bookinghistory",
+            index=models.Index(
+                fields=["client", "-cancelled_at"], name="history_client_cancelled_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,134 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:02
+
+from datetime import timedelta
+
+from django.core.management import CommandError
+from django.db import migrations, models, transaction
+
+
+# количество бронирований, обновляемых в одной транзакции
+BACKFILL_BATCH_SIZE = 1000
+
+# исключающее ограничение: активные бронирования одного стола не пересекаются по времени
+CREATE_EXCLUSION_CONSTRAINT = """
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+ALTER TABLE restaurant_booking
+    ADD CONSTRAINT booking_no_overlap
+    EXCLUDE USING gist (
+        table_id WITH =,
+        tstzrange(starts_at, ends_at, '[)') WITH &&
+    )
+    WHERE (is_active AND table_id IS NOT NULL);
+"""
+
+DROP_EXCLUSION_CONSTRAINT = """
+ALTER TABLE restaurant_booking DROP CONSTRAINT IF EXISTS booking_no_overlap;
+"""
+
+
+def backfill_starts_at(apps, schema_editor):
+    """
+    Заполняет время начала существующих бронирований пачками,
+    каждая пачка - в отдельной короткой транзакции.
+    """
+    Booking = apps.get_model("restaurant", "Booking")
+    using = schema_editor.connection.alias
+    last_pk = 0
+
+    while True:
+        with transaction.atomic(using=using):
+            batch = list(
+                Booking.objects.using(using)
+                .filter(pk__gt=last_pk, starts_at__isnull=True)
+                .order_by("pk")[:BACKFILL_BATCH_SIZE]
+            )
+            if not batch:
+                return
+
+            for booking in batch:
+                booking.starts_at = booking.ends_at - timedelta(hours=booking.duration)
+            Booking.objects.using(using).bulk_update(batch, ["starts_at"])
+
+        last_pk = batch[-1].pk
+
+
+def find_overlaps(bookings):
+    """
+    Возвращает id активных бронирований, пересекающихся по времени
+    с бронированием того же стола, созданным раньше (с меньшим id).
+    Время начала рассчитывается по ends_at и duration, поэтому функция
+    работает и со схемой до добавления starts_at.
+    """
+    overlaps = []
+    accepted = {}
+    for pk, table_id, ends_at, duration in (
+        bookings.filter(is_active=True, table__isnull=False, ends_at__isnull=False)
+        .order_by("pk")
+        .values_list("pk", "table_id", "ends_at", "duration")
+        .iterator()
+    ):
+        starts_at = ends_at - timedelta(hours=duration)
+        intervals = accepted.setdefault(table_id, [])
+        if any(starts_at < end and start < ends_at for start, end in intervals):
+            overlaps.append(pk)
+        else:
+            intervals.append((starts_at, ends_at))
+    return overlaps
+
+
+def check_overlaps(apps, schema_editor):
+    """
+    Останавливает миграцию, если ограничение booking_no_overlap нельзя создать:
+    ADD CONSTRAINT ... EXCLUDE не поддерживает NOT VALID и проверяет все строки.
+    Бронирования клиентов миграция не отменяет - это делает команда
+    resolve_booking_overlaps --cancel (с записью в историю и письмами клиентам).
+    Проверка идет до изменения схемы: миграция не атомарна и иначе
+    осталась бы примененной частично.
+    """
+    Booking = apps.get_model("restaurant", "Booking")
+    overlaps = find_overlaps(Booking.objects.using(schema_editor.connection.alias))
+    if overlaps:
+        raise CommandError(
+            f"Найдены пересекающиеся активные бронирования ({len(overlaps)}): "
+            f"{', '.join(map(str, overlaps))}. Отмените их командой "
+            "python manage.py resolve_booking_overlaps --cancel "
+            "и повторите миграцию"
+        )
+
+
+class RunPostgresSQL(migrations.RunSQL):
+    """
+    SQL, выполняемый только на PostgreSQL (на остальных СУБД пересечения
+    бронирований исключаются блокировкой при создании бронирования).
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    # заполнение идет пачками вне общей транзакции
+    atomic = False
+
+    dependencies = [
+        ("restaurant", "0004_booking_ends_at_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(check_overlaps, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name="booking",
+            name="starts_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="Время начала бронирования"
+            ),
+        ),
+        migrations.RunPython(backfill_starts_at, migrations.RunPython.noop),
+        RunPostgresSQL(CREATE_EXCLUSION_CONSTRAINT, DROP_EXCLUSION_CONSTRAINT),
+    ]
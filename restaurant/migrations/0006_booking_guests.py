@@ -0,0 +1,32 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:40
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurant", "0005_booking_no_overlap"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="booking",
+            name="guests",
+            field=models.PositiveIntegerField(
+                default=2,
+                validators=[django.core.validators.MinValueValidator(1)],
+                verbose_name="Количество гостей",
+            ),
+        ),
+        migrations.AddField(
+            model_name="bookinghistory",
+            name="guests",
+            field=models.PositiveIntegerField(
+                default=2,
+                validators=[django.core.validators.MinValueValidator(1)],
+                verbose_name="Количество гостей",
+            ),
+        ),
+    ]
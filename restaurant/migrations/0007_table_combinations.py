@@ -0,0 +1,32 @@
+# Generated by Django 5.1.4 on 2026-10-18 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurant", "0006_booking_guests"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="booking",
+            name="group",
+            field=models.UUIDField(
+                blank=True,
+                db_index=True,
+                null=True,
+                verbose_name="Группа объединенных столов",
+            ),
+        ),
+        migrations.AddField(
+            model_name="table",
+            name="combinable_with",
+            field=models.ManyToManyField(
+                blank=True,
+                to="restaurant.table",
+                verbose_name="Можно объединить со столами",
+            ),
+        ),
+    ]
@@ -0,0 +1,110 @@
+# Generated by Django 5.1.4 on 2026-10-18 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurant", "0007_table_combinations"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OpeningHours",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "opens_at",
+                    models.TimeField(
+                        blank=True, null=True, verbose_name="Начало бронирования"
+                    ),
+                ),
+                (
+                    "last_booking_at",
+                    models.TimeField(
+                        blank=True,
+                        null=True,
+                        verbose_name="Последнее время бронирования",
+                    ),
+                ),
+                (
+                    "is_closed",
+                    models.BooleanField(default=False, verbose_name="Ресторан закрыт"),
+                ),
+                (
+                    "weekday",
+                    models.PositiveSmallIntegerField(
+                        choices=[
+                            (0, "Понедельник"),
+                            (1, "Вторник"),
+                            (2, "Среда"),
+                            (3, "Четверг"),
+                            (4, "Пятница"),
+                            (5, "Суббота"),
+                            (6, "Воскресенье"),
+                        ],
+                        unique=True,
+                        verbose_name="День недели",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Часы работы",
+                "verbose_name_plural": "Часы работы",
+                "ordering": ["weekday"],
+            },
+        ),
+        migrations.CreateModel(
+            name="SpecialDay",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "opens_at",
+                    models.TimeField(
+                        blank=True, null=True, verbose_name="Начало бронирования"
+                    ),
+                ),
+                (
+                    "last_booking_at",
+                    models.TimeField(
+                        blank=True,
+                        null=True,
+                        verbose_name="Последнее время бронирования",
+                    ),
+                ),
+                (
+                    "is_closed",
+                    models.BooleanField(default=False, verbose_name="Ресторан закрыт"),
+                ),
+                ("date", models.DateField(unique=True, verbose_name="Дата")),
+                (
+                    "description",
+                    models.CharField(
+                        blank=True, max_length=255, verbose_name="Описание"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Особый день",
+                "verbose_name_plural": "Особые дни",
+                "ordering": ["date"],
+            },
+        ),
+    ]
@@ -0,0 +1,137 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:05
+
+from datetime import datetime, timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.db import migrations, models, transaction
+from django.utils import timezone
+
+
+AddIndexConcurrently = import_module(
+    "restaurant.migrations.0004_booking_ends_at_indexes"
+).AddIndexConcurrently
+
+# количество записей истории, переносимых в одной транзакции
+FOLD_BATCH_SIZE = 1000
+
+# поля, общие для бронирования и записи истории
+HISTORY_FIELDS = (
+    "table_id",
+    "client_id",
+    "date_reserved",
+    "time_reserved",
+    "duration",
+    "guests",
+    "message",
+    "created_at",
+    "cancelled_at",
+)
+
+
+def fold_history(apps, schema_editor):
+    """
+    Переносит записи BookingHistory в таблицу бронирований как отмененные
+    бронирования пачками, каждая пачка - в отдельной короткой транзакции.
+    """
+    Booking = apps.get_model("restaurant", "Booking")
+    BookingHistory = apps.get_model("restaurant", "BookingHistory")
+    using = schema_editor.connection.alias
+
+    while True:
+        with transaction.atomic(using=using):
+            batch = list(
+                BookingHistory.objects.using(using).order_by("pk")[:FOLD_BATCH_SIZE]
+            )
+            if not batch:
+                return
+
+            bookings = []
+            for record in batch:
+                booking = Booking(
+                    is_active=False,
+                    **{field: getattr(record, field) for field in HISTORY_FIELDS},
+                )
+                booking.starts_at = timezone.make_aware(
+                    datetime.combine(record.date_reserved, record.time_reserved)
+                )
+                booking.ends_at = booking.starts_at + timedelta(hours=record.duration)
+                bookings.append(booking)
+            bookings = Booking.objects.using(using).bulk_create(bookings)
+
+            # auto_now_add перезаписывает время создания - восстанавливаем его
+            for booking, record in zip(bookings, batch):
+                booking.created_at = record.created_at
+            Booking.objects.using(using).bulk_update(bookings, ["created_at"])
+
+            BookingHistory.objects.using(using).filter(
+                pk__in=[record.pk for record in batch]
+            ).delete()
+
+
+def unfold_history(apps, schema_editor):
+    """
+    Возвращает отмененные бронирования в BookingHistory.
+    """
+    Booking = apps.get_model("restaurant", "Booking")
+    BookingHistory = apps.get_model("restaurant", "BookingHistory")
+    using = schema_editor.connection.alias
+
+    while True:
+        with transaction.atomic(using=using):
+            batch = list(
+                Booking.objects.using(using)
+                .filter(is_active=False)
+                .order_by("pk")[:FOLD_BATCH_SIZE]
+            )
+            if not batch:
+                return
+
+            records = []
+            for booking in batch:
+                record = BookingHistory(
+                    **{field: getattr(booking, field) for field in HISTORY_FIELDS}
+                )
+                # у бронирований, отмененных до мягкой отмены, нет времени отмены
+                record.cancelled_at = booking.cancelled_at or booking.ends_at
+                records.append(record)
+            records = BookingHistory.objects.using(using).bulk_create(records)
+
+            # auto_now_add перезаписывает время создания - восстанавливаем его
+            for record, booking in zip(records, batch):
+                record.created_at = booking.created_at
+            BookingHistory.objects.using(using).bulk_update(records, ["created_at"])
+
+            Booking.objects.using(using).filter(
+                pk__in=[booking.pk for booking in batch]
+            ).delete()
+
+
+class Migration(migrations.Migration):
+
+    # индекс создается конкурентно, а перенос идет пачками вне общей транзакции
+    atomic = False
+
+    dependencies = [
+        ("restaurant", "0008_opening_hours"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="booking",
+            name="cancelled_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="Время отмены бронирования"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="booking",
+            index=models.Index(
+                condition=models.Q(("is_active", False)),
+                fields=["client", "-cancelled_at"],
+                name="booking_client_cancelled_idx",
+            ),
+        ),
+        migrations.RunPython(fold_history, unfold_history),
+    ]
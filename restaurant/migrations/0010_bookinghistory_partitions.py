@@ -0,0 +1,163 @@
+# Generated by Django 5.1.4 on 2026-10-18 15:20
+
+from datetime import date, datetime
+from importlib import import_module
+
+from django.db import migrations
+from django.utils import timezone
+
+
+RunPostgresSQL = import_module(
+    "restaurant.migrations.0005_booking_no_overlap"
+).RunPostgresSQL
+
+# на сколько месяцев вперед создаются партиции
+PARTITIONS_AHEAD = 2
+
+# архив истории разбивается на помесячные партиции по времени отмены;
+# первичный ключ партиционированной таблицы должен включать ключ разбиения.
+#
+# Состояние модели сохраняет первичный ключ id: Django 5.1 не описывает
+# составные ключи, а для ORM это безопасно - id по-прежнему уникален
+# (все записи получают его из одной последовательности, явно id никто
+# не задает, а перенос в архив вставляет строки без id), выборки и удаление
+# по pk идут по индексу первичного ключа (id, cancelled_at), а внешних
+# ключей на историю нет.
+#
+# Столбец id получает значение по умолчанию из последовательности, а не
+# IDENTITY: столбцы IDENTITY у партиционированных таблиц ведут себя
+# по-разному в разных версиях PostgreSQL (до 17 партиции их не наследуют).
+CREATE_PARTITIONED_TABLE = """
+ALTER TABLE restaurant_bookinghistory RENAME TO restaurant_bookinghistory_old;
+ALTER TABLE restaurant_bookinghistory_old
+    RENAME CONSTRAINT restaurant_bookinghistory_pkey TO restaurant_bookinghistory_old_pkey;
+ALTER INDEX history_client_cancelled_idx RENAME TO history_client_cancelled_old_idx;
+ALTER INDEX IF EXISTS history_table_idx RENAME TO history_table_old_idx;
+-- последовательность IDENTITY старой таблицы удаляется и освобождает имя
+ALTER TABLE restaurant_bookinghistory_old ALTER COLUMN id DROP IDENTITY IF EXISTS;
+
+CREATE TABLE restaurant_bookinghistory (
+    LIKE restaurant_bookinghistory_old
+) PARTITION BY RANGE (cancelled_at);
+CREATE SEQUENCE restaurant_bookinghistory_id_seq
+    OWNED BY restaurant_bookinghistory.id;
+ALTER TABLE restaurant_bookinghistory
+    ALTER COLUMN id SET DEFAULT nextval('restaurant_bookinghistory_id_seq'),
+    ADD PRIMARY KEY (id, cancelled_at),
+    ADD FOREIGN KEY (table_id) REFERENCES restaurant_table (id)
+        DEFERRABLE INITIALLY DEFERRED,
+    ADD FOREIGN KEY (client_id) REFERENCES users_user (id)
+        DEFERRABLE INITIALLY DEFERRED;
+CREATE INDEX history_client_cancelled_idx
+    ON restaurant_bookinghistory (client_id, cancelled_at DESC);
+CREATE INDEX history_table_idx ON restaurant_bookinghistory (table_id);
+CREATE TABLE restaurant_bookinghistory_default
+    PARTITION OF restaurant_bookinghistory DEFAULT;
+"""
+
+# обратная операция: партиционированная таблица (вместе с последовательностью)
+# удаляется, обычная таблица (восстановленная RESTORE_PLAIN_TABLE) возвращается
+# на место и снова получает IDENTITY, как при создании моделью
+DROP_PARTITIONED_TABLE = """
+DROP TABLE restaurant_bookinghistory CASCADE;
+ALTER TABLE restaurant_bookinghistory_old RENAME TO restaurant_bookinghistory;
+ALTER TABLE restaurant_bookinghistory
+    RENAME CONSTRAINT restaurant_bookinghistory_old_pkey TO restaurant_bookinghistory_pkey;
+ALTER INDEX history_client_cancelled_old_idx RENAME TO history_client_cancelled_idx;
+ALTER INDEX history_table_old_idx RENAME TO history_table_idx;
+ALTER TABLE restaurant_bookinghistory
+    ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY;
+SELECT setval(
+    pg_get_serial_sequence('restaurant_bookinghistory', 'id'),
+    COALESCE((SELECT MAX(id) FROM restaurant_bookinghistory), 0) + 1,
+    false
+);
+"""
+
+COPY_ROWS = """
+INSERT INTO restaurant_bookinghistory SELECT * FROM restaurant_bookinghistory_old;
+SELECT setval(
+    'restaurant_bookinghistory_id_seq',
+    COALESCE((SELECT MAX(id) FROM restaurant_bookinghistory), 0) + 1,
+    false
+);
+DROP TABLE restaurant_bookinghistory_old;
+"""
+
+# индексы создаются до копирования, а внешние ключи - после: отложенные
+# проверки вставленных строк не дали бы создать индекс в той же транзакции
+RESTORE_PLAIN_TABLE = """
+CREATE TABLE restaurant_bookinghistory_old (LIKE restaurant_bookinghistory);
+ALTER TABLE restaurant_bookinghistory_old
+    ADD CONSTRAINT restaurant_bookinghistory_old_pkey PRIMARY KEY (id);
+CREATE INDEX history_client_cancelled_old_idx
+    ON restaurant_bookinghistory_old (client_id, cancelled_at DESC);
+CREATE INDEX history_table_old_idx ON restaurant_bookinghistory_old (table_id);
+INSERT INTO restaurant_bookinghistory_old SELECT * FROM restaurant_bookinghistory;
+ALTER TABLE restaurant_bookinghistory_old
+    ADD FOREIGN KEY (table_id) REFERENCES restaurant_table (id)
+        DEFERRABLE INITIALLY DEFERRED,
+    ADD FOREIGN KEY (client_id) REFERENCES users_user (id)
+        DEFERRABLE INITIALLY DEFERRED;
+"""
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def local_month(value):
+    value = timezone.localtime(value)
+    return date(value.year, value.month, 1)
+
+
+def create_partitions(apps, schema_editor):
+    """
+    Создает помесячные партиции для всех месяцев с записями истории
+    и на PARTITIONS_AHEAD месяцев вперед.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT MIN(cancelled_at), MAX(cancelled_at) "
+            "FROM restaurant_bookinghistory_old"
+        )
+        first, last = cursor.fetchone()
+
+    current = local_month(timezone.now())
+    month = local_month(first) if first else current
+    end = add_months(
+        max(local_month(last) if last else current, current), PARTITIONS_AHEAD
+    )
+    tz = timezone.get_current_timezone()
+
+    with connection.cursor() as cursor:
+        while month <= end:
+            cursor.execute(
+                f"CREATE TABLE restaurant_bookinghistory_y{month.year}m{month.month:02d} "
+                f"PARTITION OF restaurant_bookinghistory FOR VALUES FROM (%s) TO (%s)",
+                [
+                    datetime.combine(month, datetime.min.time(), tzinfo=tz),
+                    datetime.combine(
+                        add_months(month, 1), datetime.min.time(), tzinfo=tz
+                    ),
+                ],
+            )
+            month = add_months(month, 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("restaurant", "0009_booking_soft_cancel"),
+    ]
+
+    operations = [
+        RunPostgresSQL(CREATE_PARTITIONED_TABLE, DROP_PARTITIONED_TABLE),
+        migrations.RunPython(create_partitions, migrations.RunPython.noop),
+        RunPostgresSQL(COPY_ROWS, RESTORE_PLAIN_TABLE),
+    ]
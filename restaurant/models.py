@@ -1,6 +1,11 @@
+from datetime import datetime, timedelta
+
+from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator
 from django.db import models
 from django.utils import timezone
 
+from restaurant.services.metrics import BOOKINGS_CANCELLED, count_on_commit
 from users.models import User
 
 
@@ -16,6 +21,11 @@ class Table(models.Model):
     number = models.IntegerField(unique=True, verbose_name="Номер стола")
     seats = models.IntegerField(verbose_name="Количество мест")
     is_booked = models.BooleanField(verbose_name="Забронирован", default=False)
+    combinable_with = models.ManyToManyField(
+        "self",
+        blank=True,
+        verbose_name="Можно объединить со столами",
+    )
 
     class Meta:
         verbose_name = "Стол"
@@ -49,6 +59,11 @@ class AbstractBooking(models.Model):
     duration = models.PositiveIntegerField(
         verbose_name="Продолжительность бронирования", default=3
     )
+    guests = models.PositiveIntegerField(
+        verbose_name="Количество гостей",
+        default=2,
+        validators=[MinValueValidator(1)],
+    )
     created_at = models.DateTimeField(
         auto_now_add=True, verbose_name="Дата и время создания"
     )
@@ -62,42 +77,165 @@ class AbstractBooking(models.Model):
         return f"Бронирование стола {table_number} на {self.date_reserved} в {self.time_reserved}"
 
 
+class BookingQuerySet(models.QuerySet):
+    """
+    Набор запросов бронирований.
+    """
+
+    def active(self):
+        """
+        Действующие (не отмененные) бронирования.
+        """
+        return self.filter(is_active=True)
+
+    def cancelled(self):
+        """
+        Отмененные бронирования (история при мягкой отмене).
+        """
+        return self.filter(is_active=False)
+
+    def soft_cancel(self, cancelled_at=None):
+        """
+        Помечает действующие бронирования отмененными одним запросом UPDATE.
+        Сигналы не отправляются: индекс занятости и кэш доступности
+        обновляет вызывающий код. Возвращает количество отмененных бронирований.
+        """
+        return self.filter(is_active=True).update(
+            is_active=False, cancelled_at=cancelled_at or timezone.now()
+        )
+
+    def cancel(self, cancelled_at=None, notify=True):
+        """
+        Массовая отмена действующих бронирований с уведомлением клиентов
+        (см. restaurant.services.booking.cancel_many).
+        Возвращает количество отмененных бронирований.
+        """
+        from restaurant.services.booking import cancel_many
+
+        return cancel_many(self, cancelled_at, notify)
+
+    def expired(self, now=None):
+        """
+        Активные бронирования, время окончания которых уже наступило.
+        """
+        return self.filter(is_active=True, ends_at__lte=now or timezone.now())
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        Массовое создание бронирований с расчетом времени окончания.
+        """
+        objs = list(objs)
+        for booking in objs:
+            booking.set_period()
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class CancelledBookingManager(models.Manager.from_queryset(BookingQuerySet)):
+    """
+    Менеджер отмененных бронирований (частичный индекс booking_client_cancelled_idx).
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_active=False)
+
+
 class Booking(AbstractBooking):
     """
     Класс бронирования стола.
     """
 
     is_active = models.BooleanField(verbose_name="Бронирование активно", default=True)
-    objects = models.Manager()
+    starts_at = models.DateTimeField(
+        verbose_name="Время начала бронирования", **NULLABLE
+    )
+    ends_at = models.DateTimeField(
+        verbose_name="Время окончания бронирования", **NULLABLE
+    )
+    expiry_task_id = models.CharField(
+        max_length=255, verbose_name="Задача отмены по истечении", **NULLABLE
+    )
+    group = models.UUIDField(
+        verbose_name="Группа объединенных столов", db_index=True, **NULLABLE
+    )
+    cancelled_at = models.DateTimeField(
+        verbose_name="Время отмены бронирования", **NULLABLE
+    )
+    objects = BookingQuerySet.as_manager()
+    cancelled = CancelledBookingManager()
 
     class Meta:
         verbose_name = "Бронирование"
         verbose_name_plural = "Бронирования"
+        indexes = [
+            # доступность стола на дату и время
+            models.Index(
+                fields=["table", "date_reserved", "time_reserved"],
+                name="booking_table_slot_idx",
+            ),
+            # занятость всех столов на дату
+            models.Index(
+                fields=["date_reserved", "time_reserved"],
+                name="booking_date_slot_idx",
+            ),
+            # список бронирований пользователя
+            models.Index(
+                fields=["client", "date_reserved", "time_reserved"],
+                name="booking_client_slot_idx",
+            ),
+            # отмена истекших бронирований (частичный индекс по активным)
+            models.Index(
+                fields=["ends_at"],
+                condition=models.Q(is_active=True),
+                name="booking_active_ends_idx",
+            ),
+            # история отмененных бронирований пользователя
+            models.Index(
+                fields=["client", "-cancelled_at"],
+                condition=models.Q(is_active=False),
+                name="booking_client_cancelled_idx",
+            ),
+        ]
 
-    def cancel(self):
+    def set_period(self):
         """
-        Функция отмены бронирования.
+        Приводит дату и время, переданные строками (из URL и форм), к date и time
+        и рассчитывает время начала и окончания бронирования.
         """
-        BookingHistory.objects.create(
-            table=self.table,
-            client=self.client,
-            date_reserved=self.date_reserved,
-            time_reserved=self.time_reserved,
-            duration=self.duration,
-            message=self.message,
-            cancelled_at=timezone.now(),
+        for field_name in ("date_reserved", "time_reserved"):
+            field = self._meta.get_field(field_name)
+            setattr(self, field_name, field.to_python(getattr(self, field_name)))
+
+        self.starts_at = timezone.make_aware(
+            datetime.combine(self.date_reserved, self.time_reserved)
         )
+        self.ends_at = self.starts_at + timedelta(hours=self.duration)
 
-        if self.table:
-            self.table.is_booked = False
-            self.table.save()
+    def save(self, *args, **kwargs):
+        """
+        Сохранение бронирования с расчетом времени начала и окончания.
+        """
+        self.set_period()
+        super().save(*args, **kwargs)
 
-        self.delete()
+    def cancel(self):
+        """
+        Функция отмены бронирования.
+        Бронирование помечается отмененным одним запросом UPDATE и остается
+        в таблице бронирований (мягкая отмена).
+        """
+        if self.is_active:
+            self.is_active = False
+            self.cancelled_at = timezone.now()
+            self.save(update_fields=["is_active", "cancelled_at"])
+            count_on_commit(BOOKINGS_CANCELLED.labels("user"))
 
 
 class BookingHistory(AbstractBooking):
     """
     Класс истории бронирования.
+    На PostgreSQL таблица разбита на партиции по cancelled_at, и ее первичный
+    ключ - (id, cancelled_at); почему модель остается с ключом id,
+    см. миграцию 0010_bookinghistory_partitions.
     """
 
     cancelled_at = models.DateTimeField(verbose_name="Время отмены бронирования")
@@ -106,3 +244,83 @@ class BookingHistory(AbstractBooking):
     class Meta:
         verbose_name = "История бронирования"
         verbose_name_plural = "История бронирований"
+        indexes = [
+            models.Index(
+                fields=["client", "-cancelled_at"],
+                name="history_client_cancelled_idx",
+            ),
+        ]
+
+
+class AbstractHours(models.Model):
+    """
+    Абстрактный класс часов приема бронирований.
+    """
+
+    opens_at = models.TimeField(verbose_name="Начало бронирования", **NULLABLE)
+    last_booking_at = models.TimeField(
+        verbose_name="Последнее время бронирования", **NULLABLE
+    )
+    is_closed = models.BooleanField(verbose_name="Ресторан закрыт", default=False)
+
+    class Meta:
+        abstract = True
+
+    def clean(self):
+        if self.is_closed:
+            return
+        if self.opens_at is None or self.last_booking_at is None:
+            raise ValidationError("Укажите часы бронирования или отметьте выходной")
+        if self.opens_at > self.last_booking_at:
+            raise ValidationError(
+                "Начало бронирования должно быть не позже последнего времени"
+            )
+
+
+class OpeningHours(AbstractHours):
+    """
+    Класс "Часы работы" по дням недели.
+    """
+
+    WEEKDAYS = [
+        (0, "Понедельник"),
+        (1, "Вторник"),
+        (2, "Среда"),
+        (3, "Четверг"),
+        (4, "Пятница"),
+        (5, "Суббота"),
+        (6, "Воскресенье"),
+    ]
+
+    objects = models.Manager()
+    weekday = models.PositiveSmallIntegerField(
+        choices=WEEKDAYS, unique=True, verbose_name="День недели"
+    )
+
+    class Meta:
+        verbose_name = "Часы работы"
+        verbose_name_plural = "Часы работы"
+        ordering = ["weekday"]
+
+    def __str__(self):
+        if self.is_closed:
+            return f"{self.get_weekday_display()}: выходной"
+        return f"{self.get_weekday_display()}: {self.opens_at}-{self.last_booking_at}"
+
+
+class SpecialDay(AbstractHours):
+    """
+    Класс "Особый день": праздник или день с измененными часами работы.
+    """
+
+    objects = models.Manager()
+    date = models.DateField(unique=True, verbose_name="Дата")
+    description = models.CharField(max_length=255, verbose_name="Описание", blank=True)
+
+    class Meta:
+        verbose_name = "Особый день"
+        verbose_name_plural = "Особые дни"
+        ordering = ["date"]
+
+    def __str__(self):
+        return f"{self.date} {self.description}".strip()
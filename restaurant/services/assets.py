@@ -0,0 +1,190 @@
+import gzip
+import os
+import posixpath
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него создаются только .gz
+    brotli = None
+
+
+# наборы статических файлов base.html: тип -> (файл сборки, исходные файлы)
+ASSET_BUNDLES = {
+    "css": (
+        "dist/bundle.css",
+        (
+            "css/bootstrap.min.css",
+            "css/bootstrap-icons.css",
+            "css/aos.css",
+            "css/glightbox.min.css",
+            "css/swiper-bundle.min.css",
+            "css/main.css",
+        ),
+    ),
+    "js": (
+        "dist/bundle.js",
+        (
+            "js/bootstrap.bundle.min.js",
+            "js/validate.js",
+            "js/aos.js",
+            "js/glightbox.min.js",
+            "js/imagesloaded.pkgd.min.js",
+            "js/isotope.pkgd.min.js",
+            "js/swiper-bundle.min.js",
+            "js/main.js",
+        ),
+    ),
+}
+
+# расширения файлов, для которых создаются сжатые копии
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".json", ".svg", ".txt", ".map", ".html"}
+
+# файлы меньше этого размера (в байтах) не сжимаются
+COMPRESS_MIN_SIZE = 1024
+
+
+class ManifestStaticStorage(ManifestStaticFilesStorage):
+    """
+    Хранилище статических файлов с хэшем содержимого в имени.
+    Ссылки CSS на отсутствующие файлы (например, url("../img/about-bg.jpg")
+    в main.css) остаются как есть, а не прерывают collectstatic.
+    """
+
+    def hashed_name(self, name, content=None, filename=None):
+        try:
+            return super().hashed_name(name, content, filename)
+        except ValueError:
+            if content is None and not self.exists(self.clean_name(name)):
+                return name
+            raise
+
+
+# строки в кавычках и комментарии CSS
+CSS_TOKEN_RE = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|/\*.*?\*/""", re.S)
+CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+JS_SOURCE_MAP_RE = re.compile(r"^\s*//[#@] sourceMappingURL=.*$", re.M)
+
+
+def minify_css(source):
+    """
+    Удаляет из CSS комментарии и лишние пробелы (строки в кавычках не меняются).
+    Пробелы перед ":" сохраняются - в селекторах это комбинатор потомка.
+    """
+    parts = []
+    position = 0
+    for match in CSS_TOKEN_RE.finditer(source):
+        parts.append(_compact_css(source[position : match.start()]))
+        if match.group(1):
+            parts.append(match.group(1))
+        position = match.end()
+    parts.append(_compact_css(source[position:]))
+    return "".join(parts).replace(";}", "}").strip()
+
+
+def _compact_css(chunk):
+    chunk = re.sub(r"\s+", " ", chunk)
+    return re.sub(r" ?([{};,>]) ?", r"\1", chunk)
+
+
+def minify_js(source):
+    """
+    Безопасное сжатие JS без разбора синтаксиса: удаляются ссылки на source map,
+    пустые строки и пробелы в конце строк.
+    """
+    source = JS_SOURCE_MAP_RE.sub("", source)
+    return "\n".join(line.rstrip() for line in source.splitlines() if line.strip())
+
+
+def rebase_css_urls(source, path, bundle_path):
+    """
+    Пересчитывает относительные url() файла path относительно файла сборки.
+    """
+    source_dir = posixpath.dirname(path)
+    bundle_dir = posixpath.dirname(bundle_path)
+
+    def rebase(match):
+        quote, url = match.groups()
+        if url.startswith(("data:", "http:", "https:", "//", "/", "#")):
+            return match.group(0)
+        target = posixpath.normpath(posixpath.join(source_dir, url))
+        return f"url({quote}{posixpath.relpath(target, bundle_dir)}{quote})"
+
+    return CSS_URL_RE.sub(rebase, source)
+
+
+def build_bundle(kind):
+    """
+    Собирает и сжимает набор файлов kind ("css" или "js").
+    Возвращает путь файла сборки и его содержимое.
+    """
+    bundle_path, paths = ASSET_BUNDLES[kind]
+    sources = []
+    for path in paths:
+        source = Path(finders.find(path)).read_text(encoding="utf-8")
+        if kind == "css":
+            sources.append(minify_css(rebase_css_urls(source, path, bundle_path)))
+        else:
+            sources.append(minify_js(source))
+    # ";" защищает от файлов, не завершенных точкой с запятой
+    separator = "\n" if kind == "css" else "\n;\n"
+    return bundle_path, separator.join(sources) + "\n"
+
+
+def write_bundles(output_dir=None):
+    """
+    Записывает сборки всех наборов в output_dir (по умолчанию - первый каталог
+    STATICFILES_DIRS, откуда их заберет collectstatic). Возвращает список путей.
+    """
+    output_dir = Path(output_dir or settings.STATICFILES_DIRS[0])
+    written = []
+    for kind in ASSET_BUNDLES:
+        bundle_path, content = build_bundle(kind)
+        target = output_dir / bundle_path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(content, encoding="utf-8")
+        written.append(target)
+    return written
+
+
+def compress_file(path):
+    """
+    Создает рядом с файлом сжатые копии .gz (и .br, если установлен brotli).
+    Возвращает список созданных файлов.
+    """
+    data = path.read_bytes()
+    created = []
+    variants = [(".gz", lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", lambda raw: brotli.compress(raw, quality=11)))
+
+    for suffix, compress in variants:
+        compressed = compress(data)
+        # сжатая копия бесполезна, если она не меньше исходного файла
+        if len(compressed) < len(data):
+            target = path.with_name(path.name + suffix)
+            target.write_bytes(compressed)
+            created.append(target)
+    return created
+
+
+def compress_static(root=None):
+    """
+    Создает сжатые копии подходящих файлов в STATIC_ROOT.
+    Возвращает список созданных файлов.
+    """
+    created = []
+    for directory, _, names in os.walk(root or settings.STATIC_ROOT):
+        for name in names:
+            path = Path(directory) / name
+            if (
+                path.suffix in COMPRESSIBLE_EXTENSIONS
+                and path.stat().st_size >= COMPRESS_MIN_SIZE
+            ):
+                created.extend(compress_file(path))
+    return created
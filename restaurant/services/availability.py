@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from restaurant.models import Booking, Table
+from restaurant.services.occupancy import (
+    SLOTS_PER_DAY,
+    build_days,
+    occupancy_index,
+    slot_range,
+)
+
+
+# продолжительность бронирования по умолчанию (в часах)
+DEFAULT_DURATION = Booking._meta.get_field("duration").default
+
+
+def booking_interval(date_reserved, time_reserved, duration=DEFAULT_DURATION):
+    """
+    Возвращает интервал бронирования (начало, окончание) в виде пары datetime.
+    """
+    start = datetime.combine(date_reserved, time_reserved)
+    return start, start + timedelta(hours=duration)
+
+
+def get_busy_intervals(interval, table=None, exclude=None):
+    """
+    Возвращает пары (id стола, интервал) бронирований, пересекающихся
+    с указанным интервалом.
+
+    Пересечение проверяется по сохраненным времени начала и окончания,
+    поэтому учитываются и бронирования предыдущего дня, заканчивающиеся
+    после полуночи.
+    """
+    start, end = interval
+    bookings = Booking.objects.filter(
+        is_active=True,
+        starts_at__lt=timezone.make_aware(end),
+        ends_at__gt=timezone.make_aware(start),
+    )
+    if table is not None:
+        bookings = bookings.filter(table=table)
+    if exclude is not None:
+        bookings = bookings.exclude(pk=exclude.pk)
+
+    return [
+        (table_id, booking_interval(date_reserved, time_reserved, duration))
+        for table_id, date_reserved, time_reserved, duration in bookings.values_list(
+            "table_id", "date_reserved", "time_reserved", "duration"
+        )
+    ]
+
+
+def get_table_statuses(date_reserved, time_reserved, duration=DEFAULT_DURATION):
+    """
+    Возвращает список пар (стол, доступен ли стол) на указанные дату и время.
+    Занятость берется из индекса занятости, в БД уходит только запрос столов.
+    """
+    busy_tables = occupancy_index.busy_tables(date_reserved, time_reserved, duration)
+    tables = Table.objects.order_by("number")
+
+    return [(table, table.pk not in busy_tables) for table in tables]
+
+
+def get_free_times(
+    table, date_reserved, times, duration=DEFAULT_DURATION, exclude=None
+):
+    """
+    Возвращает время начала из списка times, на которое стол свободен
+    в течение всей продолжительности бронирования.
+    exclude - редактируемое бронирование, которое не должно блокировать само себя.
+    """
+    return occupancy_index.free_times(
+        table.pk, date_reserved, times, duration, exclude=exclude
+    )
+
+
+def get_availability_grid(dates, times, duration=DEFAULT_DURATION):
+    """
+    Возвращает список столов и сетку доступности "столы x время" на несколько дат:
+    {дата: [[доступен ли стол на каждое время из times] для каждого стола]}.
+    Занятость всех дат строится одним запросом к БД.
+    """
+    days = build_days(dates)
+    tables = list(Table.objects.order_by("number"))
+    requested = [slot_range(slot, duration) for slot in times]
+    free_row = bytearray(SLOTS_PER_DAY)
+
+    grid = {}
+    for date_reserved, day in days.items():
+        grid[date_reserved] = [
+            [not any(row[first:last]) for first, last in requested]
+            for row in (day.get(table.pk, free_row) for table in tables)
+        ]
+    return tables, grid
@@ -0,0 +1,215 @@
+import threading
+import uuid
+from contextlib import ExitStack, contextmanager
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from restaurant.models import Booking, Table
+from restaurant.services.availability import booking_interval, get_busy_intervals
+from restaurant.services.cache import bump_versions
+from restaurant.services.mail import build_message, enqueue_messages
+from restaurant.services.metrics import (
+    BOOKING_CONFLICTS,
+    BOOKINGS_CANCELLED,
+    count_on_commit,
+)
+from restaurant.services.occupancy import occupancy_index
+from restaurant.tasks import EXPIRY_BATCH_SIZE, cancel_bookings
+from restaurant.templatetags.custom_filters import formatting_date, formatting_time
+
+
+class BookingConflict(Exception):
+    """
+    Стол уже забронирован на пересекающееся время.
+    """
+
+
+# код ошибки PostgreSQL при нарушении исключающего ограничения
+EXCLUSION_VIOLATION = "23P01"
+
+# блокировки столов в памяти процесса для СУБД без SELECT ... FOR UPDATE (SQLite)
+_table_locks = {}
+_table_locks_guard = threading.Lock()
+
+
+@contextmanager
+def table_lock(table_id):
+    """
+    Транзакция с монопольной блокировкой стола на время проверки и записи бронирования.
+    На PostgreSQL блокируется строка стола (SELECT ... FOR UPDATE),
+    на остальных СУБД - блокировка стола в памяти процесса.
+    """
+    if connection.features.has_select_for_update:
+        with transaction.atomic():
+            list(Table.objects.select_for_update().filter(pk=table_id).values("pk"))
+            yield
+        return
+
+    with _table_locks_guard:
+        lock = _table_locks.setdefault(table_id, threading.Lock())
+    with lock, transaction.atomic():
+        yield
+
+
+def save_booking(booking):
+    """
+    Сохраняет бронирование, если стол свободен на все время бронирования.
+    Проверка и запись выполняются под блокировкой стола, а на PostgreSQL
+    пересечения дополнительно исключаются ограничением booking_no_overlap.
+    Вызывает BookingConflict, если стол уже занят.
+    """
+    return save_bookings([booking])[0]
+
+
+def save_bookings(bookings):
+    """
+    Атомарно сохраняет несколько бронирований (например, объединенных столов):
+    сохраняются либо все бронирования, либо ни одно.
+    Столы блокируются в порядке id, чтобы параллельные запросы не блокировали
+    друг друга взаимно. Вызывает BookingConflict, если хотя бы один стол занят.
+    """
+    for booking in bookings:
+        booking.set_period()
+
+    with ExitStack() as stack:
+        for table_id in sorted({booking.table_id for booking in bookings}):
+            stack.enter_context(table_lock(table_id))
+
+        for booking in bookings:
+            interval = booking_interval(
+                booking.date_reserved, booking.time_reserved, booking.duration
+            )
+            if get_busy_intervals(
+                interval,
+                table=booking.table_id,
+                exclude=booking if booking.pk else None,
+            ):
+                BOOKING_CONFLICTS.inc()
+                raise BookingConflict("Стол уже забронирован на это время")
+
+        try:
+            with transaction.atomic():
+                for booking in bookings:
+                    booking.save()
+        except IntegrityError as error:
+            # нарушение ограничения booking_no_overlap (exclusion_violation)
+            if getattr(error.__cause__, "pgcode", None) == EXCLUSION_VIOLATION:
+                BOOKING_CONFLICTS.inc()
+                raise BookingConflict("Стол уже забронирован на это время") from error
+            raise
+
+    return bookings
+
+
+def save_group_booking(tables, booking):
+    """
+    Бронирует объединенные столы для одной компании: по бронированию на каждый
+    стол с общим идентификатором группы. Гости распределяются по столам
+    по порядку, на каждый стол приходится хотя бы один гость.
+    Данные бронирования (клиент, дата, время, гости, сообщение) берутся из booking.
+    """
+    group = uuid.uuid4()
+    remaining = booking.guests
+    bookings = []
+    for table in tables:
+        guests = max(min(remaining, table.seats), 1)
+        remaining -= guests
+        bookings.append(
+            Booking(
+                table=table,
+                client=booking.client,
+                date_reserved=booking.date_reserved,
+                time_reserved=booking.time_reserved,
+                duration=booking.duration,
+                guests=guests,
+                message=booking.message,
+                group=group,
+            )
+        )
+    return save_bookings(bookings)
+
+
+# количество писем в одной задаче отправки
+NOTIFY_BATCH_SIZE = 100
+
+# поля бронирования, необходимые для отмены и уведомления клиента
+CANCEL_FIELDS = (
+    "pk",
+    "date_reserved",
+    "time_reserved",
+    "group",
+    "table__number",
+    "client__email",
+    "client__first_name",
+)
+
+
+def cancellation_message(date_reserved, time_reserved, number, email, first_name):
+    """
+    Письмо клиенту об отмене бронирования рестораном.
+    """
+    return build_message(
+        "Отмена бронирования стола",
+        f"Уважаемый(ая) {first_name},\n\n"
+        f"К сожалению, бронирование стола №{number} на "
+        f"{formatting_date(date_reserved)} в {formatting_time(time_reserved)} "
+        f"отменено рестораном.\n\n"
+        f"Приносим извинения за неудобства.",
+        settings.EMAIL_HOST_USER,
+        [email],
+    )
+
+
+def cancel_many(bookings, cancelled_at=None, notify=True, batch_size=EXPIRY_BATCH_SIZE):
+    """
+    Отменяет действующие бронирования из набора запросов.
+
+    Бронирования отменяются пачками по batch_size, на каждую пачку - постоянное
+    число запросов (выборка и UPDATE при мягкой отмене), без загрузки моделей
+    и сигналов. Индекс занятости и кэш доступности сбрасываются один раз
+    на каждую затронутую дату, письма клиентам ставятся в очередь пачками
+    по NOTIFY_BATCH_SIZE (по одному письму на бронирование или группу столов).
+    Возвращает количество отмененных бронирований.
+    """
+    cancelled_at = cancelled_at or timezone.now()
+    bookings = bookings.active()
+    cancelled = 0
+    dates = set()
+    messages = {}
+
+    while True:
+        with transaction.atomic():
+            rows = list(
+                bookings.select_for_update(skip_locked=True, of=("self",))
+                .values_list(*CANCEL_FIELDS)
+                .order_by("pk")[:batch_size]
+            )
+            if rows:
+                count = cancel_bookings([row[0] for row in rows], cancelled_at)
+                count_on_commit(BOOKINGS_CANCELLED.labels("bulk"), count)
+                cancelled += count
+
+        for pk, date_reserved, time_reserved, group, number, email, name in rows:
+            dates.add(date_reserved)
+            if notify and email:
+                messages.setdefault(
+                    group or pk,
+                    cancellation_message(
+                        date_reserved, time_reserved, number, email, name
+                    ),
+                )
+
+        if len(rows) < batch_size:
+            break
+
+    if dates:
+        transaction.on_commit(partial(occupancy_index.forget, dates))
+        bump_versions(dates)
+
+    messages = list(messages.values())
+    for start in range(0, len(messages), NOTIFY_BATCH_SIZE):
+        enqueue_messages(messages[start : start + NOTIFY_BATCH_SIZE])
+    return cancelled
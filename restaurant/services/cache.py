@@ -0,0 +1,133 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from restaurant.services.availability import DEFAULT_DURATION, get_table_statuses
+
+
+# версия набора столов (общая для всех дат)
+TABLES_VERSION_KEY = "availability:version:tables"
+
+# время ожидания пересчета доступности другим запросом при пустом кэше (в секундах)
+RECOMPUTE_WAIT = 0.5
+RECOMPUTE_POLL = 0.05
+
+
+def version_key(date_reserved):
+    return f"availability:version:{date_reserved.isoformat()}"
+
+
+def _new_version():
+    # начальная версия зависит от времени, чтобы после очистки кэша
+    # версии не повторяли уже выданные клиентам значения
+    return time.time_ns()
+
+
+def get_versions(dates):
+    """
+    Возвращает словарь {дата: версия} и версию набора столов (ключ None).
+    Отсутствующие версии создаются.
+    """
+    keys = {version_key(date_reserved): date_reserved for date_reserved in dates}
+    keys[TABLES_VERSION_KEY] = None
+
+    versions = cache.get_many(list(keys))
+    missing = {key: _new_version() for key in keys if key not in versions}
+    if missing:
+        for key, version in missing.items():
+            cache.add(key, version, None)
+        versions.update(cache.get_many(list(missing)))
+
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def get_version(key):
+    """
+    Возвращает версию по ключу кэша. Отсутствующая версия создается.
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_key(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _new_version(), None)
+
+
+def bump_versions(dates):
+    """
+    Увеличивает версии доступности дат после фиксации транзакции.
+    Закэшированная доступность этих дат становится устаревшей.
+    """
+    dates = set(dates)
+
+    def bump():
+        for date_reserved in dates:
+            bump_key(version_key(date_reserved))
+
+    transaction.on_commit(bump)
+
+
+def bump_tables_version():
+    """
+    Делает устаревшей доступность всех дат (при изменении набора столов).
+    """
+    transaction.on_commit(lambda: bump_key(TABLES_VERSION_KEY))
+
+
+def cached_table_statuses(date_reserved, time_reserved, duration=DEFAULT_DURATION):
+    """
+    Возвращает доступность столов на дату и время из кэша.
+
+    Запись кэша хранит версию даты, на которой она построена, и время, до которого
+    она свежая. Устаревшая запись (истекла или сменилась версия) отдается,
+    пока ее пересчитывает один запрос, захвативший блокировку, поэтому
+    промах кэша в час пик не приводит к лавине одинаковых запросов в БД.
+    """
+    versions = get_versions([date_reserved])
+    version = (versions[None], versions[date_reserved])
+    key = f"availability:{date_reserved.isoformat()}:{time_reserved:%H%M}:{duration}"
+    lock_key = f"{key}:lock"
+
+    entry = cache.get(key)
+    if entry is not None:
+        entry_version, fresh_until, statuses = entry
+        if entry_version == version and time.time() < fresh_until:
+            return statuses
+
+    locked = cache.add(lock_key, 1, settings.AVAILABILITY_CACHE_FRESH)
+    if not locked:
+        if entry is not None:
+            # доступность уже пересчитывается другим запросом
+            return entry[2]
+
+        # ждем результат пересчета другим запросом, но не дольше RECOMPUTE_WAIT
+        deadline = time.monotonic() + RECOMPUTE_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(RECOMPUTE_POLL)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry[2]
+
+    try:
+        # индекс занятости обновляется при изменении бронирований (сигналы
+        # и on_commit), а не здесь: сброс общего индекса в Redis при каждом
+        # промахе кэша заставлял бы все процессы перестраивать дату из БД
+        statuses = get_table_statuses(date_reserved, time_reserved, duration)
+        cache.set(
+            key,
+            (version, time.time() + settings.AVAILABILITY_CACHE_FRESH, statuses),
+            settings.AVAILABILITY_CACHE_STALE,
+        )
+    finally:
+        if locked:
+            cache.delete(lock_key)
+
+    return statuses
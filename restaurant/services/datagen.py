@@ -0,0 +1,305 @@
+import random
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from restaurant.models import Booking, BookingHistory, Table
+from restaurant.services.cache import bump_tables_version
+from restaurant.services.history import history_cutoff
+from restaurant.services.occupancy import SLOT_MINUTES, occupancy_index, slot_range
+from users.models import User
+
+
+# домен адресов сгенерированных пользователей (по нему данные находятся и удаляются)
+GENERATED_EMAIL_DOMAIN = "generated.example.com"
+
+# номера сгенерированных столов начинаются после этого номера
+GENERATED_TABLE_OFFSET = 10_000
+
+# количество объектов в одном запросе INSERT
+GENERATE_BATCH_SIZE = 5000
+
+# столы зала: количество мест -> вес
+TABLE_SEATS = {2: 8, 4: 8, 6: 4, 8: 2}
+
+# размер компании: количество гостей -> вес
+PARTY_SIZES = {1: 5, 2: 40, 3: 15, 4: 20, 5: 8, 6: 7, 7: 3, 8: 2}
+
+# популярность часа начала бронирования: час -> вес (обед и вечер)
+HOUR_WEIGHTS = {
+    10: 1,
+    11: 2,
+    12: 5,
+    13: 6,
+    14: 4,
+    15: 2,
+    16: 2,
+    17: 4,
+    18: 8,
+    19: 10,
+    20: 6,
+}
+
+# популярность дней недели (понедельник - воскресенье)
+WEEKDAY_WEIGHTS = (6, 6, 7, 8, 12, 14, 10)
+
+# продолжительность бронирования в часах -> вес
+DURATIONS = {2: 3, 3: 6, 4: 1}
+
+# количество попыток найти свободный стол для бронирования
+SEAT_ATTEMPTS = 5
+
+FIRST_NAMES = ("Иван", "Мария", "Алексей", "Ольга", "Дмитрий", "Анна", "Сергей")
+LAST_NAMES = ("Иванов", "Смирнова", "Кузнецов", "Попова", "Соколов", "Лебедева")
+
+
+class DataGenerator:
+    """
+    Генератор синтетических данных с реалистичным распределением:
+    больше бронирований в пятницу и субботу, на обед и вечер, компании
+    в основном по 2-4 гостя. Действующие бронирования одного стола
+    не пересекаются по времени (ограничение booking_no_overlap).
+    """
+
+    def __init__(self, seed=1, batch_size=GENERATE_BATCH_SIZE):
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.busy = {}
+
+    def weighted(self, weights):
+        return self.rng.choices(list(weights), weights=list(weights.values()))[0]
+
+    def date_picker(self, first, last):
+        """
+        Функция выбора даты из интервала [first, last] с учетом
+        популярности дней недели.
+        """
+        days = [
+            first + timedelta(days=offset) for offset in range((last - first).days + 1)
+        ]
+        weights = [WEEKDAY_WEIGHTS[day.weekday()] for day in days]
+        return lambda: self.rng.choices(days, weights=weights)[0]
+
+    def pick_time(self):
+        hour = self.weighted(HOUR_WEIGHTS)
+        # последнее время бронирования - начало последнего часа
+        minute = 0 if hour == max(HOUR_WEIGHTS) else self.rng.choice((0, SLOT_MINUTES))
+        return time(hour, minute)
+
+    def pick_client(self, users):
+        """
+        Клиент бронирования: постоянные гости (начало списка) бронируют чаще.
+        """
+        return users[int(len(users) * self.rng.random() ** 2)]
+
+    def create_tables(self, count):
+        tables = Table.objects.bulk_create(
+            [
+                Table(
+                    number=GENERATED_TABLE_OFFSET + number,
+                    seats=self.weighted(TABLE_SEATS),
+                )
+                for number in range(1, count + 1)
+            ],
+            batch_size=self.batch_size,
+        )
+        # соседние столы в группах по четыре можно объединять
+        pairs = [
+            (first, second)
+            for index, (first, second) in enumerate(zip(tables, tables[1:]))
+            if index % 4 != 3
+        ]
+        through = Table.combinable_with.through
+        through.objects.bulk_create(
+            [through(from_table=first, to_table=second) for first, second in pairs]
+            + [through(from_table=second, to_table=first) for first, second in pairs],
+            batch_size=self.batch_size,
+        )
+        return tables
+
+    def create_users(self, count):
+        password = make_password(None)
+        return User.objects.bulk_create(
+            [
+                User(
+                    email=f"user{number}@{GENERATED_EMAIL_DOMAIN}",
+                    first_name=self.rng.choice(FIRST_NAMES),
+                    last_name=self.rng.choice(LAST_NAMES),
+                    password=password,
+                )
+                for number in range(1, count + 1)
+            ],
+            batch_size=self.batch_size,
+        )
+
+    def fitting_tables(self, tables, guests):
+        return [table for table in tables if table.seats >= guests] or tables
+
+    def seat(self, tables, date_reserved, time_reserved, guests, duration):
+        """
+        Подбирает стол, на котором хватает мест и который свободен на все время
+        бронирования, и отмечает его занятым. Возвращает None, если не нашлось.
+        """
+        fitting = self.fitting_tables(tables, guests)
+        slots = set(range(*slot_range(time_reserved, duration)))
+        for table in self.rng.sample(fitting, min(SEAT_ATTEMPTS, len(fitting))):
+            busy = self.busy.setdefault((table.pk, date_reserved), set())
+            if not busy & slots:
+                busy |= slots
+                return table
+        return None
+
+    def booking_fields(self, tables, users, pick_date):
+        """
+        Поля случайного бронирования на дату, выбранную pick_date.
+        """
+        guests = self.weighted(PARTY_SIZES)
+        return {
+            "table": self.rng.choice(self.fitting_tables(tables, guests)),
+            "client": self.pick_client(users),
+            "date_reserved": pick_date(),
+            "time_reserved": self.pick_time(),
+            "guests": guests,
+            "duration": self.weighted(DURATIONS),
+        }
+
+    def generate_bookings(self, tables, users, count, days_ahead):
+        """
+        Создает до count действующих бронирований на ближайшие days_ahead дней.
+        Возвращает количество созданных бронирований.
+        """
+        today = timezone.localdate()
+        pick_date = self.date_picker(today, today + timedelta(days=days_ahead))
+        created = 0
+        batch = []
+        for _ in range(count):
+            fields = self.booking_fields(tables, users, pick_date)
+            table = self.seat(
+                tables,
+                fields["date_reserved"],
+                fields["time_reserved"],
+                fields["guests"],
+                fields["duration"],
+            )
+            if table is None:
+                continue
+            fields["table"] = table
+            batch.append(Booking(**fields))
+            if len(batch) == self.batch_size:
+                created += len(Booking.objects.bulk_create(batch))
+                batch = []
+        created += len(Booking.objects.bulk_create(batch))
+        return created
+
+    def generate_history(self, tables, users, count, days_back):
+        """
+        Создает count прошедших и отмененных бронирований за days_back дней:
+        недавние - отмененными бронированиями (история пользователя),
+        старше HISTORY_VISIBLE_DAYS - записями архива истории.
+        Возвращает количество отмененных бронирований и записей архива.
+        """
+        today = timezone.localdate()
+        pick_date = self.date_picker(
+            today - timedelta(days=days_back), today - timedelta(days=1)
+        )
+        cutoff = history_cutoff()
+        cancelled = archived = 0
+        bookings, archive = [], []
+        for _ in range(count):
+            fields = self.booking_fields(tables, users, pick_date)
+            ends_at = timezone.make_aware(
+                datetime.combine(fields["date_reserved"], fields["time_reserved"])
+            ) + timedelta(hours=fields["duration"])
+            # большинство бронирований отменяется по окончании, часть - заранее
+            cancelled_at = ends_at - timedelta(hours=self.rng.choice((0, 0, 0, 2, 26)))
+            if cancelled_at >= cutoff:
+                bookings.append(
+                    Booking(is_active=False, cancelled_at=cancelled_at, **fields)
+                )
+            else:
+                archive.append(BookingHistory(cancelled_at=cancelled_at, **fields))
+
+            if len(bookings) == self.batch_size:
+                cancelled += len(Booking.objects.bulk_create(bookings))
+                bookings = []
+            if len(archive) == self.batch_size:
+                archived += len(BookingHistory.objects.bulk_create(archive))
+                archive = []
+
+        cancelled += len(Booking.objects.bulk_create(bookings))
+        archived += len(BookingHistory.objects.bulk_create(archive))
+        return cancelled, archived
+
+
+def generated_tables():
+    return Table.objects.filter(number__gt=GENERATED_TABLE_OFFSET)
+
+
+def generated_users():
+    return User.objects.filter(email__endswith=f"@{GENERATED_EMAIL_DOMAIN}")
+
+
+def clear_generated_data():
+    """
+    Удаляет сгенерированные столы, пользователей и их бронирования.
+    Возвращает количество удаленных объектов по моделям.
+    """
+    with transaction.atomic():
+        tables = generated_tables()
+        users = generated_users()
+        deleted = {
+            "bookings": Booking.objects.filter(table__in=tables).delete()[0]
+            + Booking.objects.filter(client__in=users).delete()[0],
+            "history": BookingHistory.objects.filter(table__in=tables).delete()[0]
+            + BookingHistory.objects.filter(client__in=users).delete()[0],
+        }
+        deleted["tables"] = tables.delete()[1].get(Table._meta.label, 0)
+        deleted["users"] = users.delete()[1].get(User._meta.label, 0)
+    reset_caches()
+    return deleted
+
+
+def reset_caches():
+    """
+    Данные созданы без сигналов - сбрасываем индекс занятости и кэш доступности.
+    """
+    occupancy_index.invalidate()
+    bump_tables_version()
+
+
+def generate_data(
+    tables=50,
+    users=1000,
+    bookings=2000,
+    history=20000,
+    days_ahead=14,
+    days_back=365,
+    seed=1,
+    batch_size=GENERATE_BATCH_SIZE,
+):
+    """
+    Заменяет сгенерированные ранее данные новыми: tables столов, users
+    пользователей, до bookings действующих бронирований на days_ahead дней
+    вперед (без пересечений по столам) и history прошедших бронирований
+    за days_back дней. Повторный запуск с тем же seed дает те же данные.
+    Возвращает количество созданных объектов.
+    """
+    clear_generated_data()
+    generator = DataGenerator(seed, batch_size)
+    with transaction.atomic():
+        created_tables = generator.create_tables(tables)
+        created_users = generator.create_users(users)
+        created = {
+            "tables": len(created_tables),
+            "users": len(created_users),
+            "bookings": generator.generate_bookings(
+                created_tables, created_users, bookings, days_ahead
+            ),
+        }
+        created["cancelled"], created["history"] = generator.generate_history(
+            created_tables, created_users, history, days_back
+        )
+    reset_caches()
+    return created
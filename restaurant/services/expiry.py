@@ -0,0 +1,130 @@
+from datetime import timedelta
+
+from celery import current_app
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from restaurant.models import Booking
+
+
+# ключ кэша с ближайшим временем окончания активных бронирований
+WATERMARK_KEY = "bookings:expiry-watermark"
+
+# счетчик сбросов watermark (по нему пересчет узнает о параллельных сбросах)
+WATERMARK_CHANGES_KEY = "bookings:expiry-watermark:changes"
+
+# максимальный интервал между страховочными проверками истекших бронирований
+WATERMARK_HORIZON = timedelta(hours=1)
+
+# задачи отмены ставятся в очередь с ETA не дальше этого интервала: задачи с ETA
+# хранятся в памяти воркеров, а брокер Redis переотправляет задачи, не
+# подтвержденные за visibility_timeout. Более поздние бронирования планирует
+# периодическая задача schedule_expiries (запускается чаще этого интервала)
+EXPIRY_ETA_HORIZON = timedelta(minutes=15)
+
+
+def get_watermark():
+    """
+    Возвращает время, раньше которого ни одно активное бронирование не истекает.
+    None - время неизвестно, проверка истекших бронирований обязательна.
+    """
+    return cache.get(WATERMARK_KEY)
+
+
+def lower_watermark(ends_at):
+    """
+    Учитывает бронирование, заканчивающееся раньше watermark: watermark
+    сбрасывается (а не сдвигается чтением и записью), поэтому параллельные
+    изменения не затирают друг друга. Следующая страховочная проверка
+    просмотрит БД и пересчитает watermark.
+    """
+    watermark = get_watermark()
+    if watermark is not None and ends_at < watermark:
+        cache.add(WATERMARK_CHANGES_KEY, 0, None)
+        cache.incr(WATERMARK_CHANGES_KEY)
+        cache.delete(WATERMARK_KEY)
+
+
+def reset_watermark(now=None):
+    """
+    Пересчитывает watermark по активным бронированиям, заканчивающимся после now.
+    Watermark не отодвигается дальше WATERMARK_HORIZON, чтобы страховочная
+    проверка выполнялась даже при потере событий о новых бронированиях.
+    Если во время пересчета watermark сбрасывали, он остается неизвестным.
+    """
+    now = now or timezone.now()
+    changes = cache.get(WATERMARK_CHANGES_KEY, 0)
+    watermark = now + WATERMARK_HORIZON
+    ends_at = Booking.objects.filter(is_active=True, ends_at__gt=now).aggregate(
+        ends_at=Min("ends_at")
+    )["ends_at"]
+    if ends_at is not None:
+        watermark = min(watermark, ends_at)
+
+    cache.set(WATERMARK_KEY, watermark, None)
+    if cache.get(WATERMARK_CHANGES_KEY, 0) != changes:
+        cache.delete(WATERMARK_KEY)
+        return None
+    return watermark
+
+
+def revoke_expiry(task_id):
+    """
+    Отзывает ранее запланированную задачу отмены бронирования.
+    """
+    if task_id and not current_app.conf.task_always_eager:
+        current_app.control.revoke(task_id)
+
+
+def schedule_expiry(booking):
+    """
+    Планирует отмену бронирования на время его окончания.
+    Ранее запланированная задача отзывается, задача планируется после фиксации
+    транзакции и только если бронирование заканчивается в пределах
+    EXPIRY_ETA_HORIZON, иначе ее позже запланирует schedule_due_expiries.
+    """
+    from restaurant.tasks import expire_booking
+
+    ends_at = booking.ends_at
+
+    def schedule():
+        revoke_expiry(booking.expiry_task_id)
+        task_id = None
+        if ends_at - timezone.now() <= EXPIRY_ETA_HORIZON:
+            task_id = expire_booking.apply_async((booking.pk,), eta=ends_at).id
+        booking.expiry_task_id = task_id
+        Booking.objects.filter(pk=booking.pk).update(expiry_task_id=task_id)
+        lower_watermark(ends_at)
+
+    transaction.on_commit(schedule)
+
+
+def schedule_due_expiries(now=None):
+    """
+    Планирует отмену действующих бронирований, заканчивающихся в пределах
+    EXPIRY_ETA_HORIZON, для которых задача еще не запланирована.
+    Возвращает количество запланированных задач.
+    """
+    from restaurant.tasks import expire_booking
+
+    now = now or timezone.now()
+    due = Booking.objects.filter(
+        Q(expiry_task_id__isnull=True) | Q(expiry_task_id=""),
+        is_active=True,
+        ends_at__lte=now + EXPIRY_ETA_HORIZON,
+    ).values_list("pk", "ends_at")
+
+    scheduled = 0
+    for booking_id, ends_at in due:
+        task_id = expire_booking.apply_async((booking_id,), eta=ends_at).id
+        # бронирование могли изменить и запланировать заново параллельно
+        updated = Booking.objects.filter(
+            Q(expiry_task_id__isnull=True) | Q(expiry_task_id=""), pk=booking_id
+        ).update(expiry_task_id=task_id)
+        if updated:
+            scheduled += 1
+        else:
+            revoke_expiry(task_id)
+    return scheduled
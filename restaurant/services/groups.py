@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from restaurant.services.cache import bump_key, get_version
+
+
+# версия групп (меняется при переименовании, удалении и очистке состава групп)
+GROUPS_VERSION_KEY = "groups:version"
+
+
+def groups_key(user_id):
+    return f"groups:{get_version(GROUPS_VERSION_KEY)}:{user_id}"
+
+
+def get_group_names(user):
+    """
+    Возвращает множество названий групп пользователя.
+
+    Группы загружаются одним запросом и запоминаются в объекте пользователя,
+    поэтому в пределах запроса (request.user) повторные проверки не обращаются
+    к БД. Между запросами названия хранятся в кэше USER_GROUPS_CACHE_TIMEOUT
+    секунд (0 - не кэшировать) и сбрасываются при изменении состава групп.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+
+    names = getattr(user, "_group_names", None)
+    if names is not None:
+        return names
+
+    timeout = getattr(settings, "USER_GROUPS_CACHE_TIMEOUT", 300)
+    key = groups_key(user.pk) if timeout else None
+    names = cache.get(key) if key else None
+    if names is None:
+        names = frozenset(user.groups.values_list("name", flat=True))
+        if key:
+            cache.set(key, names, timeout)
+
+    user._group_names = names
+    return names
+
+
+def has_group(user, *group_names):
+    """
+    Проверяет, состоит ли пользователь хотя бы в одной из групп.
+    """
+    return not get_group_names(user).isdisjoint(group_names)
+
+
+def forget_user_groups(user_ids):
+    """
+    Сбрасывает закэшированные группы пользователей после фиксации транзакции.
+    """
+    user_ids = set(user_ids)
+
+    def forget():
+        cache.delete_many([groups_key(user_id) for user_id in user_ids])
+
+    transaction.on_commit(forget)
+
+
+def bump_groups_version():
+    """
+    Делает устаревшими закэшированные группы всех пользователей
+    после фиксации транзакции.
+    """
+    transaction.on_commit(lambda: bump_key(GROUPS_VERSION_KEY))
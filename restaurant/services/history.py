@@ -0,0 +1,230 @@
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from restaurant.models import Booking, BookingHistory
+
+
+# поля отмененного бронирования, переносимые в архив истории
+ARCHIVE_FIELDS = (
+    "table",
+    "client",
+    "date_reserved",
+    "time_reserved",
+    "duration",
+    "guests",
+    "message",
+    "created_at",
+    "cancelled_at",
+)
+
+# количество строк, обрабатываемых в одной транзакции
+RETENTION_BATCH_SIZE = 1000
+
+# на сколько месяцев вперед создаются партиции архива
+PARTITIONS_AHEAD = 2
+
+
+def is_partitioned():
+    """
+    Архив истории разбит на помесячные партиции только на PostgreSQL,
+    на остальных СУБД это обычная таблица.
+    """
+    return connection.vendor == "postgresql"
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{BookingHistory._meta.db_table}_y{month.year}m{month.month:02d}"
+
+
+def history_cutoff(now=None):
+    """
+    Граница истории, показываемой пользователю: отмены старше
+    HISTORY_VISIBLE_DAYS дней переносятся в архив и не запрашиваются.
+    """
+    days = getattr(settings, "HISTORY_VISIBLE_DAYS", 90)
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def retention_cutoff(now=None):
+    """
+    Начало месяца, записи архива раньше которого удаляются
+    (хранится HISTORY_RETENTION_MONTHS полных месяцев).
+    """
+    months = getattr(settings, "HISTORY_RETENTION_MONTHS", 24)
+    return add_months(month_start(timezone.localdate(now)), -months)
+
+
+def list_partitions():
+    """
+    Возвращает помесячные партиции архива: {месяц: имя таблицы}.
+    """
+    prefix = f"{BookingHistory._meta.db_table}_y"
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = %s",
+            [BookingHistory._meta.db_table],
+        )
+        names = [name for (name,) in cursor.fetchall() if name.startswith(prefix)]
+    return {date(int(name[-7:-3]), int(name[-2:]), 1): name for name in names}
+
+
+def create_partition(month):
+    """
+    Создает партицию архива за месяц. Записи этого месяца, попавшие
+    в партицию по умолчанию, переносятся в новую партицию.
+    """
+    quote_name = connection.ops.quote_name
+    parent = quote_name(BookingHistory._meta.db_table)
+    default = quote_name(f"{BookingHistory._meta.db_table}_default")
+    partition = quote_name(partition_name(month))
+    start = datetime.combine(
+        month, datetime.min.time(), tzinfo=timezone.get_current_timezone()
+    )
+    end = datetime.combine(
+        add_months(month, 1), datetime.min.time(), tzinfo=start.tzinfo
+    )
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE {partition} (LIKE {parent} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {default} "
+            f"WHERE cancelled_at >= %s AND cancelled_at < %s RETURNING *) "
+            f"INSERT INTO {partition} SELECT * FROM moved",
+            [start, end],
+        )
+        cursor.execute(
+            f"ALTER TABLE {parent} ATTACH PARTITION {partition} "
+            f"FOR VALUES FROM (%s) TO (%s)",
+            [start, end],
+        )
+
+
+def ensure_partitions(months_ahead=PARTITIONS_AHEAD):
+    """
+    Создает партиции архива с текущего месяца на months_ahead месяцев вперед.
+    Возвращает список созданных месяцев.
+    """
+    if not is_partitioned():
+        return []
+
+    existing = list_partitions()
+    current = month_start(timezone.localdate())
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if month not in existing:
+            create_partition(month)
+            created.append(month)
+    return created
+
+
+def archive_cancelled_bookings(before, batch_size=RETENTION_BATCH_SIZE):
+    """
+    Переносит отмененные до before бронирования в архив истории
+    пачками, каждая пачка - в отдельной транзакции (INSERT ... SELECT и DELETE).
+    Возвращает количество перенесенных бронирований.
+    """
+    quote_name = connection.ops.quote_name
+    columns = ", ".join(
+        quote_name(Booking._meta.get_field(field).column) for field in ARCHIVE_FIELDS
+    )
+    booking_table = quote_name(Booking._meta.db_table)
+    history_table = quote_name(BookingHistory._meta.db_table)
+    bookings = Booking.cancelled.filter(cancelled_at__lt=before)
+    archived = 0
+
+    while True:
+        with transaction.atomic():
+            ids = list(
+                bookings.select_for_update(skip_locked=True).values_list(
+                    "pk", flat=True
+                )[:batch_size]
+            )
+            if ids:
+                placeholders = ", ".join(["%s"] * len(ids))
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"INSERT INTO {history_table} ({columns}) "
+                        f"SELECT {columns} FROM {booking_table} "
+                        f"WHERE id IN ({placeholders})",
+                        ids,
+                    )
+                    cursor.execute(
+                        f"DELETE FROM {booking_table} WHERE id IN ({placeholders})",
+                        ids,
+                    )
+                    archived += cursor.rowcount
+
+        if len(ids) < batch_size:
+            return archived
+
+
+def drop_expired_history(before, batch_size=RETENTION_BATCH_SIZE):
+    """
+    Удаляет архив истории раньше месяца before.
+    На PostgreSQL целиком удаляются партиции устаревших месяцев (без построчного
+    удаления), остальные устаревшие записи удаляются пачками по batch_size.
+    Возвращает количество удаленных партиций и записей.
+    """
+    dropped_partitions = 0
+    if is_partitioned():
+        quote_name = connection.ops.quote_name
+        parent = quote_name(BookingHistory._meta.db_table)
+        for month, name in sorted(list_partitions().items()):
+            if add_months(month, 1) > before:
+                break
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f"ALTER TABLE {parent} DETACH PARTITION {quote_name(name)}"
+                )
+                cursor.execute(f"DROP TABLE {quote_name(name)}")
+            dropped_partitions += 1
+
+    cutoff = datetime.combine(
+        before, datetime.min.time(), tzinfo=timezone.get_current_timezone()
+    )
+    expired = BookingHistory.objects.filter(cancelled_at__lt=cutoff)
+    deleted_rows = 0
+    while True:
+        with transaction.atomic():
+            ids = list(expired.values_list("pk", flat=True)[:batch_size])
+            if ids:
+                deleted_rows += BookingHistory.objects.filter(pk__in=ids).delete()[0]
+        if len(ids) < batch_size:
+            return dropped_partitions, deleted_rows
+
+
+def prune_history(batch_size=RETENTION_BATCH_SIZE, now=None):
+    """
+    Обслуживание архива истории: создает партиции на ближайшие месяцы,
+    переносит в архив отмены старше HISTORY_VISIBLE_DAYS и удаляет архив
+    старше HISTORY_RETENTION_MONTHS. Возвращает словарь с результатами.
+    """
+    created = ensure_partitions()
+    archived = archive_cancelled_bookings(history_cutoff(now), batch_size)
+    dropped_partitions, deleted_rows = drop_expired_history(
+        retention_cutoff(now), batch_size
+    )
+    return {
+        "created_partitions": len(created),
+        "archived": archived,
+        "dropped_partitions": dropped_partitions,
+        "deleted_rows": deleted_rows,
+    }
@@ -0,0 +1,135 @@
+import json
+import posixpath
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from PIL import Image, ImageOps
+
+
+# форматы вариантов изображений: расширение -> (формат Pillow, параметры сохранения)
+IMAGE_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 6}),
+    "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+# ширины адаптивных вариантов статических изображений (в пикселях)
+RESPONSIVE_WIDTHS = (480, 960, 1440)
+
+# статические изображения, для которых создаются адаптивные варианты
+RESPONSIVE_IMAGES = (
+    "img/hero-bg.jpeg",
+    "img/page-title-bg.jpeg",
+    "img/menu/stake.jpg",
+)
+
+# каталог вариантов и список созданных ширин (внутри каталога статических файлов)
+RESPONSIVE_DIR = "dist"
+RESPONSIVE_MANIFEST = "dist/images.json"
+
+
+def open_image(file):
+    """
+    Открывает изображение с учетом ориентации из EXIF и приводит к RGB.
+    """
+    image = ImageOps.exif_transpose(Image.open(file))
+    return image.convert("RGB") if image.mode != "RGB" else image
+
+
+def encode_image(image, extension):
+    """
+    Возвращает изображение, сохраненное в формате extension, в виде байтов.
+    """
+    image_format, options = IMAGE_FORMATS[extension]
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def resize_to_width(image, width):
+    if width >= image.width:
+        return image
+    height = round(image.height * width / image.width)
+    return image.resize((width, height), Image.Resampling.LANCZOS)
+
+
+def fit_square(image, size):
+    """
+    Обрезает изображение до квадрата по центру и уменьшает до size пикселей.
+    """
+    return ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+
+
+def variant_name(name, width, extension, directory=None):
+    """
+    Имя варианта изображения name шириной width: img/a.jpeg -> img/a-480.webp.
+    """
+    stem = posixpath.splitext(name)[0]
+    if directory:
+        stem = posixpath.join(directory, stem)
+    return f"{stem}-{width}.{extension}"
+
+
+def responsive_widths(width):
+    """
+    Ширины вариантов изображения шириной width: меньшие RESPONSIVE_WIDTHS
+    и исходная ширина.
+    """
+    return [size for size in RESPONSIVE_WIDTHS if size < width] + [width]
+
+
+def responsive_variant(path, widths, width, extension):
+    """
+    Путь статического варианта изображения path (JPEG исходной ширины - исходный файл).
+    """
+    if extension == "jpg" and width == widths[-1]:
+        return path
+    return variant_name(path, width, extension, RESPONSIVE_DIR)
+
+
+def write_responsive_images(output_dir=None):
+    """
+    Создает адаптивные варианты RESPONSIVE_IMAGES (WebP и JPEG) в output_dir
+    (по умолчанию - первый каталог STATICFILES_DIRS) и записывает список ширин
+    в RESPONSIVE_MANIFEST. Возвращает {изображение: ширины}.
+    """
+    output_dir = Path(output_dir or settings.STATICFILES_DIRS[0])
+    manifest = {}
+    for path in RESPONSIVE_IMAGES:
+        with open(finders.find(path), "rb") as file:
+            image = open_image(file)
+            image.load()
+
+        widths = responsive_widths(image.width)
+        for width in widths:
+            resized = resize_to_width(image, width)
+            for extension in IMAGE_FORMATS:
+                # JPEG исходной ширины - это сам исходный файл
+                if extension == "jpg" and width == image.width:
+                    continue
+                target = output_dir / variant_name(
+                    path, width, extension, RESPONSIVE_DIR
+                )
+                target.parent.mkdir(parents=True, exist_ok=True)
+                target.write_bytes(encode_image(resized, extension))
+        manifest[path] = widths
+
+    target = output_dir / RESPONSIVE_MANIFEST
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    load_responsive_images.cache_clear()
+    return manifest
+
+
+@lru_cache
+def load_responsive_images():
+    """
+    Возвращает {изображение: ширины} созданных адаптивных вариантов
+    (пустой словарь, если build_images не запускалась).
+    """
+    path = finders.find(RESPONSIVE_MANIFEST)
+    if not path:
+        return {}
+    return json.loads(Path(path).read_text(encoding="utf-8"))
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
+
+from restaurant.services.timing import measure
+
+
+def build_message(subject, message, from_email, recipient_list, html_message=None):
+    """
+    Возвращает письмо в виде словаря, пригодного для передачи в задачу Celery.
+    """
+    return {
+        "subject": subject,
+        "body": message,
+        "from_email": from_email or settings.EMAIL_HOST_USER,
+        "to": list(recipient_list),
+        "html_message": html_message,
+    }
+
+
+def to_email(message):
+    """
+    Собирает объект письма Django из словаря.
+    """
+    email = EmailMultiAlternatives(
+        message["subject"], message["body"], message["from_email"], message["to"]
+    )
+    if message.get("html_message"):
+        email.attach_alternative(message["html_message"], "text/html")
+    return email
+
+
+def enqueue_messages(messages):
+    """
+    Ставит письма в очередь отправки после фиксации транзакции.
+    """
+    from restaurant.tasks import send_emails
+
+    def send():
+        with measure("mail"):
+            send_emails.delay(messages)
+
+    messages = list(messages)
+    if messages:
+        transaction.on_commit(send)
+
+
+def enqueue_mail(subject, message, from_email, recipient_list, html_message=None):
+    """
+    Ставит письмо в очередь отправки.
+    Аналог send_mail, не ожидающий ответа SMTP-сервера.
+    """
+    enqueue_messages(
+        [build_message(subject, message, from_email, recipient_list, html_message)]
+    )
@@ -0,0 +1,115 @@
+import os
+
+from django.db import transaction
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+
+# Метрики хранятся в памяти процесса. Если задана переменная окружения
+# PROMETHEUS_MULTIPROC_DIR (каталог должен быть пустым при запуске), процессы
+# app-сервера и воркеров Celery записывают метрики в файлы этого каталога,
+# а /metrics отдает их сумму по всем процессам.
+
+# границы корзин гистограммы числа запросов к БД за один запрос к странице
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# границы корзин гистограммы длительности задач Celery (в секундах)
+TASK_DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 1800)
+
+VIEW_LATENCY = Histogram(
+    "django_view_duration_seconds",
+    "Время обработки запроса по представлениям",
+    ["view", "method", "status"],
+)
+VIEW_QUERIES = Histogram(
+    "django_view_db_queries",
+    "Количество запросов к БД за один запрос к представлению",
+    ["view"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+VIEW_DB_TIME = Histogram(
+    "django_view_db_duration_seconds",
+    "Суммарное время запросов к БД за один запрос к представлению",
+    ["view"],
+)
+
+BOOKINGS_CREATED = Counter(
+    "restaurant_bookings_created_total",
+    "Созданные бронирования",
+)
+BOOKINGS_CANCELLED = Counter(
+    "restaurant_bookings_cancelled_total",
+    "Бронирования, отмененные клиентом или администратором",
+    ["source"],
+)
+BOOKINGS_EXPIRED = Counter(
+    "restaurant_bookings_expired_total",
+    "Бронирования, отмененные по окончании времени",
+)
+BOOKING_CONFLICTS = Counter(
+    "restaurant_booking_conflicts_total",
+    "Отказы в бронировании из-за занятого стола",
+)
+
+TASK_DURATION = Histogram(
+    "celery_task_duration_seconds",
+    "Время выполнения задач Celery",
+    ["task", "state"],
+    buckets=TASK_DURATION_BUCKETS,
+)
+TASK_FAILURES = Counter(
+    "celery_task_failures_total",
+    "Задачи Celery, завершившиеся ошибкой",
+    ["task", "exception"],
+)
+TASK_RETRIES = Counter(
+    "celery_task_retries_total",
+    "Повторные попытки задач Celery",
+    ["task"],
+)
+
+
+def is_multiprocess():
+    return bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def get_registry():
+    """
+    Реестр для выгрузки метрик: в многопроцессном режиме собирает
+    метрики всех процессов из PROMETHEUS_MULTIPROC_DIR.
+    """
+    if not is_multiprocess():
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def export_metrics():
+    """
+    Метрики в текстовом формате Prometheus.
+    """
+    return generate_latest(get_registry())
+
+
+def mark_process_dead(pid):
+    """
+    Удаляет файлы завершившегося процесса в многопроцессном режиме.
+    """
+    if is_multiprocess():
+        multiprocess.mark_process_dead(pid)
+
+
+def count_on_commit(counter, amount=1):
+    """
+    Увеличивает счетчик после фиксации транзакции,
+    чтобы откаченные изменения не попадали в метрики.
+    """
+    if amount:
+        transaction.on_commit(lambda: counter.inc(amount))
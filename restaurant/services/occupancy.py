@@ -0,0 +1,310 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from restaurant.models import Booking
+
+
+# размер слота в минутах (совпадает с шагом времени в формах бронирования)
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+
+def slot_range(time_reserved, duration):
+    """
+    Возвращает диапазон слотов дня [первый, последний), занятых бронированием.
+    Бронирование, выходящее за пределы дня, обрезается по полуночи.
+    """
+    start = time_reserved.hour * 60 + time_reserved.minute
+    end = start + duration * 60
+    return start // SLOT_MINUTES, min(-(-end // SLOT_MINUTES), SLOTS_PER_DAY)
+
+
+def build_days(dates):
+    """
+    Строит занятость столов на несколько дат по данным БД одним запросом.
+    Возвращает словарь {дата: {id стола: bytearray счетчиков бронирований по слотам}}.
+    """
+    days = {date_reserved: {} for date_reserved in dates}
+    for table_id, date_reserved, time_reserved, duration in Booking.objects.filter(
+        is_active=True, date_reserved__in=days, table__isnull=False
+    ).values_list("table_id", "date_reserved", "time_reserved", "duration"):
+        row = days[date_reserved].setdefault(table_id, bytearray(SLOTS_PER_DAY))
+        first, last = slot_range(time_reserved, duration)
+        for slot in range(first, last):
+            row[slot] += 1
+    return days
+
+
+def build_day(date_reserved):
+    """
+    Строит занятость столов на дату по данным БД.
+    """
+    return build_days([date_reserved])[date_reserved]
+
+
+class OccupancyIndex:
+    """
+    Индекс занятости столов в памяти процесса.
+
+    Для каждой даты хранится компактный массив счетчиков "слоты x столы",
+    поэтому проверка доступности не требует обращения к БД. Дата строится
+    из БД при первом обращении и перестраивается по истечении ttl секунд,
+    чтобы изменения, сделанные другими процессами, не накапливались.
+
+    Дата строится вне блокировки; если за это время индекс изменился
+    (apply, forget, invalidate), построенная занятость возвращается,
+    но не сохраняется - иначе она затерла бы эти изменения.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._days = {}
+        self._changes = 0
+        self._lock = threading.Lock()
+
+    def day(self, date_reserved):
+        """
+        Возвращает занятость столов на дату.
+        """
+        with self._lock:
+            built_at, day = self._days.get(date_reserved, (None, None))
+            if built_at is not None and time.monotonic() - built_at < self.ttl:
+                return day
+            changes = self._changes
+
+        day = build_day(date_reserved)
+        with self._lock:
+            if self._changes == changes:
+                self._days[date_reserved] = (time.monotonic(), day)
+        return day
+
+    def apply(self, table_id, date_reserved, time_reserved, duration, delta):
+        """
+        Добавляет (delta=1) или удаляет (delta=-1) бронирование из индекса.
+        """
+        first, last = slot_range(time_reserved, duration)
+        with self._lock:
+            self._changes += 1
+            if date_reserved not in self._days:
+                return
+            row = self._days[date_reserved][1].setdefault(
+                table_id, bytearray(SLOTS_PER_DAY)
+            )
+            for slot in range(first, last):
+                row[slot] = max(row[slot] + delta, 0)
+
+    def rebuild(self, date_reserved):
+        """
+        Перестраивает занятость на дату по данным БД.
+        """
+        with self._lock:
+            self._days.pop(date_reserved, None)
+        return self.day(date_reserved)
+
+    def forget(self, dates):
+        """
+        Удаляет даты из индекса, они будут построены заново при обращении.
+        """
+        with self._lock:
+            self._changes += 1
+            for date_reserved in dates:
+                self._days.pop(date_reserved, None)
+
+    def invalidate(self):
+        """
+        Очищает индекс.
+        """
+        with self._lock:
+            self._changes += 1
+            self._days.clear()
+
+    def busy_tables(self, date_reserved, time_reserved, duration):
+        """
+        Возвращает множество id столов, занятых в течение бронирования.
+        """
+        first, last = slot_range(time_reserved, duration)
+        return {
+            table_id
+            for table_id, row in self.day(date_reserved).items()
+            if any(row[first:last])
+        }
+
+    def free_times(self, table_id, date_reserved, times, duration, exclude=None):
+        """
+        Возвращает время начала из списка times, на которое стол свободен.
+        exclude - бронирование, которое не должно блокировать само себя.
+        """
+        row = bytearray(SLOTS_PER_DAY)
+        row[:] = self.day(date_reserved).get(table_id, row)
+        if exclude is not None and exclude.date_reserved == date_reserved:
+            first, last = slot_range(exclude.time_reserved, exclude.duration)
+            for slot in range(first, last):
+                row[slot] = max(row[slot] - 1, 0)
+
+        free = []
+        for slot in times:
+            first, last = slot_range(slot, duration)
+            if not any(row[first:last]):
+                free.append(slot)
+        return free
+
+
+# изменение занятости: счетчик изменений даты увеличивается всегда,
+# а BITFIELD INCRBY применяется, только если дата уже построена.
+# KEYS: занятость, счетчик изменений; ARGV: срок хранения счетчика, аргументы BITFIELD
+APPLY_SCRIPT = """
+redis.call("INCR", KEYS[2])
+redis.call("EXPIRE", KEYS[2], ARGV[1])
+if redis.call("EXISTS", KEYS[1]) == 0 then
+    return 0
+end
+redis.call("BITFIELD", KEYS[1], "OVERFLOW", "SAT", unpack(ARGV, 2))
+return 1
+"""
+
+# сохранение перестроенной даты, только если с начала перестроения
+# не было изменений даты и сброса индекса.
+# KEYS: занятость, счетчик изменений, эпоха индекса;
+# ARGV: ожидаемый счетчик, ожидаемая эпоха, занятость, срок хранения
+STORE_SCRIPT = """
+if (redis.call("GET", KEYS[2]) or "0") ~= ARGV[1]
+    or (redis.call("GET", KEYS[3]) or "0") ~= ARGV[2] then
+    return 0
+end
+redis.call("SET", KEYS[1], ARGV[3], "EX", ARGV[4])
+return 1
+"""
+
+
+class RedisOccupancyIndex(OccupancyIndex):
+    """
+    Индекс занятости, зеркалируемый в Redis и общий для всех процессов.
+
+    Занятость даты хранится в одной строке Redis: для стола с id N счетчики
+    слотов лежат по смещению N * SLOTS_PER_DAY байт и изменяются атомарно
+    командой BITFIELD INCRBY. Строка хранится ttl секунд, после чего дата
+    перестраивается из БД, поэтому расхождения не накапливаются.
+
+    Перестроение читает БД, а затем сохраняет результат; изменение между
+    этими шагами было бы потеряно. Поэтому каждое изменение даты (apply,
+    forget) увеличивает ее счетчик изменений, сброс индекса - эпоху,
+    и результат перестроения сохраняется, только если они не изменились.
+    """
+
+    key_prefix = "occupancy"
+    changes_prefix = "occupancy-changes"
+    epoch_key = "occupancy-epoch"
+    # срок хранения счетчиков изменений дат
+    expire = timedelta(days=8)
+
+    def __init__(self, url, ttl=60):
+        super().__init__(ttl=ttl)
+        import redis
+
+        self.redis = redis.Redis.from_url(url)
+        self._apply = self.redis.register_script(APPLY_SCRIPT)
+        self._store = self.redis.register_script(STORE_SCRIPT)
+
+    def _key(self, date_reserved):
+        return f"{self.key_prefix}:{date_reserved.isoformat()}"
+
+    def _changes_key(self, date_reserved):
+        return f"{self.changes_prefix}:{date_reserved.isoformat()}"
+
+    def day(self, date_reserved):
+        data = self.redis.get(self._key(date_reserved))
+        if data is None:
+            return self.rebuild(date_reserved)
+
+        day = {}
+        for offset in range(0, len(data), SLOTS_PER_DAY):
+            row = bytearray(data[offset : offset + SLOTS_PER_DAY])
+            if any(row):
+                day[offset // SLOTS_PER_DAY] = row
+        return day
+
+    def apply(self, table_id, date_reserved, time_reserved, duration, delta):
+        first, last = slot_range(time_reserved, duration)
+        args = [int(self.expire.total_seconds())]
+        for slot in range(first, last):
+            args += ["INCRBY", "u8", f"#{table_id * SLOTS_PER_DAY + slot}", delta]
+        self._apply(
+            keys=[self._key(date_reserved), self._changes_key(date_reserved)],
+            args=args,
+        )
+
+    def rebuild(self, date_reserved):
+        keys = [self._key(date_reserved), self._changes_key(date_reserved)]
+        changes, epoch = self.redis.mget(keys[1], self.epoch_key)
+
+        day = build_day(date_reserved)
+        size = (max(day, default=0) + 1) * SLOTS_PER_DAY
+        data = bytearray(size)
+        for table_id, row in day.items():
+            data[table_id * SLOTS_PER_DAY : (table_id + 1) * SLOTS_PER_DAY] = row
+        self._store(
+            keys=[*keys, self.epoch_key],
+            args=[changes or b"0", epoch or b"0", bytes(data), max(int(self.ttl), 1)],
+        )
+        return day
+
+    def forget(self, dates):
+        if not dates:
+            return
+        expire = int(self.expire.total_seconds())
+        with self.redis.pipeline() as pipeline:
+            for date_reserved in dates:
+                pipeline.delete(self._key(date_reserved))
+                pipeline.incr(self._changes_key(date_reserved))
+                pipeline.expire(self._changes_key(date_reserved), expire)
+            pipeline.execute()
+
+    def invalidate(self):
+        self.redis.incr(self.epoch_key)
+        keys = list(self.redis.scan_iter(f"{self.key_prefix}:*"))
+        if keys:
+            self.redis.delete(*keys)
+
+
+def _create_index():
+    ttl = getattr(settings, "OCCUPANCY_INDEX_TTL", 60)
+    redis_url = getattr(settings, "OCCUPANCY_REDIS_URL", None)
+    if redis_url:
+        return RedisOccupancyIndex(redis_url, ttl=ttl)
+    return OccupancyIndex(ttl=ttl)
+
+
+occupancy_index = _create_index()
+
+
+def check_consistency(dates):
+    """
+    Сравнивает индекс занятости с данными БД.
+    Имеет смысл только для общего индекса в Redis: индекс в памяти процесса
+    строится из той же БД, с которой сравнивается.
+    Возвращает список расхождений (дата, id стола, слоты в индексе, слоты в БД).
+    """
+    mismatches = []
+    for date_reserved in dates:
+        indexed = occupancy_index.day(date_reserved)
+        actual = build_day(date_reserved)
+        for table_id in set(indexed) | set(actual):
+            indexed_row = indexed.get(table_id, bytearray(SLOTS_PER_DAY))
+            actual_row = actual.get(table_id, bytearray(SLOTS_PER_DAY))
+            if indexed_row != actual_row:
+                mismatches.append(
+                    (date_reserved, table_id, bytes(indexed_row), bytes(actual_row))
+                )
+    return mismatches
+
+
+def booking_window(days=7):
+    """
+    Возвращает даты, доступные для бронирования (начиная с сегодняшней).
+    """
+    today = timezone.localdate()
+    return [today + timedelta(days=offset) for offset in range(days + 1)]
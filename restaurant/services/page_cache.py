@@ -0,0 +1,65 @@
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django.utils.encoding import iri_to_uri
+
+
+def page_key(request):
+    """
+    Ключ кэша страницы - метод и путь без строки запроса: кэшируемые страницы
+    от параметров не зависят, а ключ с ними позволял бы любому посетителю
+    создавать новые записи кэша (?utm_source=..., ?1, ?2, ...).
+    """
+    return f"page:{request.method}:{iri_to_uri(request.path)}"
+
+
+def is_cacheable(request, response):
+    """
+    Ответ можно отдавать другим посетителям, только если он успешный
+    и не содержит ничего персонального: cookie и CSRF-токена в форме.
+    """
+    return (
+        response.status_code == 200
+        and not response.cookies
+        and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE")
+        and not response.has_header("Cache-Control")
+    )
+
+
+def cache_anonymous_page(view):
+    """
+    Кэширует страницу целиком для анонимных посетителей на PAGE_CACHE_TIMEOUT
+    секунд (0 - не кэшировать).
+
+    В отличие от cache_page, ключ кэша не зависит от cookie: у анонимных
+    посетителей разные cookie (csrftoken, аналитика) не меняют страницу,
+    поэтому все они получают одну запись кэша. Авторизованным пользователям
+    страница всегда отрисовывается заново, а ответ помечается Vary: Cookie,
+    чтобы промежуточные кэши не отдавали его другим посетителям.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        timeout = getattr(settings, "PAGE_CACHE_TIMEOUT", 600)
+        if (
+            not timeout
+            or request.method not in ("GET", "HEAD")
+            or request.user.is_authenticated
+        ):
+            response = view(request, *args, **kwargs)
+        else:
+            key = page_key(request)
+            response = cache.get(key)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if hasattr(response, "render"):
+                    response = response.render()
+                if is_cacheable(request, response):
+                    cache.set(key, response, timeout)
+
+        patch_vary_headers(response, ("Cookie",))
+        return response
+
+    return wrapper
@@ -0,0 +1,88 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class KeysetPage:
+    """
+    Страница keyset-пагинации: объекты и курсор следующей страницы.
+    """
+
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def encode_cursor(values):
+    payload = json.dumps([str(value) for value in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def ordering_field(model, field):
+    name = field.lstrip("-")
+    return model._meta.pk if name == "pk" else model._meta.get_field(name)
+
+
+def decode_cursor(queryset, ordering, cursor):
+    """
+    Возвращает значения полей сортировки из курсора
+    или None, если курсор поврежден.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(ordering):
+            return None
+        return [
+            ordering_field(queryset.model, field).to_python(value)
+            for field, value in zip(ordering, values)
+        ]
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+
+def after_cursor(ordering, values):
+    """
+    Условие "строка идет после курсора" для составного ключа сортировки:
+    (a > x) OR (a = x AND b > y) OR ... (для полей с "-" - меньше).
+    """
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        condition |= equal & Q(**{f"{name}__{lookup}": value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def paginate_keyset(queryset, ordering, cursor=None, per_page=20):
+    """
+    Возвращает страницу queryset после курсора.
+
+    Вместо OFFSET страница выбирается условием по значениям ключа сортировки
+    последней строки предыдущей страницы, поэтому запрос использует индекс
+    и не замедляется на дальних страницах. ordering должен однозначно
+    упорядочивать строки (последним полем обычно идет "pk").
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(queryset, ordering, cursor)
+        if values is not None:
+            queryset = queryset.filter(after_cursor(ordering, values))
+
+    items = list(queryset[: per_page + 1])
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        next_cursor = encode_cursor(
+            [getattr(last, field.lstrip("-")) for field in ordering]
+        )
+    return KeysetPage(items, next_cursor)
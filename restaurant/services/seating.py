@@ -0,0 +1,177 @@
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from restaurant.models import Table
+from restaurant.services.availability import DEFAULT_DURATION
+from restaurant.services.occupancy import occupancy_index
+
+
+def best_fit_score(table, guests):
+    """
+    Оценка стола по умолчанию: наименьшее число пустых мест,
+    при равенстве - стол с меньшим номером.
+    """
+    return table.seats - guests, table.number
+
+
+def first_fit_score(table, guests):
+    """
+    Первый подходящий стол по номеру (без учета лишних мест).
+    """
+    return table.number
+
+
+def get_score_function():
+    """
+    Возвращает функцию оценки стола из настройки SEATING_SCORE.
+    """
+    return import_string(
+        getattr(settings, "SEATING_SCORE", "restaurant.services.seating.best_fit_score")
+    )
+
+
+def assign_table(
+    date_reserved,
+    time_reserved,
+    guests,
+    duration=DEFAULT_DURATION,
+    score=None,
+    tables=None,
+):
+    """
+    Подбирает стол для компании из guests гостей на дату и время.
+
+    Из свободных столов, на которых хватает мест, выбирается стол с наименьшей
+    оценкой score(стол, гости) (по умолчанию - функция из SEATING_SCORE).
+    tables - набор столов, из которых идет выбор (по умолчанию все столы).
+    Занятость всех столов проверяется за один проход по индексу занятости,
+    в БД уходит только запрос столов. Возвращает None, если подходящих столов нет.
+    """
+    score = score or get_score_function()
+    tables = Table.objects.all() if tables is None else tables
+    busy_tables = occupancy_index.busy_tables(date_reserved, time_reserved, duration)
+    candidates = [
+        table
+        for table in tables.filter(seats__gte=guests).only("number", "seats")
+        if table.pk not in busy_tables
+    ]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda table: score(table, guests))
+
+
+# максимальное количество объединяемых столов
+MAX_COMBINED_TABLES = 4
+
+
+def find_combination(
+    date_reserved,
+    time_reserved,
+    guests,
+    duration=DEFAULT_DURATION,
+    max_tables=MAX_COMBINED_TABLES,
+    tables=None,
+):
+    """
+    Подбирает группу свободных столов, которые можно объединить, для компании
+    из guests гостей. Возвращает список столов с наименьшим числом пустых мест
+    (при равенстве - с наименьшим числом столов) или None.
+    tables - набор столов, из которых идет выбор (по умолчанию все столы).
+
+    Перебираются только связные группы столов (каждую группу - один раз,
+    начиная со стола с наименьшим id), с отсечением ветвей:
+    - группа, в которой уже хватает мест, дальше не расширяется;
+    - ветвь отбрасывается, если даже самые большие свободные столы
+      не доберут нужное число мест;
+    - перебор останавливается, как только найдена группа без пустых мест.
+    """
+    candidates = Table.objects.all() if tables is None else tables
+    busy_tables = occupancy_index.busy_tables(date_reserved, time_reserved, duration)
+    tables = {
+        table.pk: table
+        for table in candidates.only("number", "seats")
+        if table.pk not in busy_tables
+    }
+    neighbours = {table_id: set() for table_id in tables}
+    for from_id, to_id in Table.combinable_with.through.objects.values_list(
+        "from_table_id", "to_table_id"
+    ):
+        if from_id in tables and to_id in tables:
+            neighbours[from_id].add(to_id)
+
+    # наибольшее число мест, которое можно добавить еще n столами
+    largest = sorted((table.seats for table in tables.values()), reverse=True)
+    top_seats = [sum(largest[:count]) for count in range(max_tables + 1)]
+
+    best = None
+    best_key = None
+
+    def extend(root, group, seats, closed, extension):
+        nonlocal best, best_key
+        if seats >= guests:
+            key = (seats - guests, len(group))
+            if best_key is None or key < best_key:
+                best, best_key = list(group), key
+            return
+        if len(group) == max_tables:
+            return
+        if seats + top_seats[max_tables - len(group)] < guests:
+            return
+
+        extension = set(extension)
+        while extension:
+            if best_key is not None and best_key[0] == 0:
+                return
+            table_id = extension.pop()
+            new_neighbours = {
+                neighbour
+                for neighbour in neighbours[table_id]
+                if neighbour > root and neighbour not in closed
+            }
+            extend(
+                root,
+                group + [table_id],
+                seats + tables[table_id].seats,
+                closed | new_neighbours | {table_id},
+                extension | new_neighbours,
+            )
+
+    for root in sorted(tables):
+        if best_key is not None and best_key[0] == 0:
+            break
+        extend(
+            root,
+            [root],
+            tables[root].seats,
+            {root} | neighbours[root],
+            {neighbour for neighbour in neighbours[root] if neighbour > root},
+        )
+
+    if best is None:
+        return None
+    return sorted((tables[table_id] for table_id in best), key=lambda t: t.number)
+
+
+def is_combinable(tables):
+    """
+    Проверяет, что столы можно объединить: каждый стол связан с остальными
+    через цепочку столов, которые можно поставить рядом.
+    """
+    table_ids = {table.pk for table in tables}
+    if not table_ids:
+        return False
+
+    neighbours = {table_id: set() for table_id in table_ids}
+    for from_id, to_id in Table.combinable_with.through.objects.filter(
+        from_table__in=table_ids, to_table__in=table_ids
+    ).values_list("from_table_id", "to_table_id"):
+        neighbours[from_id].add(to_id)
+
+    reached = set()
+    stack = [next(iter(table_ids))]
+    while stack:
+        table_id = stack.pop()
+        if table_id not in reached:
+            reached.add(table_id)
+            stack.extend(neighbours[table_id] - reached)
+    return reached == table_ids
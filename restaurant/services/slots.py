@@ -0,0 +1,132 @@
+from datetime import datetime, time, timedelta
+from functools import lru_cache, partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from restaurant.models import OpeningHours, SpecialDay
+from restaurant.services.cache import bump_key, get_version
+from restaurant.services.occupancy import SLOT_MINUTES
+
+
+# часы бронирования, если для дня недели они не заданы
+DEFAULT_OPENS_AT = time(10, 0)
+DEFAULT_LAST_BOOKING_AT = time(20, 0)
+
+# версия часов работы (меняется при изменении часов работы и особых дней)
+HOURS_VERSION_KEY = "slots:version"
+
+# время хранения часов работы даты в кэше (в секундах)
+HOURS_CACHE_TIMEOUT = 24 * 60 * 60
+
+# количество дней, доступных для бронирования (начиная с завтрашнего)
+BOOKING_DAYS = 7
+
+
+@lru_cache(maxsize=64)
+def build_slots(opens_at, last_booking_at):
+    """
+    Возвращает кортеж времени начала бронирования с шагом SLOT_MINUTES
+    от opens_at до last_booking_at включительно.
+    Результат вычисляется один раз для каждой пары часов.
+    """
+    slots = []
+    current = datetime.combine(datetime.min, opens_at)
+    last = datetime.combine(datetime.min, last_booking_at)
+    while current <= last:
+        slots.append(current.time())
+        current += timedelta(minutes=SLOT_MINUTES)
+    return tuple(slots)
+
+
+def load_hours(dates):
+    """
+    Возвращает часы бронирования дат из БД: {дата: (начало, последнее время)}
+    или {дата: None}, если ресторан закрыт. Особый день важнее дня недели.
+    """
+    special_days = {day.date: day for day in SpecialDay.objects.filter(date__in=dates)}
+    weekly = {hours.weekday: hours for hours in OpeningHours.objects.all()}
+
+    hours = {}
+    for date_reserved in dates:
+        day = special_days.get(date_reserved) or weekly.get(date_reserved.weekday())
+        if day is None:
+            hours[date_reserved] = (DEFAULT_OPENS_AT, DEFAULT_LAST_BOOKING_AT)
+        elif day.is_closed:
+            hours[date_reserved] = None
+        else:
+            hours[date_reserved] = (day.opens_at, day.last_booking_at)
+    return hours
+
+
+def get_hours(dates):
+    """
+    Возвращает часы бронирования дат (как load_hours) из кэша.
+    Записи кэша привязаны к версии часов работы и устаревают при ее изменении.
+    """
+    version = get_version(HOURS_VERSION_KEY)
+    keys = {
+        f"slots:{version}:{date_reserved.isoformat()}": date_reserved
+        for date_reserved in dates
+    }
+    # закрытый день хранится в кэше как пустой кортеж
+    cached = cache.get_many(list(keys))
+    hours = {keys[key]: value or None for key, value in cached.items()}
+
+    missing = [date_reserved for date_reserved in dates if date_reserved not in hours]
+    if missing:
+        loaded = load_hours(missing)
+        cache.set_many(
+            {
+                f"slots:{version}:{date_reserved.isoformat()}": value or ()
+                for date_reserved, value in loaded.items()
+            },
+            HOURS_CACHE_TIMEOUT,
+        )
+        hours.update(loaded)
+    return hours
+
+
+def get_slots(date_reserved):
+    """
+    Возвращает кортеж времени начала бронирования на дату
+    (пустой кортеж, если ресторан закрыт).
+    """
+    hours = get_hours([date_reserved])[date_reserved]
+    return build_slots(*hours) if hours else ()
+
+
+def get_window_slots(dates):
+    """
+    Возвращает {дата: кортеж времени бронирования} и отсортированный список
+    всего времени, доступного хотя бы в одну из дат.
+    """
+    slots = {
+        date_reserved: build_slots(*hours) if hours else ()
+        for date_reserved, hours in get_hours(dates).items()
+    }
+    return slots, sorted(set().union(*slots.values()))
+
+
+def booking_dates():
+    """
+    Возвращает даты, доступные для бронирования (с завтрашнего дня).
+    Вычисляется при каждом вызове, чтобы не устаревать в долго работающих процессах.
+    """
+    next_day = timezone.localdate() + timedelta(days=1)
+    return [next_day + timedelta(days=offset) for offset in range(BOOKING_DAYS)]
+
+
+def slot_choices(times):
+    """
+    Варианты выбора времени для полей форм.
+    """
+    return [(slot, slot.strftime("%H:%M")) for slot in times]
+
+
+def bump_hours_version():
+    """
+    Делает устаревшими закэшированные часы работы после фиксации транзакции.
+    """
+    transaction.on_commit(partial(bump_key, HOURS_VERSION_KEY))
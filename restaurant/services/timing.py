@@ -0,0 +1,132 @@
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates
+
+
+# количество медленных запросов, хранимых в памяти процесса
+SLOW_REQUEST_BUFFER_SIZE = 100
+
+# количество самых медленных SQL-запросов, сохраняемых для медленного запроса
+SLOW_REQUEST_QUERIES = 5
+
+# строковые и числовые литералы в SQL (значения заменяются на "?")
+SQL_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+# длинные списки параметров: IN (%s, %s, ...) -> IN (...)
+SQL_PARAMS_LIST_RE = re.compile(r"\((?:%s, )+%s\)")
+
+_current = ContextVar("request_timings", default=None)
+
+_slow_requests = deque(maxlen=SLOW_REQUEST_BUFFER_SIZE)
+_slow_requests_lock = threading.Lock()
+
+
+class RequestTimings:
+    """
+    Время этапов обработки запроса (в секундах): {этап: время}.
+    Вложенные замеры одного этапа не суммируются повторно.
+    """
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.active = set()
+
+
+@contextmanager
+def collect_timings():
+    """
+    Собирает время этапов, измеряемых measure, внутри блока.
+    """
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def measure(stage):
+    """
+    Добавляет время выполнения блока к этапу stage текущего запроса.
+    Вне collect_timings ничего не делает.
+    """
+    timings = _current.get()
+    if timings is None or stage in timings.active:
+        yield
+        return
+
+    timings.active.add(stage)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.durations[stage] += time.perf_counter() - started
+        timings.active.discard(stage)
+
+
+class TimedTemplate:
+    """
+    Шаблон, время отрисовки которого учитывается как этап "tpl".
+    """
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        with measure("tpl"):
+            return self.template.render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    Шаблонизатор Django с замером времени отрисовки шаблонов.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+def redact_sql(sql):
+    """
+    Убирает из SQL значения: литералы заменяются на "?",
+    длинные списки параметров сворачиваются. Параметры запроса не сохраняются.
+    """
+    return SQL_LITERAL_RE.sub("?", SQL_PARAMS_LIST_RE.sub("(...)", sql))
+
+
+def slow_request_threshold():
+    """
+    Порог медленного запроса (в секундах).
+    """
+    return getattr(settings, "SLOW_REQUEST_THRESHOLD_MS", 500) / 1000
+
+
+def record_slow_request(sample):
+    with _slow_requests_lock:
+        _slow_requests.append(sample)
+
+
+def get_slow_requests():
+    """
+    Медленные запросы этого процесса, начиная с последнего.
+    """
+    with _slow_requests_lock:
+        return list(reversed(_slow_requests))
+
+
+def clear_slow_requests():
+    with _slow_requests_lock:
+        _slow_requests.clear()
@@ -0,0 +1,184 @@
+import os
+import time
+from functools import partial
+
+from celery.signals import (
+    task_failure,
+    task_postrun,
+    task_prerun,
+    task_retry,
+    worker_process_shutdown,
+)
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from restaurant.models import Booking, OpeningHours, SpecialDay, Table
+from restaurant.services.cache import bump_tables_version, bump_versions
+from restaurant.services.groups import bump_groups_version, forget_user_groups
+from restaurant.services.metrics import (
+    BOOKINGS_CREATED,
+    TASK_DURATION,
+    TASK_FAILURES,
+    TASK_RETRIES,
+    count_on_commit,
+    mark_process_dead,
+)
+from restaurant.services.occupancy import occupancy_index
+from restaurant.services.slots import bump_hours_version
+
+
+def occupancy_key(booking):
+    """
+    Возвращает параметры бронирования, по которым оно учтено в индексе занятости.
+    Отмененное бронирование в индексе не учитывается.
+    """
+    if booking.pk is None or booking.table_id is None or not booking.is_active:
+        return None
+    return (
+        booking.table_id,
+        booking.date_reserved,
+        booking.time_reserved,
+        booking.duration,
+    )
+
+
+def apply_occupancy(key, delta):
+    """
+    Изменяет индекс занятости после фиксации транзакции.
+    """
+    if key is not None:
+        transaction.on_commit(partial(occupancy_index.apply, *key, delta))
+
+
+@receiver(post_init, sender=Booking)
+def remember_occupancy(sender, instance, **kwargs):
+    """
+    Запоминает исходные параметры бронирования для обновления индекса при сохранении.
+    """
+    instance._occupancy_key = occupancy_key(instance)
+
+
+@receiver(post_save, sender=Booking)
+def update_occupancy(sender, instance, **kwargs):
+    """
+    Обновляет индекс занятости при создании или изменении бронирования.
+    """
+    key = occupancy_key(instance)
+    if key != instance._occupancy_key:
+        apply_occupancy(instance._occupancy_key, -1)
+        apply_occupancy(key, 1)
+        bump_versions(
+            {key[1] for key in (instance._occupancy_key, key) if key is not None}
+        )
+        instance._occupancy_key = key
+
+
+@receiver(post_save, sender=Booking)
+def count_created_booking(sender, instance, created, **kwargs):
+    """
+    Учитывает созданное бронирование в метриках.
+    """
+    if created:
+        count_on_commit(BOOKINGS_CREATED)
+
+
+@receiver(post_delete, sender=Booking)
+def release_occupancy(sender, instance, **kwargs):
+    """
+    Освобождает слоты в индексе занятости при отмене (удалении) бронирования.
+    """
+    apply_occupancy(instance._occupancy_key, -1)
+    if instance._occupancy_key is not None:
+        bump_versions([instance._occupancy_key[1]])
+    instance._occupancy_key = None
+
+
+@receiver(post_save, sender=Table)
+@receiver(post_delete, sender=Table)
+def invalidate_tables(sender, **kwargs):
+    """
+    Делает устаревшей закэшированную доступность при изменении столов.
+    """
+    bump_tables_version()
+
+
+@receiver(post_save, sender=OpeningHours)
+@receiver(post_delete, sender=OpeningHours)
+@receiver(post_save, sender=SpecialDay)
+@receiver(post_delete, sender=SpecialDay)
+def invalidate_hours(sender, **kwargs):
+    """
+    Делает устаревшим закэшированный каталог слотов при изменении часов работы.
+    """
+    bump_hours_version()
+
+
+@receiver(m2m_changed, sender=get_user_model().groups.through)
+def invalidate_user_groups(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Сбрасывает закэшированные группы пользователей при изменении их состава.
+    """
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        # изменены группы пользователя instance
+        instance.__dict__.pop("_group_names", None)
+        forget_user_groups([instance.pk])
+    elif pk_set:
+        # изменен состав группы instance
+        forget_user_groups(pk_set)
+    else:
+        # очистка группы - затронутые пользователи уже неизвестны
+        bump_groups_version()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_groups(sender, created=False, **kwargs):
+    """
+    Делает устаревшими закэшированные группы при переименовании и удалении групп.
+    """
+    if not created:
+        bump_groups_version()
+
+
+# время начала выполняемых задач Celery: {id задачи: perf_counter}
+_task_started = {}
+
+
+@task_prerun.connect
+def start_task_timer(task_id, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def observe_task_duration(task_id, task, state=None, **kwargs):
+    """
+    Записывает в метрики время выполнения задачи Celery.
+    """
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        TASK_DURATION.labels(task.name, state or "UNKNOWN").observe(
+            time.perf_counter() - started
+        )
+
+
+@task_failure.connect
+def count_task_failure(sender, exception, **kwargs):
+    TASK_FAILURES.labels(sender.name, type(exception).__name__).inc()
+
+
+@task_retry.connect
+def count_task_retry(sender, **kwargs):
+    TASK_RETRIES.labels(sender.name).inc()
+
+
+@worker_process_shutdown.connect
+def remove_worker_metrics(**kwargs):
+    """
+    Удаляет метрики завершившегося процесса воркера в многопроцессном режиме.
+    """
+    mark_process_dead(os.getpid())
@@ -1,34 +1,130 @@
+from functools import partial
+from smtplib import SMTPException
+
 from celery import shared_task
+from django.core.mail import get_connection
+from django.db import transaction
 from django.utils import timezone
-from datetime import timedelta, datetime
 from restaurant.models import Booking
+from restaurant.services.cache import bump_versions
+from restaurant.services.expiry import (
+    get_watermark,
+    reset_watermark,
+    schedule_due_expiries,
+)
+from restaurant.services import history
+from restaurant.services.mail import to_email
+from restaurant.services.metrics import BOOKINGS_EXPIRED, count_on_commit
+from restaurant.services.occupancy import occupancy_index
+
+
+# количество бронирований, отменяемых в одной транзакции
+EXPIRY_BATCH_SIZE = 1000
+
+# максимальная задержка между повторными попытками отправки писем (в секундах)
+MAIL_RETRY_BACKOFF_MAX = 600
+
+
+def cancel_bookings(booking_ids, cancelled_at):
+    """
+    Отменяет бронирования одним запросом UPDATE (мягкая отмена).
+    """
+    return Booking.objects.filter(pk__in=booking_ids).soft_cancel(cancelled_at)
+
+
+def cancel_in_batches(bookings, cancelled_at, batch_size=EXPIRY_BATCH_SIZE):
+    """
+    Отменяет бронирования из набора запросов пачками,
+    каждая пачка - в отдельной транзакции.
+    """
+    cancelled = 0
+
+    while True:
+        with transaction.atomic():
+            rows = list(
+                bookings.select_for_update(skip_locked=True).values_list(
+                    "pk", "date_reserved"
+                )[:batch_size]
+            )
+            if rows:
+                count = cancel_bookings([pk for pk, _ in rows], cancelled_at)
+                count_on_commit(BOOKINGS_EXPIRED, count)
+                cancelled += count
+                # бронирования отменены без сигналов - сбрасываем индекс занятости
+                # и закэшированную доступность их дат
+                dates = {day for _, day in rows}
+                transaction.on_commit(partial(occupancy_index.forget, dates))
+                bump_versions(dates)
+
+        if len(rows) < batch_size:
+            return cancelled
 
 
 @shared_task
-def cancel_expired_bookings():
+def expire_booking(booking_id):
     """
-    Отменяет бронирование столов, если истек срок бронирования.
+    Отменяет бронирование по окончании его времени.
+    Задача планируется с ETA при создании или изменении бронирования;
+    если время бронирования было изменено, задача ничего не делает.
     """
     now = timezone.now()
-    active_bookings = Booking.objects.filter(is_active=True)
+    return cancel_in_batches(Booking.objects.expired(now).filter(pk=booking_id), now)
 
-    for booking in active_bookings:
-        # Объединение даты и времени бронирования в объект datetime
-        start_datetime = datetime.combine(booking.date_reserved, booking.time_reserved)
 
-        # Проверка, что datetime без информации о временной зоне
-        if timezone.is_naive(start_datetime):
-            # Делаем datetime-aware, устанавливая текущую временную зону
-            start_datetime = timezone.make_aware(
-                start_datetime, timezone.get_current_timezone()
-            )
+@shared_task
+def cancel_expired_bookings(batch_size=EXPIRY_BATCH_SIZE):
+    """
+    Страховочная отмена истекших бронирований.
+    Основная отмена выполняется задачами expire_booking, поэтому БД проверяется,
+    только если наступил watermark - ближайшее возможное окончание бронирования.
+    """
+    now = timezone.now()
+    watermark = get_watermark()
+    if watermark is not None and now < watermark:
+        return 0
 
-        # Вычисляем время истечения бронирования
-        expiration_time = start_datetime + timedelta(hours=booking.duration)
+    # watermark пересчитывается до отмены: бронирования, учтенные
+    # lower_watermark во время отмены, не затираются пересчетом
+    reset_watermark(now)
+    return cancel_in_batches(Booking.objects.expired(now), now, batch_size)
 
-        # Если текущее время больше или равно времени истечения, отменяем бронирование
-        if now >= expiration_time:
-            booking.cancel()
-            print(
-                f"Бронирование для стола {booking.table.number} было отменено в связи с итсечением времени бронирования"
-            )
+
+@shared_task
+def schedule_expiries():
+    """
+    Планирует задачи expire_booking для бронирований, заканчивающихся
+    в ближайшее время (в пределах EXPIRY_ETA_HORIZON).
+    """
+    return schedule_due_expiries()
+
+
+@shared_task
+def prune_history(batch_size=history.RETENTION_BATCH_SIZE):
+    """
+    Ежедневное обслуживание истории: перенос старых отмен в архив
+    и удаление архива старше срока хранения.
+    """
+    return history.prune_history(batch_size)
+
+
+@shared_task(bind=True, max_retries=5)
+def send_emails(self, messages):
+    """
+    Отправляет пачку писем через одно SMTP-соединение.
+    При ошибке SMTP задача повторяется с экспоненциальной задержкой
+    только для неотправленных писем.
+    """
+    sent = 0
+    mail_connection = get_connection()
+    try:
+        mail_connection.open()
+        for message in messages:
+            mail_connection.send_messages([to_email(message)])
+            sent += 1
+    except (SMTPException, OSError) as exc:
+        countdown = min(2**self.request.retries * 10, MAIL_RETRY_BACKOFF_MAX)
+        raise self.retry(exc=exc, args=(messages[sent:],), countdown=countdown)
+    finally:
+        mail_connection.close()
+
+    return sent
@@ -0,0 +1,27 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html_join
+
+from restaurant.services.assets import ASSET_BUNDLES
+
+register = template.Library()
+
+TAG_TEMPLATES = {
+    "css": '<link href="{}" rel="stylesheet">\n',
+    "js": '<script src="{}"></script>\n',
+}
+
+
+@register.simple_tag
+def asset_tags(kind):
+    """
+    Подключает набор статических файлов kind ("css" или "js"):
+    при ASSETS_BUNDLED - один файл сборки (build_assets), иначе - исходные файлы.
+    """
+    bundle_path, paths = ASSET_BUNDLES[kind]
+    if getattr(settings, "ASSETS_BUNDLED", False):
+        paths = (bundle_path,)
+    return format_html_join(
+        "", TAG_TEMPLATES[kind], ((static(path),) for path in paths)
+    )
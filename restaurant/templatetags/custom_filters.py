@@ -3,6 +3,8 @@ from datetime import datetime, date, time
 from django import template
 from django.utils.translation import gettext as _
 
+from restaurant.services import groups
+
 register = template.Library()
 
 
@@ -33,8 +35,9 @@ def translate_date(value):
 def has_group(user, group_name):
     """
     Проверяет, принадлежит ли пользователь указанной группе.
+    Группы пользователя загружаются один раз за запрос (см. get_group_names).
     """
-    return user.groups.filter(name=group_name).exists()
+    return groups.has_group(user, group_name)
 
 
 @register.filter("translate")
@@ -74,7 +77,7 @@ def formatting_date(value: str):
         12: "декабря",
     }
 
-    year, month, day = value.split("-")
+    year, month, day = str(value).split("-")
 
     for k, v in months.items():
         if int(month) == k:
@@ -91,5 +94,5 @@ def formatting_time(value: str):
     Форматирование времени строчного формата.
     """
 
-    clean_time = f"{value[:-3]}"
+    clean_time = f"{str(value)[:-3]}"
     return clean_time
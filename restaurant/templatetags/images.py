@@ -0,0 +1,130 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from restaurant.services.images import (
+    RESPONSIVE_WIDTHS,
+    load_responsive_images,
+    responsive_variant,
+    variant_name,
+)
+from users.models import AVATAR_VARIANTS_DIR
+
+register = template.Library()
+
+
+def srcset(urls):
+    return ", ".join(f"{url} {descriptor}" for url, descriptor in urls)
+
+
+def img_attrs(attrs):
+    """
+    Атрибуты тега из аргументов шаблонного тега (data_aos -> data-aos).
+    """
+    return format_html(
+        "".join(f' {key.replace("_", "-")}="{{}}"' for key in attrs),
+        *attrs.values(),
+    )
+
+
+def picture(webp_srcset, jpeg_srcset, src, attrs):
+    """
+    Элемент picture: WebP для браузеров с его поддержкой, JPEG для остальных.
+    """
+    sizes = img_attrs({"sizes": attrs["sizes"]}) if "sizes" in attrs else ""
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}"{}>'
+        '<img src="{}" srcset="{}"{}></picture>',
+        webp_srcset,
+        sizes,
+        src,
+        jpeg_srcset,
+        img_attrs(attrs),
+    )
+
+
+@register.simple_tag
+def responsive_img(path, sizes="100vw", **attrs):
+    """
+    Статическое изображение с адаптивными вариантами (команда build_images):
+    srcset по ширинам в WebP и JPEG. Без вариантов - обычный img.
+    """
+    widths = load_responsive_images().get(path)
+    if not widths:
+        return format_html('<img src="{}"{}>', static(path), img_attrs(attrs))
+
+    def urls(extension):
+        return srcset(
+            (
+                static(responsive_variant(path, widths, width, extension)),
+                f"{width}w",
+            )
+            for width in widths
+        )
+
+    return picture(
+        urls("webp"),
+        urls("jpg"),
+        static(path),
+        {"sizes": sizes, **attrs},
+    )
+
+
+@register.simple_tag
+def responsive_background(path):
+    """
+    Объявление background-image для статического изображения: JPEG наибольшей
+    ширины и image-set с WebP для браузеров, которые его поддерживают.
+    """
+    widths = load_responsive_images().get(path)
+    if not widths:
+        return format_html("background-image: url({});", static(path))
+
+    width = [size for size in widths if size <= RESPONSIVE_WIDTHS[-1]][-1]
+    webp, jpeg = (
+        static(responsive_variant(path, widths, width, extension))
+        for extension in ("webp", "jpg")
+    )
+    return format_html(
+        "background-image: url({}); "
+        'background-image: image-set(url({}) type("image/webp"), '
+        'url({}) type("image/jpeg"));',
+        jpeg,
+        webp,
+        jpeg,
+    )
+
+
+@register.simple_tag
+def avatar_img(user, size, **attrs):
+    """
+    Аватар пользователя размером size пикселей: варианты 1x и 2x в WebP и JPEG
+    (создаются задачей make_avatar_variants), пока их нет - исходный файл.
+    """
+    if not user.avatar:
+        return ""
+    attrs = {"width": size, "height": size, **attrs}
+    sizes = [variant for variant in user.avatar_variants if variant >= size][:2]
+    if not sizes:
+        return format_html('<img src="{}"{}>', user.avatar.url, img_attrs(attrs))
+
+    name = user.avatar.name.rsplit("/", 1)[-1]
+
+    def urls(extension):
+        return srcset(
+            (
+                default_storage.url(
+                    variant_name(name, variant, extension, AVATAR_VARIANTS_DIR)
+                ),
+                f"{variant / size:g}x",
+            )
+            for variant in sizes
+        )
+
+    return picture(
+        urls("webp"),
+        urls("jpg"),
+        default_storage.url(variant_name(name, sizes[0], "jpg", AVATAR_VARIANTS_DIR)),
+        attrs,
+    )
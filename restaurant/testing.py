@@ -0,0 +1,240 @@
+from contextlib import contextmanager
+from datetime import time, timedelta
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from restaurant.models import Booking, Table
+from restaurant.services.occupancy import occupancy_index
+from users.models import User
+
+
+# объемы данных, на которых сравнивается количество запросов к БД
+DATA_SIZES = (2, 20)
+
+
+@contextmanager
+def assert_max_queries(testcase, max_queries, using=DEFAULT_DB_ALIAS):
+    """
+    Проверяет, что внутри блока выполнено не больше max_queries запросов к БД.
+    При превышении в сообщении перечисляются все запросы.
+    """
+    with CaptureQueriesContext(connections[using]) as queries:
+        yield queries
+    if len(queries) > max_queries:
+        testcase.fail(
+            f"Выполнено {len(queries)} запросов к БД при бюджете {max_queries}:\n"
+            + "\n".join(query["sql"] for query in queries.captured_queries)
+        )
+
+
+def query_budget(max_queries, using=DEFAULT_DB_ALIAS):
+    """
+    Декоратор теста: весь тест должен уложиться в max_queries запросов к БД.
+    """
+
+    def decorator(test):
+        @wraps(test)
+        def wrapper(self, *args, **kwargs):
+            with assert_max_queries(self, max_queries, using):
+                return test(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class QueryBudget:
+    """
+    Бюджет запросов к БД для одного запроса к URL.
+
+    user - кто выполняет запрос: None (аноним), "client" или "staff";
+    args, data и query - аргументы URL, данные POST и параметры GET,
+    значения или функции от словаря с подготовленными данными (см. seed_data).
+    """
+
+    def __init__(
+        self,
+        max_queries,
+        method="get",
+        user="client",
+        args=None,
+        data=None,
+        query=None,
+        status=200,
+    ):
+        self.max_queries = max_queries
+        self.method = method
+        self.user = user
+        self.args = args
+        self.data = data
+        self.query = query
+        self.status = status
+
+    @staticmethod
+    def resolve(value, seeded):
+        return value(seeded) if callable(value) else value
+
+    def url(self, name, seeded):
+        url = reverse(name, args=self.resolve(self.args, seeded))
+        query = self.resolve(self.query, seeded)
+        if query:
+            url += "?" + "&".join(f"{key}={value}" for key, value in query.items())
+        return url
+
+
+def seed_data(size):
+    """
+    Создает данные объема size: столы, действующие и отмененные
+    бронирования клиента и бронирования других гостей на завтра.
+    Возвращает словарь с созданными объектами.
+    """
+    client = User.objects.create(
+        email="budget-client@example.com", first_name="Иван", last_name="Иванов"
+    )
+    staff = User.objects.create(email="budget-staff@example.com", is_staff=True)
+    guests = User.objects.bulk_create(
+        [User(email=f"budget-guest{index}@example.com") for index in range(size)]
+    )
+    tables = Table.objects.bulk_create(
+        [
+            Table(number=number, seats=2 + number % 3 * 2)
+            for number in range(1, size + 2)
+        ]
+    )
+    Table.combinable_with.through.objects.bulk_create(
+        [
+            Table.combinable_with.through(from_table=first, to_table=second)
+            for first, second in zip(tables, tables[1:])
+        ]
+        + [
+            Table.combinable_with.through(from_table=second, to_table=first)
+            for first, second in zip(tables, tables[1:])
+        ]
+    )
+
+    tomorrow = timezone.localdate() + timedelta(days=1)
+    now = timezone.now()
+    bookings = Booking.objects.bulk_create(
+        [
+            Booking(
+                table=table,
+                client=client,
+                date_reserved=tomorrow + timedelta(days=index % 5),
+                time_reserved=time(12, 0),
+            )
+            for index, table in enumerate(tables[:size])
+        ]
+        + [
+            Booking(
+                table=table,
+                client=client,
+                date_reserved=tomorrow,
+                time_reserved=time(15, 0),
+                is_active=False,
+                cancelled_at=now - timedelta(days=1),
+            )
+            for table in tables[:size]
+        ]
+        + [
+            Booking(
+                table=table,
+                client=guest,
+                date_reserved=tomorrow,
+                time_reserved=time(18, 0),
+            )
+            for table, guest in zip(tables, guests)
+        ]
+    )
+    return {
+        "client": client,
+        "staff": staff,
+        "tables": tables,
+        "free_table": tables[-1],
+        "booking": bookings[0],
+        "date": tomorrow,
+    }
+
+
+class QueryBudgetTestMixin:
+    """
+    Проверка бюджетов запросов к БД для всех URL приложения.
+
+    query_budgets - {имя URL: QueryBudget или кортеж QueryBudget}; для каждого
+    URL из urlpatterns должен быть задан бюджет или причина исключения
+    в query_budget_exempt. Каждый запрос выполняется на данных объема
+    DATA_SIZES; количество запросов не должно расти с объемом данных
+    и превышать бюджет.
+    """
+
+    urlpatterns = ()
+    namespace = None
+    query_budgets = {}
+    query_budget_exempt = {}
+    data_sizes = DATA_SIZES
+
+    def seed(self, size):
+        return seed_data(size)
+
+    def reset_state(self):
+        """
+        Сбрасывает кэши, чтобы каждый замер начинался с одинакового состояния.
+        """
+        cache.clear()
+        occupancy_index.invalidate()
+
+    def count_queries(self, name, budget, size):
+        """
+        Выполняет запрос к URL name на данных объема size и возвращает
+        количество запросов к БД. Данные откатываются после замера.
+        """
+        with transaction.atomic():
+            seeded = self.seed(size)
+            if budget.user:
+                self.client.force_login(seeded[budget.user])
+            else:
+                self.client.logout()
+            url = budget.url(f"{self.namespace}:{name}", seeded)
+            data = budget.resolve(budget.data, seeded)
+            self.reset_state()
+
+            with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as queries:
+                response = getattr(self.client, budget.method)(url, data)
+
+            self.assertEqual(response.status_code, budget.status, url)
+            transaction.set_rollback(True)
+        self.client.logout()
+        return len(queries), queries.captured_queries
+
+    def test_every_url_has_budget(self):
+        names = {pattern.name for pattern in self.urlpatterns if pattern.name}
+        self.assertEqual(
+            names - set(self.query_budgets) - set(self.query_budget_exempt), set()
+        )
+
+    def test_query_budgets(self):
+        for name, budgets in self.query_budgets.items():
+            if isinstance(budgets, QueryBudget):
+                budgets = (budgets,)
+            for budget in budgets:
+                with self.subTest(url=name, method=budget.method):
+                    counts = {}
+                    for size in self.data_sizes:
+                        counts[size], captured = self.count_queries(name, budget, size)
+                    smallest, largest = self.data_sizes[0], self.data_sizes[-1]
+
+                    self.assertLessEqual(
+                        counts[largest],
+                        counts[smallest],
+                        f"Количество запросов растет с объемом данных: {counts}\n"
+                        + "\n".join(query["sql"] for query in captured),
+                    )
+                    self.assertLessEqual(
+                        counts[largest],
+                        budget.max_queries,
+                        "\n".join(query["sql"] for query in captured),
+                    )
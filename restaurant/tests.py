@@ -1,3 +1,2148 @@
-from django.test import TestCase
+import gzip
+import json
+import tempfile
+from datetime import datetime, time, timedelta
+from io import StringIO
+from pathlib import Path
+from smtplib import SMTPException
+from unittest import skipUnless
+from unittest.mock import patch
 
-# Create your tests here.
+import fakeredis
+
+from django.contrib.auth.models import AnonymousUser, Group
+from django.contrib.sessions.models import Session
+from django.conf import settings
+from django.core import mail
+from django.core.management import CommandError, call_command
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.mail.backends import locmem
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import QuerySet
+from django.template import Context, Template
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from restaurant.forms import BookingUpdateForm, TableForm
+from restaurant.management.commands.resolve_booking_overlaps import applied_apps
+from restaurant.models import (
+    Table,
+    Booking,
+    BookingHistory,
+    OpeningHours,
+    SpecialDay,
+)
+from restaurant.services.assets import minify_css
+from restaurant.services.availability import get_table_statuses
+from restaurant.services.booking import (
+    BookingConflict,
+    cancel_many,
+    save_booking,
+    save_group_booking,
+)
+from restaurant.services.cache import (
+    TABLES_VERSION_KEY,
+    bump_key,
+    cached_table_statuses,
+    get_version,
+    version_key,
+)
+from restaurant.services.datagen import (
+    generate_data,
+    generated_tables,
+    generated_users,
+)
+from restaurant.services.expiry import (
+    EXPIRY_ETA_HORIZON,
+    WATERMARK_HORIZON,
+    WATERMARK_KEY,
+    lower_watermark,
+    reset_watermark,
+    schedule_due_expiries,
+    schedule_expiry,
+)
+from restaurant.services.groups import get_group_names
+from restaurant.services.history import prune_history
+from restaurant.services.images import load_responsive_images
+from restaurant.services.mail import build_message, enqueue_mail
+from restaurant.services.metrics import get_registry
+from restaurant.services.seating import assign_table, find_combination
+from restaurant.services.slots import HOURS_VERSION_KEY, get_hours, get_slots
+from restaurant.services.timing import (
+    clear_slow_requests,
+    collect_timings,
+    get_slow_requests,
+    redact_sql,
+)
+from restaurant.services.occupancy import (
+    RedisOccupancyIndex,
+    check_consistency,
+    occupancy_index,
+)
+from restaurant.services.occupancy import build_day as real_build_day
+from restaurant.testing import (
+    QueryBudget,
+    QueryBudgetTestMixin,
+    assert_max_queries,
+    seed_data,
+)
+from restaurant.urls import urlpatterns as restaurant_urlpatterns
+from restaurant.tasks import (
+    cancel_expired_bookings,
+    cancel_in_batches,
+    expire_booking,
+    send_emails,
+)
+from users.models import User
+
+
+def redis_index():
+    """
+    Индекс занятости в Redis поверх fakeredis (со скриптами Lua).
+    """
+    with patch("redis.Redis.from_url", return_value=fakeredis.FakeRedis()):
+        return RedisOccupancyIndex("redis://localhost:6379/15")
+
+
+def booking_start(booking):
+    return timezone.make_aware(
+        datetime.combine(booking.date_reserved, booking.time_reserved)
+    )
+
+
+class AvailabilityTestCase(TestCase):
+    """
+    Тесты сервиса доступности столов.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email="test@test.com")
+        self.date = timezone.localdate() + timedelta(days=1)
+        occupancy_index.invalidate()
+        cache.clear()
+
+    @staticmethod
+    def create_tables(count, start=1):
+        return Table.objects.bulk_create(
+            [Table(number=number, seats=4) for number in range(start, start + count)]
+        )
+
+    def test_booked_table_is_unavailable(self):
+        first, second = self.create_tables(2)
+        Booking.objects.create(
+            table=first,
+            client=self.user,
+            date_reserved=self.date,
+            time_reserved=time(18, 0),
+        )
+
+        statuses = dict(get_table_statuses(self.date, time(18, 0)))
+
+        self.assertFalse(statuses[first])
+        self.assertTrue(statuses[second])
+
+    def test_later_booking_blocks_overlapping_request(self):
+        first, second = self.create_tables(2)
+        Booking.objects.create(
+            table=first,
+            client=self.user,
+            date_reserved=self.date,
+            time_reserved=time(19, 0),
+        )
+        Booking.objects.create(
+            table=second,
+            client=self.user,
+            date_reserved=self.date,
+            time_reserved=time(15, 0),
+        )
+
+        statuses = dict(get_table_statuses(self.date, time(18, 0)))
+
+        self.assertFalse(statuses[first])
+        self.assertTrue(statuses[second])
+
+    def test_update_form_hides_overlapping_times(self):
+        (table,) = self.create_tables(1)
+        Booking.objects.create(
+            table=table,
+            client=self.user,
+            date_reserved=self.date,
+            time_reserved=time(12, 0),
+        )
+        booking = Booking.objects.create(
+            table=table,
+            client=self.user,
+            date_reserved=self.date,
+            time_reserved=time(18, 0),
+        )
+
+        choices = [
+            t
+            for t, _ in BookingUpdateForm(instance=booking)
+            .fields["time_reserved"]
+            .choices
+        ]
+
+        self.assertNotIn(time(10, 0), choices)
+        self.assertNotIn(time(14, 30), choices)
+        self.assertIn(time(15, 0), choices)
+        self.assertIn(time(18, 0), choices)
+
+    def test_constant_number_of_queries(self):
+        self.create_tables(5)
+        with self.assertNumQueries(2):
+            get_table_statuses(self.date, time(18, 0))
+
+        self.create_tables(100, start=6)
+        occupancy_index.invalidate()
+        with self.assertNumQueries(2):
+            statuses = get_table_statuses(self.date, time(18, 0))
+        self.assertEqual(len(statuses), 105)
+
+    def test_table_selection_view(self):
+        self.create_tables(3)
+        self.client.force_login(self.user)
+
+        response = self.client.post(
+            reverse("restaurant:table_list"),
+            {"date_reserved": self.date.isoformat(), "time_reserved": "18:00:00"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["table_statuses"]), 3)
+
+
+class OccupancyIndexTestCase(TestCase):
+    """
+    Тесты индекса занятости столов.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email="test@test.com")
+        self.table = Table.objects.create(number=1, seats=4)
+        self.date = timezone.localdate() + timedelta(days=1)
+        occupancy_index.invalidate()
+
+    def is_busy(self, time_reserved):
+        busy = occupancy_index.busy_tables(self.date, time_reserved, 3)
+        return self.table.pk in busy
+
+    def test_index_follows_booking_changes(self):
+        self.assertFalse(self.is_busy(time(18, 0)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = Booking.objects.create(
+                table=self.table,
+                client=self.user,
+                date_reserved=self.date,
+                time_reserved=time(19, 0),
+            )
+        self.assertTrue(self.is_busy(time(18, 0)))
+        self.assertFalse(self.is_busy(time(12, 0)))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.time_reserved = time(11, 0)
+            booking.save()
+        self.assertFalse(self.is_busy(time(18, 0)))
+        self.assertTrue(self.is_busy(time(12, 0)))
+        self.assertEqual(check_consistency([self.date]), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.cancel()
+        self.assertFalse(self.is_busy(time(12, 0)))
+        self.assertEqual(check_consistency([self.date]), [])
+
+    def test_queries_are_served_from_memory(self):
+        occupancy_index.day(self.date)
+        with self.assertNumQueries(0):
+            self.is_busy(time(18, 0))
+
+    def test_consistency_checker_reports_drift(self):
+        occupancy_index.day(self.date)
+        Booking.objects.create(
+            table=self.table,
+            client=self.user,
+            date_reserved=self.date,
+            time_reserved=time(19, 0),
+        )
+
+        mismatches = check_consistency([self.date])
+
+        self.assertEqual(len(mismatches), 1)
+        self.assertEqual(mismatches[0][1], self.table.pk)
+
+    def test_check_command_requires_shared_index(self):
+        with self.assertRaisesMessage(CommandError, "OCCUPANCY_REDIS_URL"):
+            call_command("check_occupancy", stdout=StringIO())
+
+    def create_booking(self, time_reserved):
+        return Booking.objects.create(
+            table=self.table,
+            client=self.user,
+            date_reserved=self.date,
+            time_reserved=time_reserved,
+        )
+
+    def build_with_concurrent_change(self, change):
+        """
+        Подменяет build_day: после чтения БД выполняется change() -
+        изменение, пришедшее от другого процесса во время перестроения.
+        """
+
+        def build_day(date_reserved):
+            day = real_build_day(date_reserved)
+            change()
+            return day
+
+        return patch("restaurant.services.occupancy.build_day", build_day)
+
+    def test_concurrent_apply_is_not_lost_by_rebuild(self):
+        def book():
+            booking = self.create_booking(time(19, 0))
+            occupancy_index.apply(self.table.pk, self.date, time(19, 0), 3, 1)
+            return booking
+
+        with self.build_with_concurrent_change(book):
+            self.assertFalse(self.is_busy(time(18, 0)))
+
+        self.assertTrue(self.is_busy(time(18, 0)))
+
+    def test_redis_index_follows_booking_changes(self):
+        index = redis_index()
+        booking = self.create_booking(time(19, 0))
+        key = f"occupancy:{self.date.isoformat()}"
+
+        self.assertIn(self.table.pk, index.busy_tables(self.date, time(18, 0), 3))
+        self.assertLessEqual(index.redis.ttl(key), index.ttl)
+
+        index.apply(self.table.pk, self.date, time(19, 0), 3, -1)
+        self.assertEqual(index.busy_tables(self.date, time(18, 0), 3), set())
+        index.apply(self.table.pk, self.date, booking.time_reserved, 3, 1)
+        self.assertIn(self.table.pk, index.busy_tables(self.date, time(18, 0), 3))
+
+    def test_redis_rebuild_does_not_overwrite_concurrent_changes(self):
+        index = redis_index()
+        key = f"occupancy:{self.date.isoformat()}"
+
+        def book():
+            self.create_booking(time(19, 0))
+            index.apply(self.table.pk, self.date, time(19, 0), 3, 1)
+
+        with self.build_with_concurrent_change(book):
+            self.assertEqual(index.busy_tables(self.date, time(18, 0), 3), set())
+        # устаревший результат перестроения не сохранен, дата строится заново
+        self.assertIsNone(index.redis.get(key))
+        self.assertIn(self.table.pk, index.busy_tables(self.date, time(18, 0), 3))
+
+        def cancel():
+            Booking.objects.update(is_active=False)
+            index.forget([self.date])
+
+        with self.build_with_concurrent_change(cancel):
+            index.rebuild(self.date)
+        self.assertEqual(index.busy_tables(self.date, time(18, 0), 3), set())
+
+        with self.build_with_concurrent_change(index.invalidate):
+            index.rebuild(self.date)
+        self.assertIsNone(index.redis.get(key))
+
+
+class ExpiredBookingsTestCase(TestCase):
+    """
+    Тесты отмены истекших бронирований.
+    """
+
+    def setUp(self):
+        cache.delete(WATERMARK_KEY)
+        self.user = User.objects.create(email="test@test.com")
+        self.table = Table.objects.create(number=1, seats=4, is_booked=True)
+        self.now = timezone.localtime()
+
+    def create_booking(self, start, duration=3, table=None):
+        return Booking.objects.create(
+            table=table or self.table,
+            client=self.user,
+            date_reserved=start.date(),
+            time_reserved=start.time().replace(second=0, microsecond=0),
+            duration=duration,
+        )
+
+    def test_expiry_is_computed_from_duration(self):
+        expired = self.create_booking(self.now - timedelta(hours=4))
+        long_running = self.create_booking(
+            self.now - timedelta(hours=4),
+            duration=5,
+            table=Table.objects.create(number=2, seats=4),
+        )
+        yesterday = self.create_booking(self.now - timedelta(days=1))
+
+        ids = set(Booking.objects.expired(self.now).values_list("pk", flat=True))
+
+        self.assertEqual(ids, {expired.pk, yesterday.pk})
+        self.assertNotIn(long_running.pk, ids)
+
+    def test_expired_bookings_are_soft_cancelled(self):
+        for days in range(1, 6):
+            self.create_booking(self.now - timedelta(days=days))
+        active = self.create_booking(self.now + timedelta(days=1))
+
+        self.assertEqual(cancel_expired_bookings(batch_size=2), 5)
+
+        self.assertEqual(list(Booking.objects.active()), [active])
+        cancelled = Booking.cancelled.all()
+        self.assertEqual(len(cancelled), 5)
+        self.assertTrue(
+            all(entry.cancelled_at <= timezone.now() for entry in cancelled)
+        )
+        self.assertFalse(BookingHistory.objects.exists())
+
+    def test_soft_cancel_query_count_does_not_depend_on_batch(self):
+        for days in range(1, 4):
+            self.create_booking(self.now - timedelta(days=days))
+        with self.assertNumQueries(5):
+            cancel_expired_bookings()
+
+        for days in range(1, 40):
+            self.create_booking(self.now - timedelta(days=days))
+        cache.delete(WATERMARK_KEY)
+        with self.assertNumQueries(5):
+            cancel_expired_bookings()
+
+
+class SoftCancelTestCase(TestCase):
+    """
+    Тесты мягкой отмены бронирований.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email="test@test.com")
+        self.table = Table.objects.create(number=1, seats=4)
+        self.date = timezone.localdate() + timedelta(days=1)
+        occupancy_index.invalidate()
+        self.booking = Booking.objects.create(
+            table=self.table,
+            client=self.user,
+            date_reserved=self.date,
+            time_reserved=time(18, 0),
+        )
+
+    def test_cancel_is_single_update(self):
+        with self.assertNumQueries(1):
+            self.booking.cancel()
+
+        self.booking.refresh_from_db()
+        self.assertFalse(self.booking.is_active)
+        self.assertIsNotNone(self.booking.cancelled_at)
+        self.assertEqual(list(Booking.cancelled.all()), [self.booking])
+
+    def test_cancelled_slot_can_be_booked_again(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.booking.cancel()
+
+        booking = save_booking(
+            Booking(
+                table=self.table,
+                client=self.user,
+                date_reserved=self.date,
+                time_reserved=time(18, 0),
+            )
+        )
+        self.assertTrue(booking.is_active)
+
+    def test_cancelled_booking_moves_to_history_page(self):
+        self.client.force_login(self.user)
+        url = reverse("restaurant:booking_list")
+
+        self.client.post(url, {"booking_id": self.booking.pk})
+        response = self.client.get(url)
+
+        self.assertEqual(list(response.context["bookings"]), [])
+        self.assertEqual(response.context["booking_history"], [self.booking])
+        update_url = reverse("restaurant:booking_update", args=[self.booking.pk])
+        self.assertEqual(self.client.get(update_url).status_code, 404)
+
+
+class BulkCancelTestCase(TestCase):
+    """
+    Тесты массовой отмены бронирований.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email="test@test.com", first_name="Иван")
+        self.date = timezone.localdate() + timedelta(days=1)
+        self.tables = Table.objects.bulk_create(
+            [Table(number=number, seats=4) for number in range(1, 31)]
+        )
+
+    def create_bookings(self, count, date_reserved=None):
+        return Booking.objects.bulk_create(
+            [
+                Booking(
+                    table=table,
+                    client=self.user,
+                    date_reserved=date_reserved or self.date,
+                    time_reserved=time(18, 0),
+                )
+                for table in self.tables[:count]
+            ]
+        )
+
+    def test_query_count_does_not_depend_on_size(self):
+        query_counts = []
+        for count, date_reserved in ((3, self.date), (30, self.date + timedelta(1))):
+            self.create_bookings(count, date_reserved)
+            bookings = Booking.objects.filter(date_reserved=date_reserved)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(bookings.cancel(notify=False), count)
+            query_counts.append(len(queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+        self.assertFalse(Booking.objects.active().exists())
+
+    def test_caches_are_invalidated_once_per_date(self):
+        self.create_bookings(10)
+        self.create_bookings(10, self.date + timedelta(days=1))
+
+        with patch("restaurant.services.booking.bump_versions") as bump:
+            cancel_many(Booking.objects.all(), notify=False, batch_size=3)
+
+        bump.assert_called_once_with({self.date, self.date + timedelta(days=1)})
+        self.assertEqual(Booking.cancelled.count(), 20)
+
+    def test_emails_are_enqueued_in_batches(self):
+        self.create_bookings(25)
+
+        with patch("restaurant.services.booking.NOTIFY_BATCH_SIZE", 10), patch.object(
+            send_emails, "delay", wraps=send_emails.delay
+        ) as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                Booking.objects.all().cancel()
+
+        self.assertEqual(delay.call_count, 3)
+        self.assertEqual(len(mail.outbox), 25)
+        self.assertIn("отменено", mail.outbox[0].body)
+
+    def test_group_booking_gets_one_email(self):
+        save_group_booking(
+            self.tables[:2],
+            Booking(
+                client=self.user,
+                date_reserved=self.date,
+                time_reserved=time(18, 0),
+                guests=6,
+            ),
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(Booking.objects.all().cancel(), 2)
+
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_staff_endpoint_cancels_evening(self):
+        self.create_bookings(5)
+        Booking.objects.create(
+            table=self.tables[0],
+            client=self.user,
+            date_reserved=self.date,
+            time_reserved=time(12, 0),
+        )
+        url = reverse("restaurant:bulk_cancel_api")
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.post(url, {"date": self.date}).status_code, 403)
+
+        staff = User.objects.create(email="staff@test.com", is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.post(url, {"date": self.date, "time_from": "17:00"})
+
+        self.assertEqual(response.json(), {"cancelled": 5})
+        self.assertEqual(Booking.objects.active().get().time_reserved, time(12, 0))
+        response = self.client.post(url, {"date": "вчера"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_admin_action_cancels_selected_bookings(self):
+        bookings = self.create_bookings(3)
+        admin = User.objects.create(
+            email="admin@test.com", is_staff=True, is_superuser=True
+        )
+        self.client.force_login(admin)
+
+        self.client.post(
+            reverse("admin:restaurant_booking_changelist"),
+            {
+                "action": "cancel_bookings",
+                "_selected_action": [booking.pk for booking in bookings[:2]],
+            },
+        )
+
+        self.assertEqual(Booking.cancelled.count(), 2)
+
+
+class HistoryArchiveTestCase(TestCase):
+    """
+    Тесты архива истории бронирований и срока его хранения.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email="test@test.com")
+        self.table = Table.objects.create(number=1, seats=4)
+        self.now = timezone.now()
+
+    def create_cancelled(self, days_ago):
+        booking = Booking.objects.create(
+            table=self.table,
+            client=self.user,
+            date_reserved=timezone.localdate() - timedelta(days=days_ago),
+            time_reserved=time(18, 0),
+        )
+        Booking.objects.filter(pk=booking.pk).soft_cancel(
+            self.now - timedelta(days=days_ago)
+        )
+        return booking
+
+    @override_settings(HISTORY_VISIBLE_DAYS=90)
+    def test_old_cancellations_move_to_archive(self):
+        recent = self.create_cancelled(10)
+        old = self.create_cancelled(100)
+
+        result = prune_history(batch_size=1, now=self.now)
+
+        self.assertEqual(result["archived"], 1)
+        self.assertEqual(list(Booking.cancelled.all()), [recent])
+        archived = BookingHistory.objects.get()
+        self.assertEqual(archived.date_reserved, old.date_reserved)
+        self.assertEqual(archived.cancelled_at, self.now - timedelta(days=100))
+
+    @override_settings(HISTORY_VISIBLE_DAYS=90, HISTORY_RETENTION_MONTHS=1)
+    def test_expired_archive_is_deleted(self):
+        for _ in range(3):
+            self.create_cancelled(100)
+
+        result = prune_history(batch_size=2, now=self.now)
+
+        self.assertEqual(result["archived"], 3)
+        self.assertEqual(result["deleted_rows"], 3)
+        self.assertFalse(BookingHistory.objects.exists())
+
+    @override_settings(HISTORY_VISIBLE_DAYS=30)
+    def test_history_page_hides_old_cancellations(self):
+        recent = self.create_cancelled(10)
+        self.create_cancelled(40)
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse("restaurant:booking_list"))
+
+        self.assertEqual(response.context["booking_history"], [recent])
+
+
+@skipUnless(
+    connection.vendor == "postgresql", "партиции архива есть только на PostgreSQL"
+)
+class HistoryPartitionMigrationTestCase(TransactionTestCase):
+    """
+    Тесты миграции 0010_bookinghistory_partitions на PostgreSQL
+    (TEST_POSTGRES=True) с существующими записями истории.
+    """
+
+    before = [("restaurant", "0009_booking_soft_cancel")]
+    after = [("restaurant", "0010_bookinghistory_partitions")]
+
+    def setUp(self):
+        MigrationExecutor(connection).migrate(self.before)
+        apps = applied_apps()
+        self.table = apps.get_model("restaurant", "Table").objects.create(
+            number=1, seats=4
+        )
+        self.user = apps.get_model("users", "User").objects.create(
+            email="test@test.com"
+        )
+        self.now = timezone.now()
+        for days_ago in (400, 40, 0):
+            self.create_record(apps, self.now - timedelta(days=days_ago))
+        self.records = self.history(apps)
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def create_record(self, apps, cancelled_at):
+        return apps.get_model("restaurant", "BookingHistory").objects.create(
+            table_id=self.table.pk,
+            client_id=self.user.pk,
+            date_reserved=timezone.localdate(cancelled_at),
+            time_reserved=time(18, 0),
+            cancelled_at=cancelled_at,
+        )
+
+    @staticmethod
+    def history(apps):
+        return list(
+            apps.get_model("restaurant", "BookingHistory")
+            .objects.order_by("pk")
+            .values_list("pk", "cancelled_at")
+        )
+
+    @staticmethod
+    def describe():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relkind, pg_get_constraintdef(p.oid) FROM pg_class c "
+                "JOIN pg_constraint p ON p.conrelid = c.oid AND p.contype = 'p' "
+                "WHERE c.relname = 'restaurant_bookinghistory'"
+            )
+            return cursor.fetchone()
+
+    def migrate(self, target):
+        MigrationExecutor(connection).migrate(target)
+        return applied_apps()
+
+    def test_forwards_and_backwards_keep_history(self):
+        apps = self.migrate(self.after)
+        self.assertEqual(self.describe(), ("p", "PRIMARY KEY (id, cancelled_at)"))
+        self.assertEqual(self.history(apps), self.records)
+        # новые записи получают id после перенесенных
+        record = self.create_record(apps, self.now)
+        self.assertGreater(record.pk, self.records[-1][0])
+        self.records.append((record.pk, record.cancelled_at))
+
+        apps = self.migrate(self.before)
+        self.assertEqual(self.describe(), ("r", "PRIMARY KEY (id)"))
+        self.assertEqual(self.history(apps), self.records)
+        record = self.create_record(apps, self.now)
+        self.assertGreater(record.pk, self.records[-1][0])
+        self.records.append((record.pk, record.cancelled_at))
+
+        apps = self.migrate(self.after)
+        self.assertEqual(self.history(apps), self.records)
+
+
+class BookingExpirySchedulingTestCase(TestCase):
+    """
+    Тесты планирования отмены бронирований по окончании.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email="test@test.com")
+        self.table = Table.objects.create(number=1, seats=4)
+        self.date = timezone.localdate() + timedelta(days=1)
+        cache.delete(WATERMARK_KEY)
+
+    def test_booking_creation_schedules_expiry(self):
+        self.client.force_login(self.user)
+        url = reverse(
+            "restaurant:booking_create",
+            args=[self.table.pk, self.date.isoformat(), "18:00:00"],
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {"message": ""})
+
+        booking = Booking.objects.get()
+        self.assertEqual(booking.time_reserved, time(18, 0))
+        # заканчивается позже EXPIRY_ETA_HORIZON - задачу запланирует schedule_expiries
+        self.assertIsNone(booking.expiry_task_id)
+
+    def test_due_expiries_are_scheduled_once(self):
+        soon = timezone.localtime() - timedelta(hours=2, minutes=50)
+        later = Booking.objects.create(
+            table=self.table,
+            client=self.user,
+            date_reserved=self.date,
+            time_reserved=time(18, 0),
+        )
+        due = Booking.objects.create(
+            table=self.table,
+            client=self.user,
+            date_reserved=soon.date(),
+            time_reserved=soon.time(),
+        )
+
+        self.assertEqual(schedule_due_expiries(), 1)
+        self.assertEqual(schedule_due_expiries(), 0)
+
+        due.refresh_from_db()
+        later.refresh_from_db()
+        self.assertIsNotNone(due.expiry_task_id)
+        self.assertIsNone(later.expiry_task_id)
+        self.assertLess(
+            EXPIRY_ETA_HORIZON.total_seconds(),
+            settings.CELERY_BROKER_TRANSPORT_OPTIONS["visibility_timeout"],
+        )
+
+    def test_rescheduling_revokes_previous_task(self):
+        booking = Booking.objects.create(
+            table=self.table,
+            client=self.user,
+            date_reserved=self.date,
+            time_reserved=time(18, 0),
+            expiry_task_id="previous-task",
+        )
+
+        with patch("restaurant.services.expiry.revoke_expiry") as revoke:
+            with self.captureOnCommitCallbacks(execute=True):
+                schedule_expiry(booking)
+
+        revoke.assert_called_once_with("previous-task")
+        booking.refresh_from_db()
+        self.assertNotEqual(booking.expiry_task_id, "previous-task")
+
+    def test_expire_booking_skips_active_booking(self):
+        past = timezone.localtime() - timedelta(hours=4)
+        expired = Booking.objects.create(
+            table=self.table,
+            client=self.user,
+            date_reserved=past.date(),
+            time_reserved=past.time(),
+        )
+        active = Booking.objects.create(
+            table=self.table,
+            client=self.user,
+            date_reserved=self.date,
+            time_reserved=time(18, 0),
+        )
+
+        self.assertEqual(expire_booking(active.pk), 0)
+        self.assertEqual(expire_booking(expired.pk), 1)
+        self.assertEqual(list(Booking.objects.active()), [active])
+
+    def test_sweep_is_skipped_before_watermark(self):
+        cache.set(WATERMARK_KEY, timezone.now() + timedelta(minutes=10))
+        with self.assertNumQueries(0):
+            self.assertEqual(cancel_expired_bookings(), 0)
+
+    def test_sweep_resets_watermark(self):
+        Booking.objects.create(
+            table=self.table,
+            client=self.user,
+            date_reserved=self.date,
+            time_reserved=time(10, 0),
+        )
+
+        cancel_expired_bookings()
+
+        watermark = cache.get(WATERMARK_KEY)
+        self.assertLessEqual(watermark, timezone.now() + WATERMARK_HORIZON)
+        # более раннее окончание сбрасывает watermark до следующей проверки
+        lower_watermark(timezone.now())
+        self.assertIsNone(cache.get(WATERMARK_KEY))
+
+    def test_lowering_during_sweep_is_not_overwritten(self):
+        def cancel_in_batches(*args, **kwargs):
+            lower_watermark(timezone.now())
+            return 0
+
+        with patch("restaurant.tasks.cancel_in_batches", cancel_in_batches):
+            cancel_expired_bookings()
+
+        self.assertIsNone(cache.get(WATERMARK_KEY))
+
+    def test_lowering_during_reset_is_not_overwritten(self):
+        cache.set(WATERMARK_KEY, timezone.now() + WATERMARK_HORIZON)
+        aggregate = QuerySet.aggregate
+
+        def lowering_aggregate(queryset, *args, **kwargs):
+            lower_watermark(timezone.now())
+            return aggregate(queryset, *args, **kwargs)
+
+        with patch.object(QuerySet, "aggregate", lowering_aggregate):
+            self.assertIsNone(reset_watermark())
+
+        self.assertIsNone(cache.get(WATERMARK_KEY))
+
+
+class DoubleBookingTestCase(TestCase):
+    """
+    Тесты защиты от двойного бронирования стола.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email="test@test.com")
+        self.table = Table.objects.create(number=1, seats=4)
+        self.date = timezone.localdate() + timedelta(days=1)
+        occupancy_index.invalidate()
+        Booking.objects.create(
+            table=self.table,
+            client=self.user,
+            date_reserved=self.date,
+            time_reserved=time(18, 0),
+        )
+
+    def test_overlapping_booking_raises_conflict(self):
+        booking = Booking(
+            table=self.table,
+            client=self.user,
+            date_reserved=self.date,
+            time_reserved=time(19, 0),
+        )
+
+        with self.assertRaises(BookingConflict):
+            save_booking(booking)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_adjacent_booking_is_saved(self):
+        booking = save_booking(
+            Booking(
+                table=self.table,
+                client=self.user,
+                date_reserved=self.date,
+                time_reserved=time(21, 0),
+            )
+        )
+
+        self.assertIsNotNone(booking.pk)
+        self.assertEqual(booking.starts_at, booking_start(booking))
+
+    def test_booking_from_previous_day_past_midnight_conflicts(self):
+        Booking.objects.create(
+            table=self.table,
+            client=self.user,
+            date_reserved=self.date - timedelta(days=1),
+            time_reserved=time(23, 0),
+        )
+        booking = Booking(
+            table=self.table,
+            client=self.user,
+            date_reserved=self.date,
+            time_reserved=time(1, 0),
+        )
+
+        with self.assertRaises(BookingConflict):
+            save_booking(booking)
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_create_view_shows_conflict_error(self):
+        self.client.force_login(self.user)
+        url = reverse(
+            "restaurant:booking_create",
+            args=[self.table.pk, self.date.isoformat(), "19:00:00"],
+        )
+
+        response = self.client.post(url, {"message": ""})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Стол уже забронирован на это время")
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+class BookingOverlapMigrationTestCase(TransactionTestCase):
+    """
+    Тесты миграции 0005_booking_no_overlap с пересекающимися бронированиями.
+    """
+
+    before = [("restaurant", "0004_booking_ends_at_indexes")]
+    after = [("restaurant", "0005_booking_no_overlap")]
+
+    def setUp(self):
+        MigrationExecutor(connection).migrate(self.before)
+        apps = applied_apps()
+        Booking = apps.get_model("restaurant", "Booking")
+        table = apps.get_model("restaurant", "Table").objects.create(number=1, seats=4)
+        client = apps.get_model("users", "User").objects.create(
+            email="test@test.com", first_name="Иван"
+        )
+        date_reserved = timezone.localdate() + timedelta(days=1)
+
+        def create(time_reserved):
+            starts_at = timezone.make_aware(
+                datetime.combine(date_reserved, time_reserved)
+            )
+            return Booking.objects.create(
+                table=table,
+                client=client,
+                date_reserved=date_reserved,
+                time_reserved=time_reserved,
+                ends_at=starts_at + timedelta(hours=3),
+            )
+
+        self.kept = create(time(18, 0))
+        self.overlapping = create(time(19, 0))
+        self.adjacent = create(time(21, 0))
+
+    def tearDown(self):
+        # оставшиеся пересечения не дали бы вернуть схему к последней миграции
+        applied_apps().get_model("restaurant", "Booking").objects.all().delete()
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def migrate(self):
+        MigrationExecutor(connection).migrate(self.after)
+        return applied_apps()
+
+    def test_migration_stops_on_overlaps(self):
+        with self.assertRaisesMessage(CommandError, str(self.overlapping.pk)):
+            self.migrate()
+
+        # миграция остановлена до изменения схемы
+        columns = [
+            column.name
+            for column in connection.introspection.get_table_description(
+                connection.cursor(), "restaurant_booking"
+            )
+        ]
+        self.assertNotIn("starts_at", columns)
+
+        with self.assertRaisesMessage(CommandError, "--cancel"):
+            call_command("resolve_booking_overlaps", stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_cancelled_overlaps_are_archived_and_notified(self):
+        call_command("resolve_booking_overlaps", "--cancel", stdout=StringIO())
+
+        apps = self.migrate()
+        Booking = apps.get_model("restaurant", "Booking")
+        BookingHistory = apps.get_model("restaurant", "BookingHistory")
+        self.assertQuerySetEqual(
+            Booking.objects.order_by("pk").values_list("pk", flat=True),
+            [self.kept.pk, self.adjacent.pk],
+        )
+        record = BookingHistory.objects.get()
+        self.assertEqual(record.time_reserved, time(19, 0))
+        self.assertIsNotNone(record.cancelled_at)
+        self.assertEqual(record.created_at, self.overlapping.created_at)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["test@test.com"])
+        self.assertIn("отменено рестораном", mail.outbox[0].body)
+
+
+def largest_table_score(table, guests):
+    return -table.seats
+
+
+class SeatingTestCase(TestCase):
+    """
+    Тесты автоматического подбора стола по количеству гостей.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email="test@test.com")
+        self.small = Table.objects.create(number=1, seats=2)
+        self.medium = Table.objects.create(number=2, seats=4)
+        self.large = Table.objects.create(number=3, seats=6)
+        self.date = timezone.localdate() + timedelta(days=1)
+        occupancy_index.invalidate()
+
+    def test_smallest_fitting_table_is_assigned(self):
+        self.assertEqual(assign_table(self.date, time(18, 0), 2), self.small)
+        self.assertEqual(assign_table(self.date, time(18, 0), 3), self.medium)
+        self.assertIsNone(assign_table(self.date, time(18, 0), 7))
+
+    def test_busy_tables_are_skipped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(
+                table=self.small,
+                client=self.user,
+                date_reserved=self.date,
+                time_reserved=time(17, 0),
+            )
+
+        self.assertEqual(assign_table(self.date, time(18, 0), 2), self.medium)
+        # занятость берется из индекса, в БД уходит только запрос столов
+        with self.assertNumQueries(1):
+            assign_table(self.date, time(18, 0), 2)
+
+    def test_assignment_is_limited_to_given_tables(self):
+        self.large.combinable_with.add(self.small, self.medium)
+        tables = Table.objects.filter(pk__in=[self.medium.pk, self.large.pk])
+
+        self.assertEqual(
+            find_combination(self.date, time(18, 0), 8), [self.small, self.large]
+        )
+        self.assertEqual(
+            assign_table(self.date, time(18, 0), 2, tables=tables), self.medium
+        )
+        self.assertIsNone(assign_table(self.date, time(18, 0), 7, tables=tables))
+        self.assertEqual(
+            find_combination(self.date, time(18, 0), 8, tables=tables),
+            [self.medium, self.large],
+        )
+
+    @override_settings(SEATING_SCORE="restaurant.tests.largest_table_score")
+    def test_score_function_from_settings(self):
+        self.assertEqual(assign_table(self.date, time(18, 0), 2), self.large)
+
+    def test_auto_assign_redirects_to_booking(self):
+        self.client.force_login(self.user)
+
+        response = self.client.post(
+            reverse("restaurant:table_list"),
+            {
+                "date_reserved": self.date.isoformat(),
+                "time_reserved": "18:00:00",
+                "guests": 4,
+                "auto_assign": "on",
+            },
+        )
+
+        url = reverse(
+            "restaurant:booking_create",
+            args=[self.medium.pk, self.date, time(18, 0)],
+        )
+        self.assertRedirects(response, f"{url}?guests=4")
+
+    def test_booking_rejects_party_larger_than_table(self):
+        self.client.force_login(self.user)
+        url = reverse(
+            "restaurant:booking_create",
+            args=[self.small.pk, self.date.isoformat(), "18:00:00"],
+        )
+
+        response = self.client.post(url, {"guests": 4, "message": ""})
+
+        self.assertContains(response, "только 2 мест")
+        self.assertFalse(Booking.objects.exists())
+
+
+class CombinedTablesTestCase(TestCase):
+    """
+    Тесты подбора и бронирования объединенных столов.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email="test@test.com")
+        # ряд столов 1-2-3-4, стол 5 стоит отдельно
+        self.tables = [
+            Table.objects.create(number=number, seats=seats)
+            for number, seats in [(1, 4), (2, 3), (3, 2), (4, 6), (5, 5)]
+        ]
+        for left, right in zip(self.tables[:3], self.tables[1:4]):
+            left.combinable_with.add(right)
+        self.date = timezone.localdate() + timedelta(days=1)
+        occupancy_index.invalidate()
+
+    def test_minimum_waste_combination(self):
+        tables = find_combination(self.date, time(18, 0), 8)
+        self.assertEqual(tables, [self.tables[2], self.tables[3]])
+
+        tables = find_combination(self.date, time(18, 0), 10)
+        self.assertEqual(tables, self.tables[1:4])
+
+    def test_tables_that_cannot_be_combined_are_skipped(self):
+        self.assertIsNone(find_combination(self.date, time(18, 0), 17))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(
+                table=self.tables[2],
+                client=self.user,
+                date_reserved=self.date,
+                time_reserved=time(18, 0),
+            )
+        # стол 3 занят - столы 1-2 и 4 больше не соединены
+        self.assertEqual(
+            find_combination(self.date, time(18, 0), 7),
+            [self.tables[0], self.tables[1]],
+        )
+
+    def test_search_on_large_floor(self):
+        # зал из 120 столов на 2 места, объединяемых в ряды по 10 столов
+        floor = Table.objects.bulk_create(
+            [Table(number=100 + number, seats=2) for number in range(120)]
+        )
+        for index, table in enumerate(floor):
+            if index % 10:
+                table.combinable_with.add(floor[index - 1])
+
+        tables = find_combination(self.date, time(18, 0), 19, max_tables=10)
+
+        self.assertEqual(len(tables), 10)
+        self.assertTrue(all(table.seats == 2 for table in tables))
+
+    def test_group_booking_is_atomic(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(
+                table=self.tables[1],
+                client=self.user,
+                date_reserved=self.date,
+                time_reserved=time(19, 0),
+            )
+        booking = Booking(
+            client=self.user,
+            date_reserved=self.date,
+            time_reserved=time(18, 0),
+            guests=9,
+        )
+
+        with self.assertRaises(BookingConflict):
+            save_group_booking(self.tables[:3], booking)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_group_booking_view_creates_linked_bookings(self):
+        self.client.force_login(self.user)
+        url = reverse(
+            "restaurant:group_booking_create",
+            args=[self.date.isoformat(), "18:00:00"],
+        )
+        table_ids = f"{self.tables[2].pk},{self.tables[3].pk}"
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f"{url}?tables={table_ids}", {"guests": 8, "message": ""}
+            )
+
+        self.assertRedirects(response, reverse("restaurant:booking_list"))
+        bookings = Booking.objects.order_by("table__number")
+        self.assertEqual([booking.guests for booking in bookings], [2, 6])
+        self.assertEqual(len({booking.group for booking in bookings}), 1)
+        self.assertIsNotNone(bookings[0].group)
+
+    def test_group_booking_view_rejects_separate_tables(self):
+        self.client.force_login(self.user)
+        url = reverse(
+            "restaurant:group_booking_create",
+            args=[self.date.isoformat(), "18:00:00"],
+        )
+
+        response = self.client.get(
+            f"{url}?tables={self.tables[0].pk},{self.tables[4].pk}"
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+
+class BookingIndexesTestCase(TestCase):
+    """
+    Тесты использования индексов в основных запросах бронирований.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email="test@test.com")
+        self.table = Table.objects.create(number=1, seats=4)
+        self.date = timezone.localdate() + timedelta(days=1)
+
+    def assertUsesIndex(self, queryset, index_name):
+        if connection.vendor != "sqlite":
+            # планы PostgreSQL зависят от статистики, а индексы партиций
+            # архива называются по-своему
+            self.skipTest("планы запросов проверяются на SQLite")
+        self.assertIn(index_name, queryset.explain())
+
+    def test_ends_at_is_maintained_on_save(self):
+        booking = Booking.objects.create(
+            table=self.table,
+            client=self.user,
+            date_reserved=self.date.isoformat(),
+            time_reserved="18:00:00",
+        )
+        self.assertEqual(booking.ends_at - timedelta(hours=3), booking_start(booking))
+
+        booking.duration = 2
+        booking.save()
+        booking.refresh_from_db()
+        self.assertEqual(booking.ends_at - timedelta(hours=2), booking_start(booking))
+
+    def test_availability_uses_table_slot_index(self):
+        queryset = Booking.objects.filter(
+            table=self.table,
+            date_reserved=self.date,
+            time_reserved__lt=time(21, 0),
+            ends_at__gt=timezone.now(),
+        )
+        self.assertUsesIndex(queryset, "booking_table_slot_idx")
+
+    def test_booking_list_uses_client_slot_index(self):
+        queryset = Booking.objects.filter(client=self.user).order_by(
+            "date_reserved", "time_reserved"
+        )
+        self.assertUsesIndex(queryset, "booking_client_slot_idx")
+
+    def test_history_uses_client_cancelled_index(self):
+        queryset = BookingHistory.objects.filter(client=self.user).order_by(
+            "-cancelled_at"
+        )
+        self.assertUsesIndex(queryset, "history_client_cancelled_idx")
+
+    def test_expiry_uses_active_ends_index(self):
+        self.assertUsesIndex(Booking.objects.expired(), "booking_active_ends_idx")
+
+
+class MailQueueTestCase(TestCase):
+    """
+    Тесты очереди отправки писем.
+    """
+
+    def test_mail_is_sent_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_mail("Тема", "Текст", "from@test.com", ["to@test.com"])
+            self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["to@test.com"])
+
+    def test_contact_form_enqueues_mail(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("restaurant:contacts"),
+                {"name": "Гость", "email": "guest@test.com", "message": "Привет"},
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("guest@test.com", mail.outbox[0].subject)
+
+    def test_only_unsent_messages_are_retried(self):
+        messages = [
+            build_message("Тема", "Текст", "from@test.com", [f"to{index}@test.com"])
+            for index in range(3)
+        ]
+        send_messages = locmem.EmailBackend.send_messages
+        failures = []
+
+        def flaky_send_messages(backend, emails):
+            if emails[0].to == ["to1@test.com"] and not failures:
+                failures.append(emails)
+                raise SMTPException("Временная ошибка")
+            return send_messages(backend, emails)
+
+        with patch.object(locmem.EmailBackend, "send_messages", flaky_send_messages):
+            send_emails.delay(messages)
+
+        self.assertEqual(len(failures), 1)
+        self.assertEqual(
+            [email.to[0] for email in mail.outbox],
+            ["to0@test.com", "to1@test.com", "to2@test.com"],
+        )
+
+
+class AvailabilityCacheTestCase(TestCase):
+    """
+    Тесты кэша доступности столов.
+    """
+
+    def setUp(self):
+        cache.clear()
+        occupancy_index.invalidate()
+        self.user = User.objects.create(email="test@test.com")
+        self.table = Table.objects.create(number=1, seats=4)
+        self.date = timezone.localdate() + timedelta(days=1)
+
+    def book(self, time_reserved):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Booking.objects.create(
+                table=self.table,
+                client=self.user,
+                date_reserved=self.date,
+                time_reserved=time_reserved,
+            )
+
+    def test_cache_hit_does_not_query_database(self):
+        cached_table_statuses(self.date, time(18, 0))
+        with self.assertNumQueries(0):
+            statuses = cached_table_statuses(self.date, time(18, 0))
+        self.assertEqual(statuses, [(self.table, True)])
+
+    def test_cache_miss_keeps_occupancy_index(self):
+        with patch.object(occupancy_index, "forget") as forget:
+            cached_table_statuses(self.date, time(18, 0))
+            cached_table_statuses(self.date, time(19, 0), duration=2)
+            bump_key(TABLES_VERSION_KEY)
+            cached_table_statuses(self.date, time(18, 0))
+
+        forget.assert_not_called()
+
+    def test_booking_changes_invalidate_date(self):
+        other_date = self.date + timedelta(days=1)
+        cached_table_statuses(self.date, time(18, 0))
+        cached_table_statuses(other_date, time(18, 0))
+
+        booking = self.book(time(18, 0))
+        self.assertEqual(
+            cached_table_statuses(self.date, time(18, 0)), [(self.table, False)]
+        )
+        with self.assertNumQueries(0):
+            cached_table_statuses(other_date, time(18, 0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.cancel()
+        self.assertEqual(
+            cached_table_statuses(self.date, time(18, 0)), [(self.table, True)]
+        )
+
+    def test_expiry_invalidates_date(self):
+        booking = self.book(time(18, 0))
+        cached_table_statuses(self.date, time(18, 0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cancel_in_batches(Booking.objects.filter(pk=booking.pk), timezone.now())
+
+        self.assertEqual(
+            cached_table_statuses(self.date, time(18, 0)), [(self.table, True)]
+        )
+
+    def test_stale_entry_is_served_while_recomputing(self):
+        cached_table_statuses(self.date, time(18, 0))
+        self.book(time(18, 0))
+
+        key = f"availability:{self.date.isoformat()}:1800:3"
+        cache.add(f"{key}:lock", 1)
+        with self.assertNumQueries(0):
+            statuses = cached_table_statuses(self.date, time(18, 0))
+        self.assertEqual(statuses, [(self.table, True)])
+
+        cache.delete(f"{key}:lock")
+        self.assertEqual(
+            cached_table_statuses(self.date, time(18, 0)), [(self.table, False)]
+        )
+
+
+class AvailabilityApiTestCase(TestCase):
+    """
+    Тесты JSON API доступности столов.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email="test@test.com")
+        self.tables = [
+            Table.objects.create(number=number, seats=4) for number in (1, 2)
+        ]
+        self.date = timezone.localdate() + timedelta(days=1)
+        self.url = reverse("restaurant:availability_api")
+
+    def test_grid_for_date_range(self):
+        Booking.objects.create(
+            table=self.tables[0],
+            client=self.user,
+            date_reserved=self.date,
+            time_reserved=time(18, 0),
+        )
+
+        # каталог слотов уже в кэше - в БД уходят только бронирования и столы
+        get_hours([self.date + timedelta(days=offset) for offset in range(7)])
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                self.url, {"start": self.date.isoformat(), "days": 7}
+            )
+
+        data = response.json()
+        self.assertEqual(len(data["days"]), 7)
+        self.assertEqual(data["slots"][0], "10:00")
+        self.assertEqual([table["number"] for table in data["tables"]], [1, 2])
+
+        first, second = data["days"][self.date.isoformat()]
+        self.assertEqual(first[data["slots"].index("15:00")], "1")
+        self.assertEqual(first[data["slots"].index("18:00")], "0")
+        self.assertEqual(first[data["slots"].index("20:00")], "0")
+        self.assertNotIn("0", second)
+
+    def test_conditional_get(self):
+        params = {"start": self.date.isoformat(), "days": 3}
+        etag = self.client.get(self.url, params)["ETag"]
+        self.assertFalse(etag.startswith("W/"))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(
+                table=self.tables[0],
+                client=self.user,
+                date_reserved=self.date + timedelta(days=1),
+                time_reserved=time(18, 0),
+            )
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_follows_versions_bumped_by_other_processes(self):
+        params = {"start": self.date.isoformat(), "days": 3}
+        keys = (
+            version_key(self.date + timedelta(days=2)),
+            TABLES_VERSION_KEY,
+            HOURS_VERSION_KEY,
+        )
+        for key in keys:
+            with self.subTest(key=key):
+                etag = self.client.get(self.url, params)["ETag"]
+
+                # версию меняет другой процесс: без сигналов и записи в БД здесь
+                bump_key(key)
+
+                response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response["ETag"], etag)
+
+    def test_invalid_range(self):
+        response = self.client.get(self.url, {"days": 30})
+        self.assertEqual(response.status_code, 400)
+
+
+class SlotCatalogueTestCase(TestCase):
+    """
+    Тесты каталога слотов по часам работы.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.date = timezone.localdate() + timedelta(days=1)
+
+    def test_default_hours(self):
+        slots = get_slots(self.date)
+
+        self.assertEqual(slots[0], time(10, 0))
+        self.assertEqual(slots[-1], time(20, 0))
+        self.assertEqual(len(slots), 21)
+
+    def test_slots_are_cached_until_hours_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            SpecialDay.objects.create(
+                date=self.date, opens_at=time(12, 0), last_booking_at=time(14, 0)
+            )
+        self.assertEqual(
+            get_slots(self.date),
+            (time(12), time(12, 30), time(13), time(13, 30), time(14)),
+        )
+
+        with self.assertNumQueries(0):
+            get_slots(self.date)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            SpecialDay.objects.filter(date=self.date).delete()
+            OpeningHours.objects.create(weekday=self.date.weekday(), is_closed=True)
+        self.assertEqual(get_slots(self.date), ())
+
+    def test_table_form_rejects_closed_day_and_time(self):
+        OpeningHours.objects.create(weekday=self.date.weekday(), is_closed=True)
+        form = TableForm(
+            {"date_reserved": self.date.isoformat(), "time_reserved": "18:00:00"}
+        )
+        self.assertIn("date_reserved", form.errors)
+
+        other_day = self.date + timedelta(days=1)
+        form = TableForm(
+            {"date_reserved": other_day.isoformat(), "time_reserved": "20:30:00"}
+        )
+        self.assertIn("time_reserved", form.errors)
+
+    def test_date_limits_follow_current_date(self):
+        later = self.date + timedelta(days=30)
+        with patch("restaurant.services.slots.timezone.localdate", return_value=later):
+            form = TableForm()
+
+        attrs = form.fields["date_reserved"].widget.attrs
+        self.assertEqual(attrs["min"], (later + timedelta(days=1)).isoformat())
+        self.assertEqual(attrs["max"], (later + timedelta(days=7)).isoformat())
+
+
+class BookingListTestCase(TestCase):
+    """
+    Тесты постраничного списка бронирований и истории.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email="test@test.com")
+        self.table = Table.objects.create(number=1, seats=4)
+        self.url = reverse("restaurant:booking_list")
+
+    def create_bookings(self, user, count):
+        start = timezone.localdate() + timedelta(days=1)
+        Booking.objects.bulk_create(
+            [
+                Booking(
+                    table=self.table,
+                    client=user,
+                    date_reserved=start + timedelta(days=index // 4),
+                    time_reserved=time(10 + index % 4 * 3),
+                )
+                for index in range(count)
+            ]
+        )
+        cancelled_at = timezone.now()
+        Booking.objects.bulk_create(
+            [
+                Booking(
+                    table=self.table,
+                    client=user,
+                    date_reserved=start - timedelta(days=index),
+                    time_reserved=time(12),
+                    is_active=False,
+                    cancelled_at=cancelled_at - timedelta(minutes=index % 3),
+                )
+                for index in range(count * 10)
+            ]
+        )
+
+    def test_pages_cover_all_bookings(self):
+        self.create_bookings(self.user, 45)
+        self.client.force_login(self.user)
+
+        seen = []
+        params = {}
+        while True:
+            response = self.client.get(self.url, params)
+            seen.extend(booking.pk for booking in response.context["bookings"])
+            if not response.context["next_bookings"]:
+                break
+            params = {"after": response.context["next_bookings"]}
+
+        expected = Booking.objects.active().order_by(
+            "date_reserved", "time_reserved", "pk"
+        )
+        self.assertEqual(seen, list(expected.values_list("pk", flat=True)))
+
+    def test_history_pages_are_ordered_by_cancellation(self):
+        self.create_bookings(self.user, 3)
+        self.client.force_login(self.user)
+
+        first = self.client.get(self.url).context
+        second = self.client.get(
+            self.url, {"history_after": first["next_history"]}
+        ).context
+
+        history = first["booking_history"] + second["booking_history"]
+        self.assertEqual(len(history), 30)
+        self.assertEqual(len({booking.pk for booking in history}), 30)
+        keys = [(booking.cancelled_at, booking.pk) for booking in history]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+
+    def test_query_budget_does_not_depend_on_history_size(self):
+        regular = User.objects.create(email="regular@test.com")
+        self.create_bookings(regular, 300)
+
+        # сессия, пользователь, страница бронирований, страница истории
+        for user in (self.user, regular):
+            self.client.force_login(user)
+            with self.assertNumQueries(4):
+                response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_invalid_cursor_shows_first_page(self):
+        self.create_bookings(self.user, 2)
+        self.client.force_login(self.user)
+
+        response = self.client.get(self.url, {"after": "broken", "history_after": "!"})
+
+        self.assertEqual(len(response.context["bookings"]), 2)
+
+
+class GroupCacheTestCase(TestCase):
+    """
+    Тесты кэша групп пользователя для фильтра has_group.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email="test@test.com")
+        self.managers = Group.objects.create(name="managers")
+        self.user.groups.add(self.managers)
+
+    def test_template_checks_use_one_query(self):
+        template = Template(
+            "{% load custom_filters %}"
+            "{% for _ in items %}{{ user|has_group:'managers' }}"
+            "{{ user|has_group:'cooks' }}{% endfor %}"
+        )
+        user = User.objects.get(pk=self.user.pk)
+
+        with self.assertNumQueries(1):
+            html = template.render(Context({"user": user, "items": range(5)}))
+
+        self.assertEqual(html, "TrueFalse" * 5)
+
+    def test_groups_are_cached_between_requests(self):
+        get_group_names(User.objects.get(pk=self.user.pk))
+
+        # новый объект пользователя, как в следующем запросе
+        with self.assertNumQueries(0):
+            names = get_group_names(User(pk=self.user.pk))
+
+        self.assertEqual(names, {"managers"})
+
+    def test_membership_change_invalidates_cache(self):
+        get_group_names(User.objects.get(pk=self.user.pk))
+        cooks = Group.objects.create(name="cooks")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cooks.user_set.add(self.user)
+        self.assertEqual(
+            get_group_names(User.objects.get(pk=self.user.pk)), {"managers", "cooks"}
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.remove(self.managers)
+        self.assertEqual(get_group_names(User.objects.get(pk=self.user.pk)), {"cooks"})
+
+    def test_anonymous_user_has_no_groups(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(get_group_names(AnonymousUser()), frozenset())
+
+
+class PageCacheTestCase(TestCase):
+    """
+    Тесты кэширования публичных страниц для анонимных посетителей.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_page_is_cached_regardless_of_cookies(self):
+        url = reverse("restaurant:about")
+        self.client.get(url)
+
+        self.client.cookies["analytics"] = "visitor-1"
+        with patch(
+            "django.views.generic.base.TemplateResponseMixin.render_to_response"
+        ) as render:
+            response = self.client.get(url)
+
+        render.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Cookie", response["Vary"])
+
+    def test_query_string_does_not_create_cache_entries(self):
+        url = reverse("restaurant:about")
+        self.client.get(url)
+
+        with patch(
+            "django.views.generic.base.TemplateResponseMixin.render_to_response"
+        ) as render:
+            for number in range(3):
+                response = self.client.get(url, {"utm_source": number})
+
+        render.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(cache.get(f"page:GET:{url}?utm_source=0"))
+
+    def test_authenticated_page_is_not_cached(self):
+        self.client.force_login(User.objects.create(email="test@test.com"))
+
+        response = self.client.get(reverse("restaurant:menu"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(cache.get("page:GET:" + reverse("restaurant:menu")))
+
+    def test_header_links_are_cached_and_user_items_are_not(self):
+        self.client.get(reverse("restaurant:contacts"))
+        self.assertIsNotNone(cache.get(make_template_fragment_key("base_header_links")))
+
+        user = User.objects.create(email="test@test.com")
+        self.client.force_login(user)
+        response = self.client.get(reverse("restaurant:contacts"))
+
+        self.assertContains(response, reverse("restaurant:menu"))
+        self.assertContains(response, reverse("users:profile", args=[user.pk]))
+        self.assertNotContains(response, "Регистрация")
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def test_page_cache_can_be_disabled(self):
+        self.client.get(reverse("restaurant:about"))
+
+        self.assertIsNone(cache.get("page:GET:" + reverse("restaurant:about")))
+
+
+class AssetBuildTestCase(TestCase):
+    """
+    Тесты сборки статических файлов (build_assets).
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        build_dir = tempfile.TemporaryDirectory()
+        static_root = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(build_dir.cleanup)
+        cls.addClassCleanup(static_root.cleanup)
+        cls.static_root = Path(static_root.name)
+
+        overrides = override_settings(
+            STATIC_ROOT=cls.static_root,
+            STATICFILES_DIRS=[build_dir.name, *settings.STATICFILES_DIRS],
+            STORAGES={
+                **settings.STORAGES,
+                "staticfiles": {
+                    "BACKEND": "restaurant.services.assets.ManifestStaticStorage"
+                },
+            },
+            ASSETS_BUNDLED=True,
+        )
+        overrides.enable()
+        cls.addClassCleanup(overrides.disable)
+        call_command("build_assets", stdout=StringIO())
+        cls.addClassCleanup(load_responsive_images.cache_clear)
+        manifest = json.loads((cls.static_root / "staticfiles.json").read_text())
+        cls.paths = manifest["paths"]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_manifest_and_compressed_bundles(self):
+        for bundle in ("dist/bundle.css", "dist/bundle.js"):
+            hashed = self.static_root / self.paths[bundle]
+            self.assertNotEqual(hashed.name, Path(bundle).name)
+            compressed = hashed.with_name(hashed.name + ".gz")
+            self.assertEqual(
+                gzip.decompress(compressed.read_bytes()), hashed.read_bytes()
+            )
+
+        css = (self.static_root / self.paths["dist/bundle.css"]).read_text()
+        self.assertIn(self.paths["css/fonts/bootstrap-icons.woff2"], css)
+
+    def test_bundles_are_served_compressed_with_long_cache(self):
+        url = settings.STATIC_URL + self.paths["dist/bundle.js"]
+        if not url.startswith("/"):
+            url = "/" + url
+
+        response = self.client.get(url, headers={"accept-encoding": "gzip, br"})
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Type"], "text/javascript")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertNotIn("Content-Encoding", self.client.get(url))
+
+    def test_hero_image_has_responsive_srcset(self):
+        response = self.client.get(reverse("restaurant:contacts"))
+
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, self.paths["dist/img/hero-bg-480.webp"] + " 480w")
+        self.assertContains(response, self.paths["img/hero-bg.jpeg"] + " 1980w")
+
+    def test_base_template_uses_bundles(self):
+        response = self.client.get(reverse("restaurant:about"))
+
+        self.assertContains(response, self.paths["dist/bundle.css"])
+        self.assertContains(response, self.paths["dist/bundle.js"])
+        self.assertNotContains(response, "js/main.js")
+
+    def test_minify_css_keeps_strings_and_descendant_selectors(self):
+        source = '/* c */ a :hover , b > i { content: "  /* x */ " ; }'
+
+        self.assertEqual(minify_css(source), 'a :hover,b>i{content: "  /* x */ "}')
+
+
+def sample(name, **labels):
+    return get_registry().get_sample_value(name, labels) or 0
+
+
+class MetricsTestCase(TestCase):
+    """
+    Тесты метрик Prometheus.
+    """
+
+    def setUp(self):
+        cache.clear()
+        cache.delete(WATERMARK_KEY)
+        self.user = User.objects.create(email="test@test.com")
+        self.table = Table.objects.create(number=1, seats=4)
+        self.date = timezone.localdate() + timedelta(days=1)
+
+    def booking(self):
+        return Booking(
+            table=self.table,
+            client=self.user,
+            date_reserved=self.date,
+            time_reserved=time(18, 0),
+        )
+
+    def test_view_latency_and_queries_are_recorded(self):
+        labels = {"view": "restaurant:menu", "method": "GET", "status": "200"}
+        requests = sample("django_view_duration_seconds_count", **labels)
+        queries = sample("django_view_db_queries_count", view="restaurant:menu")
+
+        self.client.get(reverse("restaurant:menu"))
+
+        self.assertEqual(
+            sample("django_view_duration_seconds_count", **labels), requests + 1
+        )
+        self.assertEqual(
+            sample("django_view_db_queries_count", view="restaurant:menu"),
+            queries + 1,
+        )
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_endpoint(self):
+        self.client.get(reverse("restaurant:menu"))
+        response = self.client.get(
+            reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertContains(response, "restaurant_bookings_created_total")
+        self.assertContains(response, "django_view_duration_seconds_bucket")
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_endpoint_requires_token(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        response = self.client.get(
+            reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret"
+        )
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_metrics_endpoint_is_disabled_without_token(self):
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer ")
+        self.assertEqual(response.status_code, 404)
+
+    def test_booking_counters(self):
+        created = sample("restaurant_bookings_created_total")
+        conflicts = sample("restaurant_booking_conflicts_total")
+        cancelled = sample("restaurant_bookings_cancelled_total", source="user")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = save_booking(self.booking())
+        with self.assertRaises(BookingConflict):
+            save_booking(self.booking())
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.cancel()
+
+        self.assertEqual(sample("restaurant_bookings_created_total"), created + 1)
+        self.assertEqual(sample("restaurant_booking_conflicts_total"), conflicts + 1)
+        self.assertEqual(
+            sample("restaurant_bookings_cancelled_total", source="user"),
+            cancelled + 1,
+        )
+
+    def test_expired_bookings_and_task_duration(self):
+        Booking.objects.create(
+            table=self.table,
+            client=self.user,
+            date_reserved=timezone.localdate() - timedelta(days=1),
+            time_reserved=time(18, 0),
+        )
+        name = "restaurant.tasks.cancel_expired_bookings"
+        expired = sample("restaurant_bookings_expired_total")
+        runs = sample("celery_task_duration_seconds_count", task=name, state="SUCCESS")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cancel_expired_bookings.delay()
+
+        self.assertEqual(sample("restaurant_bookings_expired_total"), expired + 1)
+        self.assertEqual(
+            sample("celery_task_duration_seconds_count", task=name, state="SUCCESS"),
+            runs + 1,
+        )
+
+    def test_task_retries_are_counted(self):
+        name = "restaurant.tasks.send_emails"
+        retries = sample("celery_task_retries_total", task=name)
+        message = build_message("Тема", "Текст", "from@test.com", ["to@test.com"])
+        send_messages = locmem.EmailBackend.send_messages
+        failures = []
+
+        def flaky_send_messages(backend, emails):
+            if not failures:
+                failures.append(emails)
+                raise SMTPException("Временная ошибка")
+            return send_messages(backend, emails)
+
+        with patch.object(locmem.EmailBackend, "send_messages", flaky_send_messages):
+            send_emails.delay([message])
+
+        self.assertEqual(sample("celery_task_retries_total", task=name), retries + 1)
+
+
+class ServerTimingTestCase(TestCase):
+    """
+    Тесты заголовка Server-Timing и буфера медленных запросов.
+    """
+
+    def setUp(self):
+        cache.clear()
+        clear_slow_requests()
+        self.addCleanup(clear_slow_requests)
+        self.user = User.objects.create(email="test@test.com")
+        self.staff = User.objects.create(email="staff@test.com", is_staff=True)
+
+    def test_header_contains_stages(self):
+        response = self.client.get(reverse("restaurant:menu"))
+
+        header = response["Server-Timing"]
+        self.assertRegex(header, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertRegex(header, r"tpl;dur=[\d.]+")
+        self.assertRegex(header, r"total;dur=[\d.]+$")
+
+    def test_mail_time_is_measured(self):
+        with collect_timings() as timings:
+            with self.captureOnCommitCallbacks(execute=True):
+                enqueue_mail("Тема", "Текст", "from@test.com", ["to@test.com"])
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertGreater(timings.durations["mail"], 0)
+
+    def test_fast_requests_are_not_sampled(self):
+        self.client.get(reverse("restaurant:menu"))
+
+        self.assertEqual(get_slow_requests(), [])
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_slow_requests_are_sampled_without_parameters(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse("restaurant:booking_list"))
+
+        sample = get_slow_requests()[0]
+        self.assertEqual(sample["view"], "restaurant:booking_list")
+        self.assertGreater(sample["queries"], 0)
+        self.assertTrue(sample["slowest_queries"])
+        for _, sql in sample["slowest_queries"]:
+            self.assertNotIn("test@test.com", sql)
+
+    def test_redact_sql(self):
+        self.assertEqual(
+            redact_sql(
+                "SELECT * FROM users_user WHERE email = 'a@b.c' "
+                "AND id IN (%s, %s, %s) LIMIT 21"
+            ),
+            "SELECT * FROM users_user WHERE email = ? AND id IN (...) LIMIT ?",
+        )
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_slow_requests_page_is_for_staff(self):
+        self.client.force_login(self.user)
+        self.assertEqual(
+            self.client.get(reverse("restaurant:slow_requests")).status_code, 403
+        )
+
+        self.client.force_login(self.staff)
+        self.client.get(reverse("restaurant:menu"))
+        response = self.client.get(reverse("restaurant:slow_requests"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "/menu/")
+
+
+class QueryBudgetTestCase(QueryBudgetTestMixin, TestCase):
+    """
+    Бюджеты запросов к БД для страниц ресторана.
+    """
+
+    urlpatterns = restaurant_urlpatterns
+    namespace = "restaurant"
+    query_budgets = {
+        "index": QueryBudget(0, user=None),
+        "about": QueryBudget(0, user=None),
+        "menu": QueryBudget(0, user=None),
+        "contacts": QueryBudget(0, user=None),
+        "table_list": (
+            QueryBudget(4),
+            QueryBudget(
+                6,
+                method="post",
+                data=lambda seeded: {
+                    "date_reserved": seeded["date"].isoformat(),
+                    "time_reserved": "18:00:00",
+                    "guests": 2,
+                },
+            ),
+        ),
+        "booking_list": QueryBudget(4),
+        "booking_create": QueryBudget(
+            3,
+            args=lambda seeded: [seeded["free_table"].pk, seeded["date"], "18:00"],
+        ),
+        "group_booking_create": QueryBudget(
+            4,
+            args=lambda seeded: [seeded["date"], "20:00"],
+            query=lambda seeded: {
+                "tables": ",".join(str(table.pk) for table in seeded["tables"][:2]),
+                "guests": 6,
+            },
+        ),
+        "booking_update": QueryBudget(6, args=lambda seeded: [seeded["booking"].pk]),
+        "availability_api": QueryBudget(4, user=None),
+        "bulk_cancel_api": QueryBudget(
+            6,
+            method="post",
+            user="staff",
+            data=lambda seeded: {"date": seeded["date"].isoformat()},
+        ),
+        "slow_requests": QueryBudget(2, user="staff"),
+    }
+
+    def test_seating_does_not_query_per_table(self):
+        for size in self.data_sizes:
+            with transaction.atomic():
+                seeded = seed_data(size)
+                self.reset_state()
+                with assert_max_queries(self, 2):
+                    assign_table(seeded["date"], time(18, 0), 2)
+                with assert_max_queries(self, 3):
+                    find_combination(seeded["date"], time(20, 0), 6)
+                transaction.set_rollback(True)
+
+
+class DataGenerationTestCase(TestCase):
+    """
+    Тесты генерации синтетических данных (generate_data) и набора замеров.
+    """
+
+    options = {"tables": 8, "users": 20, "bookings": 150, "history": 300, "seed": 3}
+
+    def snapshot(self):
+        return list(
+            Booking.objects.filter(table__in=generated_tables())
+            .order_by("table__number", "date_reserved", "time_reserved", "is_active")
+            .values_list("table__number", "date_reserved", "time_reserved", "guests")
+        )
+
+    def test_generation_is_repeatable_without_overlaps(self):
+        created = generate_data(**self.options)
+        snapshot = self.snapshot()
+
+        self.assertEqual(generated_tables().count(), 8)
+        self.assertEqual(generated_users().count(), 20)
+        self.assertEqual(
+            Booking.objects.active().filter(table__in=generated_tables()).count(),
+            created["bookings"],
+        )
+        self.assertEqual(
+            created["cancelled"] + created["history"], self.options["history"]
+        )
+        self.assertEqual(BookingHistory.objects.count(), created["history"])
+        active = Booking.objects.active().filter(table__in=generated_tables())
+        for booking in active:
+            self.assertFalse(
+                active.filter(
+                    table=booking.table,
+                    starts_at__lt=booking.ends_at,
+                    ends_at__gt=booking.starts_at,
+                )
+                .exclude(pk=booking.pk)
+                .exists()
+            )
+
+        self.assertEqual(generate_data(**self.options), created)
+        self.assertEqual(self.snapshot(), snapshot)
+
+    def test_clear_removes_generated_data(self):
+        generate_data(**self.options)
+
+        call_command("generate_data", clear=True, stdout=StringIO())
+
+        self.assertFalse(generated_tables().exists())
+        self.assertFalse(generated_users().exists())
+        self.assertFalse(Booking.objects.exists())
+        self.assertFalse(BookingHistory.objects.exists())
+
+    def test_bench_suite_writes_results_and_rolls_back(self):
+        generate_data(**self.options)
+        snapshot = self.snapshot()
+        tables_version = get_version(TABLES_VERSION_KEY)
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / "bench.json"
+            call_command("bench_suite", repeat=2, output=str(output), stdout=StringIO())
+            report = json.loads(output.read_text())
+
+        self.assertEqual(
+            set(report["results"]),
+            {
+                "availability_search",
+                "table_statuses",
+                "booking_create",
+                "booking_list",
+                "expiry",
+                "cancellation",
+            },
+        )
+        self.assertEqual(report["database"]["vendor"], connection.vendor)
+        self.assertLessEqual(
+            report["results"]["cancellation"]["min_ms"],
+            report["results"]["cancellation"]["p50_ms"],
+        )
+        self.assertEqual(self.snapshot(), snapshot)
+        # холодный старт действительно сбрасывает кэш, сессии не остаются
+        self.assertNotEqual(get_version(TABLES_VERSION_KEY), tables_version)
+        self.assertFalse(Session.objects.exists())
@@ -9,6 +9,10 @@ from restaurant.views import (
     BookingUpdateView,
     TableSelectionView,
     BookingCreateView,
+    GroupBookingCreateView,
+    AvailabilityApiView,
+    BulkCancelApiView,
+    SlowRequestsView,
 )
 
 
@@ -28,5 +32,15 @@ urlpatterns = [
         BookingCreateView.as_view(),
         name="booking_create",
     ),
+    path(
+        "booking/group/<date_reserved>/<time_reserved>/",
+        GroupBookingCreateView.as_view(),
+        name="group_booking_create",
+    ),
     path("booking/update/<int:pk>", BookingUpdateView.as_view(), name="booking_update"),
+    # api
+    path("api/availability/", AvailabilityApiView.as_view(), name="availability_api"),
+    path("api/bookings/cancel/", BulkCancelApiView.as_view(), name="bulk_cancel_api"),
+    # staff
+    path("slow_requests/", SlowRequestsView.as_view(), name="slow_requests"),
 ]
@@ -1,15 +1,46 @@
-from datetime import datetime, timedelta
+import hashlib
+import re
+import secrets
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+
 from django.contrib import messages
-from django.contrib.auth.mixins import LoginRequiredMixin
-from django.core.mail import send_mail
-from django.http import HttpResponse
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.decorators import method_decorator
 from django.views import View
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from django.views.generic import ListView, TemplateView, UpdateView
-from config import settings
+from django.views.static import serve
+from django.conf import settings
+from prometheus_client import CONTENT_TYPE_LATEST
 from restaurant.forms import TableForm, BookingForm, BookingUpdateForm
-from restaurant.models import Table, Booking, BookingHistory
+from restaurant.models import Table, Booking
+from restaurant.services.availability import get_availability_grid
+from restaurant.services.booking import (
+    BookingConflict,
+    save_booking,
+    save_group_booking,
+)
+from restaurant.services.cache import (
+    cached_table_statuses,
+    get_version,
+    get_versions,
+)
+from restaurant.services.expiry import schedule_expiry
+from restaurant.services.mail import enqueue_mail
+from restaurant.services.metrics import export_metrics
+from restaurant.services.page_cache import cache_anonymous_page
+from restaurant.services.pagination import paginate_keyset
+from restaurant.services.history import history_cutoff
+from restaurant.services.slots import HOURS_VERSION_KEY, get_window_slots
+from restaurant.services.timing import get_slow_requests, slow_request_threshold
+from restaurant.services.seating import assign_table, find_combination, is_combinable
 from restaurant.templatetags.custom_filters import formatting_date, formatting_time
 
 
@@ -38,22 +69,35 @@ class TableSelectionView(LoginRequiredMixin, View):
                 form.cleaned_data["time_reserved"], "%H:%M:%S"
             ).time()
 
-            # Получаем все столы и проверяем их доступность
-            tables = Table.objects.all()
-            table_statuses = []
-            for table in tables:
-                is_available = not Booking.objects.filter(
-                    table=table,
-                    date_reserved=date_reserved,
-                    time_reserved__range=(
-                        time_reserved,
-                        (
-                            datetime.combine(date_reserved, time_reserved)
-                            + timedelta(hours=3)
-                        ).time(),
-                    ),
-                ).exists()
-                table_statuses.append((table, is_available))
+            guests = form.cleaned_data["guests"]
+
+            if form.cleaned_data["auto_assign"]:
+                # Подбираем наименьший свободный стол, за которым хватает мест
+                table = assign_table(date_reserved, time_reserved, guests)
+                if table is not None:
+                    url = reverse(
+                        "restaurant:booking_create",
+                        args=[table.pk, date_reserved, time_reserved],
+                    )
+                    return redirect(f"{url}?guests={guests}")
+
+                # Для большой компании подбираем объединяемые столы
+                tables = find_combination(date_reserved, time_reserved, guests)
+                if tables is not None:
+                    url = reverse(
+                        "restaurant:group_booking_create",
+                        args=[date_reserved, time_reserved],
+                    )
+                    table_ids = ",".join(str(table.pk) for table in tables)
+                    return redirect(f"{url}?tables={table_ids}&guests={guests}")
+
+                form.add_error(
+                    None, f"Нет свободных столов на {guests} гостей в это время"
+                )
+                return render(request, "restaurant/table_list.html", {"form": form})
+
+            # Получаем все столы вместе с их доступностью (через кэш)
+            table_statuses = cached_table_statuses(date_reserved, time_reserved)
 
             return render(
                 request,
@@ -63,11 +107,122 @@ class TableSelectionView(LoginRequiredMixin, View):
                     "table_statuses": table_statuses,
                     "selected_date": date_reserved,
                     "selected_time": time_reserved,
+                    "guests": guests,
                 },
             )
         return render(request, "restaurant/table_list.html", {"form": form})
 
 
+# максимальное количество дней в ответе API доступности (окно выбора даты в TableForm)
+AVAILABILITY_API_DAYS = 7
+
+
+def get_availability_dates(request):
+    """
+    Возвращает даты, запрошенные у API доступности параметрами start и days.
+    """
+    start = request.GET.get("start")
+    start = (
+        date.fromisoformat(start) if start else timezone.localdate() + timedelta(days=1)
+    )
+    days = int(request.GET.get("days", AVAILABILITY_API_DAYS))
+    if not 1 <= days <= AVAILABILITY_API_DAYS:
+        raise ValueError(f"days должно быть от 1 до {AVAILABILITY_API_DAYS}")
+    return [start + timedelta(days=offset) for offset in range(days)]
+
+
+def availability_etag(request):
+    """
+    Строгий ETag ответа API доступности: зависит только от запрошенных дат
+    и их версий в кэше, поэтому проверка не требует запросов к БД.
+    Версии меняет любой процесс, изменивший бронирования, поэтому они хранятся
+    в общем кэше (REDIS_CACHE_URL обязателен вне тестов).
+    """
+    try:
+        dates = get_availability_dates(request)
+    except ValueError:
+        return None
+
+    versions = get_versions(dates)
+    payload = ";".join(f"{day}={versions[day]}" for day in [None, *dates])
+    payload += f";hours={get_version(HOURS_VERSION_KEY)}"
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class AvailabilityApiView(View):
+    """
+    Доступность столов на несколько дней в формате JSON.
+    Для каждой даты возвращается строка по каждому столу: "1" - стол свободен
+    на соответствующее время из slots, "0" - занят.
+    """
+
+    @method_decorator(cache_control(no_cache=True))
+    @method_decorator(condition(etag_func=availability_etag))
+    def get(self, request):
+        try:
+            dates = get_availability_dates(request)
+        except ValueError as error:
+            return JsonResponse({"error": str(error)}, status=400)
+
+        day_slots, times = get_window_slots(dates)
+        tables, grid = get_availability_grid(dates, times)
+        # время вне часов работы дня недоступно
+        for day, rows in grid.items():
+            open_times = [slot in day_slots[day] for slot in times]
+            grid[day] = [
+                [free and is_open for free, is_open in zip(row, open_times)]
+                for row in rows
+            ]
+
+        return JsonResponse(
+            {
+                "slots": [t.strftime("%H:%M") for t in times],
+                "tables": [
+                    {"id": table.pk, "number": table.number, "seats": table.seats}
+                    for table in tables
+                ],
+                "days": {
+                    day.isoformat(): [
+                        "".join("1" if free else "0" for free in row) for row in rows
+                    ]
+                    for day, rows in grid.items()
+                },
+            }
+        )
+
+
+class BulkCancelApiView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """
+    Массовая отмена бронирований сотрудником (например, при закрытии ресторана).
+    Параметры POST: date - дата (ГГГГ-ММ-ДД), time_from и time_to -
+    необязательный интервал времени начала бронирований (ЧЧ:ММ).
+    """
+
+    raise_exception = True
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def post(self, request):
+        try:
+            date_reserved = date.fromisoformat(request.POST["date"])
+            bookings = Booking.objects.filter(date_reserved=date_reserved)
+            if request.POST.get("time_from"):
+                bookings = bookings.filter(
+                    time_reserved__gte=time.fromisoformat(request.POST["time_from"])
+                )
+            if request.POST.get("time_to"):
+                bookings = bookings.filter(
+                    time_reserved__lte=time.fromisoformat(request.POST["time_to"])
+                )
+        except (KeyError, ValueError):
+            return JsonResponse(
+                {"error": "Укажите дату ГГГГ-ММ-ДД и время ЧЧ:ММ"}, status=400
+            )
+
+        return JsonResponse({"cancelled": bookings.cancel()})
+
+
 class BookingCreateView(LoginRequiredMixin, View):
     """
     Создание бронирования.
@@ -87,7 +242,9 @@ class BookingCreateView(LoginRequiredMixin, View):
                 "table": table,
                 "date_reserved": date_reserved,
                 "time_reserved": time_reserved,
-            }
+                "guests": request.GET.get("guests", 2),
+            },
+            table=table,
         )
 
         return render(
@@ -107,42 +264,131 @@ class BookingCreateView(LoginRequiredMixin, View):
         Присваивание текущего пользователя к заказу.
         Логирование данные перед сохранением.
         """
-        form = BookingForm(request.POST)
+        table = get_object_or_404(Table, id=table_id)
+        form = BookingForm(request.POST, table=table)
         if form.is_valid():
             booking = form.save(commit=False)
             booking.client = self.request.user
             booking.table_id = table_id
             booking.date_reserved = date_reserved
             booking.time_reserved = time_reserved
-            booking.save()
-
-            # Отправка письма пользователю
-            subject = "Подтверждение бронирования стола"
-            message = (
-                f"Уважаемый(ая) {request.user.first_name},\n\n"
-                f"Стол №{booking.table.number} [мест: {booking.table.seats}] на "
-                f"{formatting_date(booking.date_reserved)} в {formatting_time(booking.time_reserved)} "
-                f"успешно забронирован.\n\n"
-                f"Спасибо за использование сервиса!\n"
-                f"До скорой встречи!"
-            )
-            from_email = settings.EMAIL_HOST_USER
-            recipient_list = [request.user.email]
-            send_mail(subject, message, from_email, recipient_list)
+            try:
+                save_booking(booking)
+            except BookingConflict as error:
+                form.add_error(None, str(error))
+            else:
+                schedule_expiry(booking)
+
+                # Отправка письма пользователю
+                subject = "Подтверждение бронирования стола"
+                message = (
+                    f"Уважаемый(ая) {request.user.first_name},\n\n"
+                    f"Стол №{booking.table.number} [мест: {booking.table.seats}] на "
+                    f"{formatting_date(booking.date_reserved)} в {formatting_time(booking.time_reserved)} "
+                    f"для {booking.guests} гостей успешно забронирован.\n\n"
+                    f"Спасибо за использование сервиса!\n"
+                    f"До скорой встречи!"
+                )
+                from_email = settings.EMAIL_HOST_USER
+                recipient_list = [request.user.email]
+                enqueue_mail(subject, message, from_email, recipient_list)
+
+                return redirect("restaurant:booking_list")
 
-            return redirect("restaurant:booking_list")
-        else:
-            table = Table.objects.get(id=table_id)
-            return render(
-                request,
-                "restaurant/booking_form.html",
-                {
-                    "form": form,
-                    "table": table,
-                    "date_reserved": date_reserved,
-                    "time_reserved": time_reserved,
-                },
-            )
+        return render(
+            request,
+            "restaurant/booking_form.html",
+            {
+                "form": form,
+                "table": table,
+                "date_reserved": date_reserved,
+                "time_reserved": time_reserved,
+            },
+        )
+
+
+class GroupBookingCreateView(LoginRequiredMixin, View):
+    """
+    Бронирование объединенных столов для большой компании.
+    Столы передаются параметром tables (id через запятую).
+    """
+
+    @staticmethod
+    def get_tables(request):
+        """
+        Получение объединяемых столов из параметров запроса.
+        """
+        table_ids = {
+            int(table_id)
+            for table_id in request.GET.get("tables", "").split(",")
+            if table_id.isdigit()
+        }
+        tables = list(Table.objects.filter(pk__in=table_ids).order_by("number"))
+        if len(tables) != len(table_ids) or not is_combinable(tables):
+            raise Http404("Эти столы нельзя объединить")
+        return tables
+
+    def get(self, request, date_reserved, time_reserved):
+        """
+        Получение информации о столах, дате и времени.
+        """
+        tables = self.get_tables(request)
+        form = BookingForm(
+            initial={"guests": request.GET.get("guests", 2)}, tables=tables
+        )
+        return self.render_form(request, form, date_reserved, time_reserved)
+
+    def post(self, request, date_reserved, time_reserved):
+        """
+        Создание связанных бронирований всех столов в одной транзакции.
+        """
+        tables = self.get_tables(request)
+        form = BookingForm(request.POST, tables=tables)
+        if form.is_valid():
+            booking = form.save(commit=False)
+            booking.client = self.request.user
+            booking.date_reserved = date_reserved
+            booking.time_reserved = time_reserved
+            try:
+                bookings = save_group_booking(tables, booking)
+            except BookingConflict as error:
+                form.add_error(None, str(error))
+            else:
+                for linked in bookings:
+                    schedule_expiry(linked)
+
+                # Отправка письма пользователю
+                numbers = ", ".join(f"№{table.number}" for table in tables)
+                subject = "Подтверждение бронирования столов"
+                message = (
+                    f"Уважаемый(ая) {request.user.first_name},\n\n"
+                    f"Столы {numbers} [мест: {form.seats}] на "
+                    f"{formatting_date(booking.date_reserved)} в {formatting_time(booking.time_reserved)} "
+                    f"для {form.cleaned_data['guests']} гостей успешно забронированы.\n\n"
+                    f"Спасибо за использование сервиса!\n"
+                    f"До скорой встречи!"
+                )
+                from_email = settings.EMAIL_HOST_USER
+                recipient_list = [request.user.email]
+                enqueue_mail(subject, message, from_email, recipient_list)
+
+                return redirect("restaurant:booking_list")
+
+        return self.render_form(request, form, date_reserved, time_reserved)
+
+    @staticmethod
+    def render_form(request, form, date_reserved, time_reserved):
+        return render(
+            request,
+            "restaurant/booking_form.html",
+            {
+                "form": form,
+                "tables": form.tables,
+                "seats": form.seats,
+                "date_reserved": date_reserved,
+                "time_reserved": time_reserved,
+            },
+        )
 
 
 class BookingUpdateView(LoginRequiredMixin, UpdateView):
@@ -154,6 +400,12 @@ class BookingUpdateView(LoginRequiredMixin, UpdateView):
     form_class = BookingUpdateForm
     success_url = reverse_lazy("restaurant:booking_list")
 
+    def get_queryset(self):
+        """
+        Редактировать можно только действующие бронирования.
+        """
+        return Booking.objects.active().select_related("table")
+
     def form_valid(self, form):
         """
         Переопределение формы валидации.
@@ -168,9 +420,17 @@ class BookingUpdateView(LoginRequiredMixin, UpdateView):
         print(f"Стол: {booking.table}")
         print(f"Клиент: {booking.client}")
 
-        booking.save()
+        try:
+            save_booking(booking)
+        except BookingConflict as error:
+            form.add_error(None, str(error))
+            return self.form_invalid(form)
 
-        return super().form_valid(form)
+        if "time_reserved" in form.changed_data:
+            schedule_expiry(booking)
+
+        self.object = booking
+        return redirect(self.get_success_url())
 
     def form_invalid(self, form):
         """
@@ -184,35 +444,45 @@ class BookingUpdateView(LoginRequiredMixin, UpdateView):
         Дополнительная информация
         """
         context = super().get_context_data(**kwargs)
-        table = Table.objects.get(pk=self.object.table.pk)
-
-        context["table"] = table
+        context["table"] = self.object.table
         context["date"] = self.object.date_reserved
         context["is_edit"] = True
 
         return context
 
 
+# размер страницы списка бронирований и истории
+BOOKINGS_PER_PAGE = 20
+HISTORY_PER_PAGE = 20
+
+
 class BookingListView(LoginRequiredMixin, ListView):
     """
     Просмотр списка бронирований
     """
 
     model = Booking
+    template_name = "restaurant/booking_list.html"
     context_object_name = "bookings"
 
     def get_queryset(self):
         """
-        Просмотр только своих бронирований
+        Просмотр только своих бронирований, постранично (keyset-пагинация)
         """
-        user = self.request.user
+        queryset = (
+            Booking.objects.active()
+            .filter(client=self.request.user)
+            .select_related("table")
+        )
 
         # порядок отображения по дате и времени
-        ordered = Booking.objects.filter(client=user).order_by(
-            "date_reserved", "time_reserved"
+        self.page = paginate_keyset(
+            queryset,
+            ("date_reserved", "time_reserved", "pk"),
+            cursor=self.request.GET.get("after"),
+            per_page=BOOKINGS_PER_PAGE,
         )
-        print(ordered)
-        return ordered
+        return self.page.items
 
     @staticmethod
     def post(request):
@@ -220,7 +490,9 @@ class BookingListView(LoginRequiredMixin, ListView):
         Отмена бронирования
         """
         booking_id = request.POST.get("booking_id")
-        booking = get_object_or_404(Booking, pk=booking_id, client=request.user)
+        booking = get_object_or_404(
+            Booking.objects.active(), pk=booking_id, client=request.user
+        )
         booking.cancel()
         messages.success(request, "Бронирование успешно отменено.")
         return redirect("restaurant:booking_list")
@@ -230,10 +502,18 @@ class BookingListView(LoginRequiredMixin, ListView):
         Дополнительная информация
         """
         context = super().get_context_data(**kwargs)
-        context["booking_history"] = BookingHistory.objects.filter(
-            client=self.request.user
-        ).order_by("-cancelled_at")
-        # print(context['booking_history'])
+        # история - отмененные бронирования (старые отмены в архиве не показываются)
+        history_page = paginate_keyset(
+            Booking.cancelled.filter(
+                client=self.request.user, cancelled_at__gte=history_cutoff()
+            ).select_related("table"),
+            ("-cancelled_at", "-pk"),
+            cursor=self.request.GET.get("history_after"),
+            per_page=HISTORY_PER_PAGE,
+        )
+        context["booking_history"] = history_page.items
+        context["next_bookings"] = self.page.next_cursor
+        context["next_history"] = history_page.next_cursor
         return context
 
 
@@ -269,7 +549,7 @@ class MainPageView(TemplateView):
                """
 
         # Отправка письма
-        send_mail(
+        enqueue_mail(
             f"Сообщение от пользователя {email}",
             message,
             settings.EMAIL_HOST_USER,
@@ -280,6 +560,7 @@ class MainPageView(TemplateView):
         return render(request, self.success_template)
 
 
+@method_decorator(cache_anonymous_page, name="get")
 class AboutPageView(TemplateView):
     """
     Страница с информацией о ресторане.
@@ -288,6 +569,7 @@ class AboutPageView(TemplateView):
     template_name = "restaurant/about.html"
 
 
+@method_decorator(cache_anonymous_page, name="get")
 class MenuPageView(TemplateView):
     """
     Страница с меню.
@@ -330,7 +612,7 @@ class ContactPageView(View):
                """
 
         # Отправка письма
-        send_mail(
+        enqueue_mail(
             f"Сообщение от пользователя {email}",
             message,
             settings.EMAIL_HOST_USER,
@@ -339,3 +621,83 @@ class ContactPageView(View):
 
         # Отображение страницы успеха
         return render(request, self.success_template)
+
+
+# имя файла с хэшем содержимого (ManifestStaticFilesStorage): name.0123456789ab.css
+HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{12}\.[^/]+$")
+
+# сжатые копии статических файлов в порядке предпочтения: кодировка -> расширение
+STATIC_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+class StaticAssetView(View):
+    """
+    Отдача собранных статических файлов из STATIC_ROOT самим приложением.
+    Если клиент принимает сжатие, отдается заранее сжатая копия (.br или .gz).
+    Файлы с хэшем содержимого в имени не меняются, поэтому кэшируются
+    в браузере на STATIC_MAX_AGE, остальные проверяются при каждом обращении.
+    """
+
+    def get(self, request, path):
+        accepted = {
+            encoding.split(";")[0].strip()
+            for encoding in request.headers.get("Accept-Encoding", "").split(",")
+        }
+        served_path = path
+        for encoding, suffix in STATIC_ENCODINGS:
+            if (
+                encoding in accepted
+                and (Path(settings.STATIC_ROOT) / (path + suffix)).is_file()
+            ):
+                served_path = path + suffix
+                break
+
+        response = serve(request, served_path, document_root=settings.STATIC_ROOT)
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if HASHED_NAME_RE.search(path):
+            patch_cache_control(
+                response, public=True, max_age=settings.STATIC_MAX_AGE, immutable=True
+            )
+        else:
+            patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+
+class SlowRequestsView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+    """
+    Медленные запросы текущего процесса для сотрудников: время этапов
+    и самые медленные SQL-запросы (без значений параметров).
+    """
+
+    template_name = "restaurant/slow_requests.html"
+    raise_exception = True
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["slow_requests"] = get_slow_requests()
+        context["threshold"] = slow_request_threshold() * 1000
+        return context
+
+
+class MetricsView(View):
+    """
+    Метрики Prometheus, доступные только с заголовком
+    "Authorization: Bearer <METRICS_TOKEN>". Если METRICS_TOKEN не задан,
+    страница метрик отключена (404).
+    """
+
+    def get(self, request):
+        token = getattr(settings, "METRICS_TOKEN", None)
+        if not token:
+            raise Http404
+        if not secrets.compare_digest(
+            request.headers.get("Authorization", ""), f"Bearer {token}"
+        ):
+            return HttpResponseForbidden()
+
+        response = HttpResponse(export_metrics(), content_type=CONTENT_TYPE_LATEST)
+        patch_cache_control(response, no_store=True)
+        return response
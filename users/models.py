@@ -5,6 +5,12 @@ from django_countries.fields import CountryField
 
 NULLABLE = {"null": True, "blank": True}
 
+# размеры вариантов аватара (сторона квадрата в пикселях): 1x и 2x для профиля
+AVATAR_SIZES = (150, 300)
+
+# каталог вариантов аватаров в хранилище медиафайлов
+AVATAR_VARIANTS_DIR = "users/avatars/variants"
+
 
 class User(AbstractUser):
     """Пользователь"""
@@ -25,6 +31,12 @@ class User(AbstractUser):
         default="users/avatars/default.jpg",
         **NULLABLE,
     )
+    avatar_variants = models.JSONField(
+        default=list,
+        blank=True,
+        editable=False,
+        verbose_name="Размеры вариантов аватара",
+    )
 
     token = models.CharField(max_length=100, verbose_name="Token", **NULLABLE)
     notes = models.TextField(blank=True, null=True)
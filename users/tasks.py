@@ -0,0 +1,70 @@
+import posixpath
+
+from celery import shared_task
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from restaurant.services.images import (
+    IMAGE_FORMATS,
+    encode_image,
+    fit_square,
+    open_image,
+    variant_name,
+)
+from users.models import AVATAR_SIZES, AVATAR_VARIANTS_DIR, User
+
+
+def avatar_variant_names(name, sizes=AVATAR_SIZES):
+    """
+    Имена вариантов аватара name всех размеров и форматов.
+    """
+    return [
+        variant_name(posixpath.basename(name), size, extension, AVATAR_VARIANTS_DIR)
+        for size in sizes
+        for extension in IMAGE_FORMATS
+    ]
+
+
+def delete_avatar_variants(name):
+    """
+    Удаляет варианты аватара name (варианты аватара по умолчанию общие и не удаляются).
+    """
+    if not name or name == User._meta.get_field("avatar").default:
+        return
+    for variant in avatar_variant_names(name):
+        default_storage.delete(variant)
+
+
+@shared_task
+def make_avatar_variants(user_id, previous_name=None):
+    """
+    Создает квадратные варианты аватара пользователя (WebP и JPEG размеров
+    AVATAR_SIZES) и удаляет варианты предыдущего аватара previous_name.
+    Возвращает список созданных размеров.
+    """
+    user = User.objects.filter(pk=user_id).only("avatar").first()
+    if previous_name and (user is None or user.avatar.name != previous_name):
+        delete_avatar_variants(previous_name)
+    if user is None or not user.avatar:
+        return []
+
+    name = user.avatar.name
+    with default_storage.open(name, "rb") as file:
+        image = open_image(file)
+        image.load()
+
+    for size in AVATAR_SIZES:
+        square = fit_square(image, size)
+        for extension in IMAGE_FORMATS:
+            variant = variant_name(
+                posixpath.basename(name), size, extension, AVATAR_VARIANTS_DIR
+            )
+            # имя варианта должно остаться прежним - storage не добавляет суффикс
+            default_storage.delete(variant)
+            default_storage.save(variant, ContentFile(encode_image(square, extension)))
+
+    # аватар мог быть заменен, пока создавались варианты
+    User.objects.filter(pk=user_id, avatar=name).update(
+        avatar_variants=list(AVATAR_SIZES)
+    )
+    return list(AVATAR_SIZES)
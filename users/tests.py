@@ -1,3 +1,135 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from io import BytesIO
 
-# Create your tests here.
+from django.core import mail
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from restaurant.testing import QueryBudget, QueryBudgetTestMixin
+from users.models import User
+from users.tasks import avatar_variant_names
+from users.urls import urlpatterns as users_urlpatterns
+
+
+class PasswordResetTestCase(TestCase):
+    """
+    Тесты сброса пароля.
+    """
+
+    def test_reset_mail_is_enqueued(self):
+        User.objects.create(email="test@test.com")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("users:password_reset"), {"email": "test@test.com"}
+            )
+
+        self.assertRedirects(
+            response,
+            reverse("users:password_reset_done"),
+            fetch_redirect_response=False,
+        )
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["test@test.com"])
+        self.assertEqual(mail.outbox[0].alternatives[0][1], "text/html")
+
+
+def image_upload(name, size=(400, 300), color="red"):
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, "JPEG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+
+class AvatarVariantsTestCase(TestCase):
+    """
+    Тесты создания вариантов аватара.
+    """
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        overrides = override_settings(MEDIA_ROOT=media_root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.user = User.objects.create(
+            email="test@test.com", first_name="Иван", last_name="Иванов"
+        )
+        self.client.force_login(self.user)
+
+    def upload(self, name):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("users:update", args=[self.user.pk]),
+                {
+                    "first_name": "Иван",
+                    "last_name": "Иванов",
+                    "phone": "+79991234567",
+                    "country": "RU",
+                    "avatar": image_upload(name),
+                },
+            )
+        self.user.refresh_from_db()
+        return self.user.avatar.name
+
+    def test_upload_creates_square_variants(self):
+        name = self.upload("me.jpg")
+
+        self.assertEqual(self.user.avatar_variants, [150, 300])
+        variants = avatar_variant_names(name)
+        self.assertEqual(len(variants), 4)
+        for variant in variants:
+            with default_storage.open(variant) as file:
+                self.assertIn(Image.open(file).size, [(150, 150), (300, 300)])
+
+    def test_new_upload_deletes_stale_variants(self):
+        old_name = self.upload("old.jpg")
+        self.upload("new.jpg")
+
+        for variant in avatar_variant_names(old_name):
+            self.assertFalse(default_storage.exists(variant))
+        for variant in avatar_variant_names(self.user.avatar.name):
+            self.assertTrue(default_storage.exists(variant))
+
+    def test_profile_uses_srcset(self):
+        self.upload("me.jpg")
+
+        response = self.client.get(reverse("users:profile", args=[self.user.pk]))
+
+        self.assertContains(response, "me-150.webp 1x")
+        self.assertContains(response, "me-300.jpg 2x")
+
+
+class QueryBudgetTestCase(QueryBudgetTestMixin, TestCase):
+    """
+    Бюджеты запросов к БД для страниц пользователей.
+    """
+
+    urlpatterns = users_urlpatterns
+    namespace = "users"
+    query_budgets = {
+        "login": QueryBudget(0, user=None),
+        "logout": QueryBudget(4, method="post", status=302),
+        "register": QueryBudget(0, user=None),
+        "profile": QueryBudget(2, args=lambda seeded: [seeded["client"].pk]),
+        "update": QueryBudget(2, args=lambda seeded: [seeded["client"].pk]),
+        "password_reset": (
+            QueryBudget(0, user=None),
+            QueryBudget(
+                1,
+                method="post",
+                user=None,
+                data=lambda seeded: {"email": seeded["client"].email},
+                status=302,
+            ),
+        ),
+        "password_reset_confirm": QueryBudget(
+            1, user=None, args=["MQ", "invalid-token"]
+        ),
+        "password_reset_complete": QueryBudget(0, user=None),
+        "password_reset_done": QueryBudget(0, user=None),
+    }
@@ -1,3 +1,5 @@
+from functools import partial
+
 from django.contrib.auth.forms import PasswordResetForm
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.tokens import default_token_generator
@@ -7,7 +9,7 @@ from django.contrib.auth.views import (
     PasswordResetCompleteView,
     PasswordResetConfirmView,
 )
-from django.core.mail import send_mail
+from django.db import transaction
 from django.http import HttpResponseRedirect
 from django.shortcuts import resolve_url
 from django.template.loader import render_to_string
@@ -20,8 +22,10 @@ from django.utils.translation import gettext_lazy as _
 
 from config import settings
 from config.settings import EMAIL_HOST_USER
+from restaurant.services.mail import enqueue_mail
 from users.forms import UserRegisterForm, CustomAuthenticationForm, UserProfileForm
 from users.models import User
+from users.tasks import make_avatar_variants
 
 
 class UserRegisterView(CreateView):
@@ -83,10 +87,24 @@ class UserUpdateView(LoginRequiredMixin, UpdateView):
         Валидация формы
         """
 
+        previous_avatar = form.initial.get("avatar")
+        if "avatar" in form.changed_data:
+            # варианты нового аватара создаются заново в фоне
+            form.instance.avatar_variants = []
+
         if form.is_valid:
             user = form.save(commit=True)
             user.save()
 
+        if "avatar" in form.changed_data:
+            transaction.on_commit(
+                partial(
+                    make_avatar_variants.delay,
+                    user.pk,
+                    getattr(previous_avatar, "name", previous_avatar),
+                )
+            )
+
         return super().form_valid(form)
 
     def get_success_url(self):
@@ -125,7 +143,7 @@ class CustomPasswordResetView(PasswordResetView):
             },
         )
 
-        send_mail(
+        enqueue_mail(
             subject,
             strip_tags(message),
             EMAIL_HOST_USER,